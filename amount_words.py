@@ -0,0 +1,92 @@
+"""Rupee amounts in words, Indian style (crore / lakh / thousand), as printed on invoices.
+
+    >>> amount_in_words(Decimal('123456.78'))
+    'One Lakh Twenty Three Thousand Four Hundred Fifty Six Rupees and Seventy Eight Paise Only'
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+ONES = ("", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen", "Nineteen")
+TENS = ("", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety")
+CRORE, LAKH, THOUSAND = 10_000_000, 100_000, 1_000
+PAISE = Decimal('0.01')
+
+
+@lru_cache(maxsize=1000)
+def hundreds_in_words(n):
+    """Words for 0 <= n < 1000 ('' for 0). Every rupee chunk and paise value goes through here, so the cache holds the whole table."""
+    parts = []
+    if n >= 100:
+        parts += [ONES[n // 100], "Hundred"]; n %= 100
+    if n >= 20:
+        parts.append(TENS[n // 10]); n %= 10
+    if n > 0:
+        parts.append(ONES[n])
+    return " ".join(parts)
+
+
+def integer_in_words(n):
+    """Words for a whole number of rupees ('' for 0); crores above 999 are spelled out in turn."""
+    parts = []
+    if n >= CRORE:
+        parts += [integer_in_words(n // CRORE), "Crore"]; n %= CRORE
+    if n >= LAKH:
+        parts += [hundreds_in_words(n // LAKH), "Lakh"]; n %= LAKH
+    if n >= THOUSAND:
+        parts += [hundreds_in_words(n // THOUSAND), "Thousand"]; n %= THOUSAND
+    if n > 0:
+        parts.append(hundreds_in_words(n))
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def _words(rupees, paise):
+    if rupees == 0 and paise == 0:
+        return "Zero"
+    parts = []
+    if rupees > 0:
+        parts += [integer_in_words(rupees), "Rupees"]
+    if paise > 0:
+        if rupees > 0:
+            parts.append("and")
+        parts += [hundreds_in_words(paise), "Paise"]
+    parts.append("Only")
+    return " ".join(parts)
+
+
+def split_amount(amount):
+    """(rupees, paise) of a non-negative amount, rounded half-up to the paisa."""
+    if isinstance(amount, int):
+        total = amount * 100
+    else:
+        value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+        total = int(value.quantize(PAISE, rounding=ROUND_HALF_UP) * 100)
+    if total < 0:
+        raise ValueError(f"Cannot write a negative amount in words: {amount}")
+    return divmod(total, 100)
+
+
+def amount_in_words(amount):
+    """'... Rupees and ... Paise Only' for a Decimal, int, float or numeric string."""
+    return _words(*split_amount(amount))
+
+
+def amounts_in_words(amounts):
+    """amount_in_words() over a sequence or numpy array of amounts, e.g. for bulk exports.
+
+    Integer and float arrays are split into rupees and paise in one vectorized
+    numpy step (floats rounded half-up on their binary value); anything else
+    (Decimals, strings) is split exactly one by one. Repeated amounts, common
+    in bulk data, come straight from the memo.
+    """
+    import numpy as np
+    array = np.asarray(amounts)
+    if array.dtype.kind in 'iu':
+        rupees, paise = array.astype(np.int64), np.zeros(array.shape, dtype=np.int64)
+    elif array.dtype.kind == 'f':
+        rupees, paise = np.divmod(np.floor(array * 100 + 0.5).astype(np.int64), 100)
+    else:
+        return [amount_in_words(amount) for amount in amounts]
+    if array.size and (rupees < 0).any():
+        raise ValueError("Cannot write a negative amount in words")
+    return [_words(r, p) for r, p in zip(rupees.tolist(), paise.tolist())]
@@ -1,16 +1,26 @@
-from flask import Flask, render_template, request, send_file, jsonify
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_RIGHT, TA_CENTER, TA_LEFT
-from reportlab.lib.units import mm
-from num2words import num2words
+from flask import Flask, Response, g, render_template, request, send_file, jsonify, stream_with_context, url_for, abort
 import datetime
+from decimal import Decimal
 import os
 import io
+import time
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from master_data import MasterDataStore
+from catalog import Catalog, read_master_csvs, import_catalog, source_version, catalog_version
+from pdf_cache import PdfCache, cache_key
+from money import to_money, gst_amount
+from records import Product, OrderLine, LineItem
+from batch import BatchError, normalize_spec, parse_json_batch, parse_csv_batch, build_zip, iter_zip, bounded_map
+from order_import import iter_order_rows, group_orders
+from jobs import JobStore, DONE
+from ledger import InvoiceLedger
+from reports import summary_csv, summary_xlsx, summary_filename
+from invoice_model import EInvoiceError, is_igst, invoice_document, document_to_dict, einvoice_payload
+from invoice_numbers import InvoiceNumberAllocator
+from metrics import REGISTRY, REQUEST_SECONDS, RequestProfiler, span
 
 # --- Flask App Initialization ---
 app = Flask(__name__)
@@ -19,585 +29,756 @@ app = Flask(__name__)
 CLIENTS_FILE = 'clients.csv'
 PRODUCTS_FILE = 'products.csv'
 PRICING_FILE = 'company_pricing.csv'
-YOUR_COMPANY_DETAILS = {
-    "name": "M/S S4 ENTERPRISES",
-    "address": "HCL NAGAR, PLOT NO 108, HCL Nagar, HCL NAGAR,\nMallapur, Hyderabad, Medchal Malkajiri,\nTelangana, 500076",
-    "phone": "9885599559",
-    "email": "s4enterprises07@gmail.com",
-    "gstin": "36AKWPM2375C1ZV",
-    "bank_name": "HDFC BANK LTD",
-    "account_no": "50200083151347",
-    "ifsc_code": "Nacharam & HDFC0000368"
-}
+CATALOG_DB = os.environ.get('CATALOG_DB', 'catalog.db')
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 0)) or os.cpu_count() or 1
+PDF_CACHE_DIR = os.environ.get('PDF_CACHE_DIR', 'pdf_cache')
+PDF_CACHE_MEMORY_MB = int(os.environ.get('PDF_CACHE_MEMORY_MB', 64))
+PDF_CACHE_DISK_MB = int(os.environ.get('PDF_CACHE_DISK_MB', 512))
+RENDER_JOB_HISTORY = int(os.environ.get('RENDER_JOB_HISTORY', 1000))
+LEDGER_DB = os.environ.get('LEDGER_DB', 'invoices.db')
+LEDGER_STORE_PDFS = os.environ.get('LEDGER_STORE_PDFS', '').lower() in ('1', 'true')
+# Invoices submitted without a number get the next one of their financial year's series;
+# INVOICE_SERIES=client keeps a separate series per client instead of one shared series,
+# its numbers carrying a short code of the client (S4/CLSP/2025-26/0001) so no two clients share one
+INVOICE_NUMBER_PREFIX = os.environ.get('INVOICE_NUMBER_PREFIX', '')
+INVOICE_SERIES = os.environ.get('INVOICE_SERIES', '')
+# How long browsers may reuse catalog lookups before revalidating them (by ETag)
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 300))
+# Debug: when set, every request is run under cProfile and its stats are written here
+PROFILE_DIR = os.environ.get('PROFILE_DIR')
+# Part of every PDF cache key; bump it whenever generate_pdf_invoice output changes
+PDF_LAYOUT_VERSION = 2
+# compact (binary compressed streams), ascii (ReportLab's 7-bit-clean default) or
+# archival (embedded subset fonts, PDF/A-friendly, prints the rupee sign); see invoice_pdf.py
+PDF_OUTPUT_MODE = os.environ.get('PDF_OUTPUT_MODE', 'compact')
 
 # --- Backend Logic ---
 def load_data():
+    """Open the master-data catalog, first re-importing the CSVs if they changed since the last import"""
     try:
-        def clean_df(df):
-            for col in df.select_dtypes(['object']): df[col] = df[col].str.strip()
-            return df
-        clients_df = clean_df(pd.read_csv(CLIENTS_FILE, dtype=str)); clients_df.dropna(subset=['Company Name'], inplace=True)
-        products_df = clean_df(pd.read_csv(PRODUCTS_FILE, dtype=str)); products_df.dropna(subset=['Description'], inplace=True)
-        if 'GSt_Rate' in products_df.columns: products_df['GSt_Rate'] = pd.to_numeric(products_df['GSt_Rate'].astype(str).str.replace('%', ''))
-        pricing_df = clean_df(pd.read_csv(PRICING_FILE, dtype=str)); pricing_df.dropna(subset=['CompanyName'], inplace=True)
-        if 'Price' in pricing_df.columns:
-            pricing_df['Price'] = pricing_df['Price'].astype(str).str.replace('₹', '').str.replace(',', '').str.strip()
-            pricing_df['Price'] = pd.to_numeric(pricing_df['Price'], errors='coerce')
-        return clients_df, products_df, pricing_df
+        sources = [CLIENTS_FILE, PRODUCTS_FILE, PRICING_FILE]
+        version = source_version(sources)
+        # Without the CSVs (catalog-only deployments) the existing catalog is used as is
+        with span('load_data'):
+            if version is not None and catalog_version(CATALOG_DB) != version:
+                import_catalog(CATALOG_DB, *read_master_csvs(*sources), version)
+            return Catalog(CATALOG_DB)
     except Exception as e:
-        print(f"Error loading data: {e}"); return None, None, None
+        print(f"Error loading data: {e}"); return None
 
-def calculate_invoice(client, items, pricing_df):
-    processed_items, subtotal, client_name = [], 0, client['Company Name']
+# Shared by every request (and every thread of a gunicorn worker); the catalog is
+# only reopened (and the CSVs re-imported) when one of the files changes on disk.
+master_data = MasterDataStore([CLIENTS_FILE, PRODUCTS_FILE, PRICING_FILE, CATALOG_DB], load_data)
+
+def calculate_invoice(client, items, prices):
+    """Price, total and tax the OrderLines; `prices` maps product description -> the client's PriceEntry"""
+    processed_items, subtotal = [], Decimal(0)
+    taxable_by_rate = {}
     for item in items:
-        product_desc, quantity = item['product']['Description'], float(item['quantity'])
-        price_row = pricing_df[(pricing_df['CompanyName'] == client_name) & (pricing_df['ProductDescription'] == product_desc)]
-        price, error = (price_row.iloc[0]['Price'], None) if not price_row.empty else (0, f"PRICE NOT FOUND for '{product_desc}'")
-        line_total = price * quantity
-        if not error: subtotal += line_total
-        processed_items.append({'description': product_desc, 'hsn_sac': item['product']['HSN_SAC'], 'quantity': quantity, 'unit': item['product']['Unit'], 'rate': price, 'gst_rate': float(item['product']['GSt_Rate']), 'amount': line_total, 'error': error})
-    
-    tax_details, total_tax = {}, 0; client_tax_type = client.get('TaxType', 'CGST_SGST').strip()
-    valid_items = [p for p in processed_items if p['error'] is None]
-    if valid_items:
-        tax_groups = pd.DataFrame(valid_items).groupby('gst_rate')
-        if client_tax_type == 'IGST':
-            tax_details.update({'type': 'IGST', 'breakdown': []}); total_igst = 0
-            for gst_rate, group in tax_groups: taxable_value = group['amount'].sum(); igst_amount = taxable_value * (gst_rate / 100); total_igst += igst_amount; tax_details['breakdown'].append({'rate': gst_rate, 'taxable_value': taxable_value, 'igst_amount': igst_amount})
-            total_tax = total_igst
+        product, quantity = item.product, float(item.quantity)
+        entry = prices.get(product.description)
+        if entry is not None:
+            rate, error = entry.price, None
+            line_total = to_money(rate * Decimal(str(quantity)))
+        else:
+            rate, line_total, error = Decimal(0), Decimal(0), f"PRICE NOT FOUND for '{product.description}'"
+        gst_rate = float(product.gst_rate)
+        if not error:
+            subtotal += line_total; taxable_by_rate[gst_rate] = taxable_by_rate.get(gst_rate, Decimal(0)) + line_total
+        processed_items.append(LineItem(product.description, product.hsn_sac, quantity, product.unit, rate, gst_rate, line_total, error))
+    
+    # Group valid lines by GST rate with a plain dict; rates are few, so this beats building a DataFrame per invoice
+    tax_details, total_tax = {}, Decimal(0)
+    if taxable_by_rate:
+        if is_igst(client):
+            tax_details.update({'type': 'IGST', 'breakdown': []})
+            for gst_rate in sorted(taxable_by_rate):
+                taxable_value = taxable_by_rate[gst_rate]; igst_amount = gst_amount(taxable_value, gst_rate); total_tax += igst_amount
+                tax_details['breakdown'].append({'rate': gst_rate, 'taxable_value': taxable_value, 'igst_amount': igst_amount})
         else:
-            tax_details.update({'type': 'CGST/SGST', 'breakdown': []}); total_cgst, total_sgst = 0, 0
-            for gst_rate, group in tax_groups: taxable_value = group['amount'].sum(); cgst_amount = taxable_value * (gst_rate / 2 / 100); sgst_amount = taxable_value * (gst_rate / 2 / 100); total_cgst += cgst_amount; total_sgst += sgst_amount; tax_details['breakdown'].append({'rate': gst_rate, 'taxable_value': taxable_value, 'cgst_amount': cgst_amount, 'sgst_amount': sgst_amount})
-            total_tax = total_cgst + total_sgst
+            tax_details.update({'type': 'CGST/SGST', 'breakdown': []})
+            for gst_rate in sorted(taxable_by_rate):
+                taxable_value = taxable_by_rate[gst_rate]; cgst_amount = sgst_amount = gst_amount(taxable_value, gst_rate / 2); total_tax += cgst_amount + sgst_amount
+                tax_details['breakdown'].append({'rate': gst_rate, 'taxable_value': taxable_value, 'cgst_amount': cgst_amount, 'sgst_amount': sgst_amount})
     grand_total = subtotal + total_tax
     return {'items': processed_items, 'subtotal': subtotal, 'tax_details': tax_details, 'total_tax': total_tax, 'grand_total': grand_total}
 
 
-# --- ★★★ COMPLETED PDF ENGINE WITH PERFECTLY ALIGNED COLUMN WIDTHS ★★★ ---
-def generate_pdf_invoice(client, invoice_data, transactional_details):
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    
-    styles = getSampleStyleSheet()
-    style_normal = ParagraphStyle(name='Normal', parent=styles['Normal'], fontSize=8, leading=10)
-    style_small = ParagraphStyle(name='Small', parent=styles['Normal'], fontSize=7, leading=9)
-    style_bold = ParagraphStyle(name='Bold', parent=styles['Normal'], fontSize=8, leading=10, fontName='Helvetica-Bold')
-    
-    left_margin, right_margin, top_margin, bottom_margin = 15*mm, 15*mm, 5*mm, 35*mm
-    
-    # 1. Header - Title based on LayoutTemplate and TaxType
-    c.setFont('Helvetica-Bold', 16)
-    
-    # Check conditions for invoice header
-    layout_template = client.get('LayoutTemplate', '')
-    tax_type = client.get('TaxType', '')
-    
-    if layout_template == 'SEZ' and tax_type == 'IGST':
-        # Condition 3: SEZ Invoice with IGST
-        c.drawCentredString(width / 2.0, height - top_margin - 0*mm, "SEZ Invoice")
-    elif layout_template == 'Standard' and tax_type == 'IGST':
-        # Condition 2: Tax Invoice with IGST
-        c.drawCentredString(width / 2.0, height - top_margin - 0*mm, "Tax Invoice")
-    elif layout_template == 'Standard' and tax_type == 'CGST_SGST':
-        # Condition 1: Tax Invoice with CGST/SGST
-        c.drawCentredString(width / 2.0, height - top_margin - 0*mm, "Tax Invoice")
-    else:
-        # Default fallback
-        c.drawCentredString(width / 2.0, height - top_margin - 0*mm, "Tax Invoice")
-    
-    # 2. Company Name and Invoice Details Header
-    company_header_y = height - top_margin - 1*mm
-    
-    company_header_data = [
-        [
-            Paragraph(f"<b>{YOUR_COMPANY_DETAILS['name']}</b>", ParagraphStyle('CompanyName', fontSize=11, fontName='Helvetica-Bold')),
-            Paragraph("<b>Invoice No.</b>", style_bold),
-            Paragraph("<b>Dated</b>", style_bold)
-        ],
-        [
-            Paragraph("", style_normal),
-            Paragraph(f"<b>{transactional_details['invoice_no']}</b>", style_bold),
-            Paragraph(f"<b>{transactional_details['invoice_date']}</b>", style_bold)
-        ]
-    ]
-    
-    company_header_table = Table(company_header_data, colWidths=[90*mm, 45*mm, 45*mm])
-    company_header_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 2),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2)
-    ]))
-    
-    company_header_table.wrapOn(c, width, height)
-    company_header_height = company_header_table._height
-    company_header_table.drawOn(c, left_margin, company_header_y - company_header_height)
-    
-    # 3. Main Details Table
-    main_details_y_start = company_header_y - company_header_height - 0.5*mm
-    
-    main_details_data = [
-        [
-            Paragraph(YOUR_COMPANY_DETAILS['address'], style_normal),
-            Paragraph("", style_normal),
-            Paragraph("", style_normal)
-        ],
-        [
-            Paragraph(f"Phone No.: {YOUR_COMPANY_DETAILS['phone']}", style_normal),
-            Paragraph("Delivery Note", style_normal),
-            Paragraph("Mode/Terms of Payment", style_normal)
-        ],
-        [
-            Paragraph(f"E Mail ID: {YOUR_COMPANY_DETAILS['email']}", style_normal),
-            Paragraph("Supplier's Ref.", style_normal),
-            Paragraph("Other Reference(s)", style_normal)
-        ],
-        [
-            Paragraph(f"GSTIN/UIN: {YOUR_COMPANY_DETAILS['gstin']}", style_normal),
-            Paragraph(f"Buyer's Order No.<br/><b>{transactional_details.get('po_number', '')}</b>", style_normal),
-            Paragraph("Dated", style_normal)
-        ],
-        [
-            Paragraph("State Name: Telangana, Code: 36", style_normal),
-            Paragraph("Despatch Document No.", style_normal),
-            Paragraph("Delivery Note Date", style_normal)
-        ],
-        [
-            Paragraph("Contact<br/>Place of Supply: Telangana", style_normal),
-            Paragraph("Despatched through", style_normal),
-            Paragraph("Destination", style_normal)
-        ]
-    ]
-    
-    main_details_table = Table(main_details_data, colWidths=[90*mm, 45*mm, 45*mm])
-    main_details_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 2),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2)
-    ]))
-    
-    main_details_table.wrapOn(c, width, height)
-    main_details_height = main_details_table._height
-    main_details_table.drawOn(c, left_margin, main_details_y_start - main_details_height)
-    
-    # 4. Client Details Table
-    client_y_start = main_details_y_start - main_details_height - 0.5*mm
-    
-    client_data = [
-        [
-            Paragraph("<b>Consignee (Ship to)</b>", style_bold),
-            Paragraph("<b>Buyer (Bill to)</b>", style_bold)
-        ],
-        [
-            Paragraph(f"<b>{client['Company Name']}</b>", style_bold),
-            Paragraph(f"<b>{client['Company Name']}</b>", style_bold)
-        ],
-        [
-            Paragraph(f"GSTIN/UIN: {client['GSTIN']}", style_normal),
-            Paragraph(f"GSTIN/UIN: {client['GSTIN']}", style_normal)
-        ],
-        [
-            Paragraph(f"Address: {client['Address']}", style_normal),
-            Paragraph(f"Address: {client['Address']}", style_normal)
-        ],
-        [
-            Paragraph(f"State Name: {client['State']}", style_normal),
-            Paragraph(f"State Name: {client['State']}", style_normal)
-        ],
-        [
-            Paragraph(f"Place of Supply: {client['State']}", style_normal),
-            Paragraph(f"Place of Supply: {client['State']}", style_normal)
-        ]
-    ]
-    
-    client_table = Table(client_data, colWidths=[90*mm, 90*mm])
-    client_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 2),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2)
-    ]))
-    
-    client_table.wrapOn(c, width, height)
-    client_height = client_table._height
-    client_table.drawOn(c, left_margin, client_y_start - client_height)
-    
-    # 5. Items Table
-    items_y_start = client_y_start - client_height - 0.5*mm
-    
-    items_header = ['Sl No', 'Description of Goods', 'HSN/SAC', 'GST Rate', 'Quantity', 'Rate', 'per', 'Amount']
-    items_data = [[Paragraph(f'<b>{h}</b>', style_bold) for h in items_header]]
-    
-    valid_items = [item for item in invoice_data['items'] if item['error'] is None]
-    for i, item in enumerate(valid_items):
-        # Format amounts with paise (2 decimal places) - no rupee symbol for individual items
-        rate_formatted = f"{item['rate']:.2f}"
-        amount_formatted = f"{item['amount']:.2f}"
-        
-        items_data.append([
-            Paragraph(str(i + 1), style_normal),
-            Paragraph(item['description'], style_normal),
-            Paragraph(item['hsn_sac'], style_normal),
-            Paragraph(f"{item['gst_rate']:.0f}%", style_normal),
-            Paragraph(f"{item['quantity']:.0f} {item['unit']}", style_normal),
-            Paragraph(rate_formatted, ParagraphStyle('Rate', parent=style_normal, alignment=TA_RIGHT)),
-            Paragraph(item['unit'], style_normal),
-            Paragraph(amount_formatted, ParagraphStyle('Amount', parent=style_normal, alignment=TA_RIGHT))
-        ])
-    
-    while len(items_data) < 6:
-        items_data.append(['', '', '', '', '', '', '', ''])
-    
-    items_data.append([
-        '', '', '', '', '', '', '',
-        Paragraph(f"{invoice_data['subtotal']:.2f}", ParagraphStyle('Subtotal', parent=style_normal, alignment=TA_RIGHT))
-    ])
-    
-    total_cgst = sum(b.get('cgst_amount', 0) for b in invoice_data['tax_details'].get('breakdown', []))
-    total_sgst = sum(b.get('sgst_amount', 0) for b in invoice_data['tax_details'].get('breakdown', []))
-    total_igst = sum(b.get('igst_amount', 0) for b in invoice_data['tax_details'].get('breakdown', []))
-    
-    # Tax rows based on conditions
-    if (layout_template == 'SEZ' and tax_type == 'IGST') or (layout_template == 'Standard' and tax_type == 'IGST'):
-        # Conditions 2 & 3: Show IGST
-        items_data.append([
-            '', '', '', '', '', '',
-            Paragraph('<b>Input IGST</b>', ParagraphStyle('InputIGST', parent=style_bold, fontSize=7)),
-            Paragraph(f"{total_igst:.2f}", ParagraphStyle('Tax', parent=style_normal, alignment=TA_RIGHT))
-        ])
-    elif layout_template == 'Standard' and tax_type == 'CGST_SGST':
-        # Condition 1: Show CGST/SGST
-        items_data.append([
-            '', '', '', '', '', '',
-            Paragraph('<b>Input CGST</b>', ParagraphStyle('InputCGST', parent=style_bold, fontSize=7)),
-            Paragraph(f"{total_cgst:.2f}", ParagraphStyle('Tax', parent=style_normal, alignment=TA_RIGHT))
-        ])
-        items_data.append([
-            '', '', '', '', '', '',
-            Paragraph('<b>Input SGST</b>', ParagraphStyle('InputSGST', parent=style_bold, fontSize=7)),
-            Paragraph(f"{total_sgst:.2f}", ParagraphStyle('Tax', parent=style_normal, alignment=TA_RIGHT))
-        ])
-    else:
-        # Default fallback - show IGST
-        items_data.append([
-            '', '', '', '', '', '',
-            Paragraph('<b>Input IGST</b>', ParagraphStyle('InputIGST', parent=style_bold, fontSize=7)),
-            Paragraph(f"{total_igst:.2f}", ParagraphStyle('Tax', parent=style_normal, alignment=TA_RIGHT))
-        ])
-    
-    items_data.append([
-        '', '', '', '', '', '',
-        Paragraph('<b>Round Off</b>', style_bold),
-        Paragraph('0.00', ParagraphStyle('RoundOff', parent=style_normal, alignment=TA_RIGHT))
-    ])
-    
-    items_data.append([
-        '', '', '', '', '', '',
-        Paragraph('<b>Total</b>', style_bold),
-        Paragraph(f"<b>Rs. {invoice_data['grand_total']:.2f}</b>", ParagraphStyle('GrandTotal', parent=style_bold, alignment=TA_RIGHT))
-    ])
-    
-    items_table = Table(items_data, colWidths=[13*mm, 53*mm, 20*mm, 15*mm, 22*mm, 20*mm, 12*mm, 25*mm])
-    items_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('ALIGN', (1,1), (1,-6), 'LEFT'),
-        ('ALIGN', (4,1), (4,-6), 'LEFT'),
-        ('LEFTPADDING', (1,1), (1,-6), 3),
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        ('TOPPADDING', (0,0), (-1,-1), 2),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2)
-    ]))
-    
-    items_table.wrapOn(c, width, height)
-    items_height = items_table._height
-    items_table.drawOn(c, left_margin, items_y_start - items_height)
-    
-    # 6. Amount in Words Section
-    words_y_start = items_y_start - items_height - 0.5*mm
-    
-    def convert_to_indian_words(amount):
-        # Split into rupees and paise
-        rupees = int(amount)
-        paise = int(round((amount - rupees) * 100))
-        
-        if rupees == 0 and paise == 0:
-            return "Zero"
-        
-        ones = ["", "One", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten", "Eleven", "Twelve", "Thirteen", "Fourteen", "Fifteen", "Sixteen", "Seventeen", "Eighteen", "Nineteen"]
-        tens = ["", "", "Twenty", "Thirty", "Forty", "Fifty", "Sixty", "Seventy", "Eighty", "Ninety"]
-        
-        def convert_hundreds(n):
-            result = ""
-            if n >= 100: 
-                result += ones[n // 100] + " Hundred "
-                n %= 100
-            if n >= 20: 
-                result += tens[n // 10] + " "
-                n %= 10
-            if n > 0: 
-                result += ones[n] + " "
-            return result.strip()
-        
-        result = ""
-        
-        # Convert rupees
-        if rupees >= 10000000: 
-            result += convert_hundreds(rupees // 10000000) + " Crore "
-            rupees %= 10000000
-        if rupees >= 100000: 
-            result += convert_hundreds(rupees // 100000) + " Lakh "
-            rupees %= 100000
-        if rupees >= 1000: 
-            result += convert_hundreds(rupees // 1000) + " Thousand "
-            rupees %= 1000
-        if rupees > 0: 
-            result += convert_hundreds(rupees)
-        
-        # Add "Rupees" if there are rupees
-        if int(amount) > 0:
-            result = result.strip() + " Rupees"
-        
-        # Add paise if present
-        if paise > 0:
-            if int(amount) > 0:
-                result += " and "
-            result += convert_hundreds(paise).strip() + " Paise"
-        
-        # Add "Only" at the end
-        result += " Only"
-        
-        return result.strip()
+def format_invoice_date(invoice_date):
+    """Convert the YYYY-MM-DD form date to DD/MM/YYYY, falling back to today's date"""
+    if invoice_date:
+        try:
+            return datetime.datetime.strptime(invoice_date, '%Y-%m-%d').strftime('%d/%m/%Y')
+        except ValueError:
+            pass
+    return datetime.datetime.now().strftime('%d/%m/%Y')
 
-    total_in_words = convert_to_indian_words(invoice_data['grand_total'])
-    
-    words_data = [[Paragraph(f"<b>Amount Chargeable (in words)</b><br/>INR {total_in_words}", style_normal), Paragraph('<b>E. & O.E</b>', ParagraphStyle('EOE', parent=style_normal, alignment=TA_RIGHT))]]
-    words_table = Table(words_data, colWidths=[140*mm, 40*mm])
-    words_table.setStyle(TableStyle([('GRID', (0,0), (-1,-1), 1, colors.black), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('LEFTPADDING', (0,0), (-1,-1), 3), ('RIGHTPADDING', (0,0), (-1,-1), 3), ('TOPPADDING', (0,0), (-1,-1), 3), ('BOTTOMPADDING', (0,0), (-1,-1), 3)]))
-    words_table.wrapOn(c, width, height)
-    words_height = words_table._height
-    words_table.drawOn(c, left_margin, words_y_start - words_height)
-    
-    # 7. Tax Breakdown Table
-    tax_table_y_start = words_y_start - words_height - 0.5*mm
-    tax_data = []
-    
-    # Tax table structure based on conditions
-    if (layout_template == 'SEZ' and tax_type == 'IGST') or (layout_template == 'Standard' and tax_type == 'IGST'):
-        # Conditions 2 & 3: IGST table structure
-        tax_data.append([Paragraph('<b>HSN/SAC</b>', style_bold), Paragraph('<b>Taxable<br/>Value</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), Paragraph('<b>Integrated Tax</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), '', Paragraph('<b>Total<br/>Tax Amount</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER))])
-        tax_data.append(['', '', Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), ''])
-        for item in valid_items:
-            hsn, taxable_value, tax_rate = item['hsn_sac'], item['amount'], item['gst_rate']
-            igst_amount = taxable_value * (tax_rate / 100)
-            tax_data.append([Paragraph(hsn, style_small), Paragraph(f"{taxable_value:.2f}", ParagraphStyle('TaxValue', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{tax_rate:.1f}%", ParagraphStyle('TaxRate', parent=style_small, alignment=TA_CENTER)), Paragraph(f"{igst_amount:.2f}", ParagraphStyle('TaxAmount', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{igst_amount:.2f}", ParagraphStyle('TotalTax', parent=style_small, alignment=TA_RIGHT))])
-        tax_data.append([Paragraph('<b>Total</b>', style_bold), Paragraph(f"<b>{invoice_data['subtotal']:.2f}</b>", ParagraphStyle('TotalValue', parent=style_bold, alignment=TA_RIGHT)), '', Paragraph(f"<b>{total_igst:.2f}</b>", ParagraphStyle('TotalTax', parent=style_bold, alignment=TA_RIGHT)), Paragraph(f"<b>{invoice_data['total_tax']:.2f}</b>", ParagraphStyle('GrandTotalTax', parent=style_bold, alignment=TA_RIGHT))])
-        col_widths = [20*mm, 53*mm, 27*mm, 35*mm, 45*mm]
-    elif layout_template == 'Standard' and tax_type == 'CGST_SGST':
-        # Condition 1: CGST/SGST table structure
-        tax_data.append([Paragraph('<b>HSN/SAC</b>', style_bold), Paragraph('<b>Taxable<br/>Value</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), Paragraph('<b>Central Tax</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), '', Paragraph('<b>State Tax</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), '', Paragraph('<b>Total<br/>Tax Amount</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER))])
-        tax_data.append(['', '', Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), ''])
-        for item in valid_items:
-            hsn, taxable_value, tax_rate = item['hsn_sac'], item['amount'], item['gst_rate']
-            cgst_rate, sgst_rate = tax_rate / 2, tax_rate / 2
-            cgst_amount, sgst_amount = taxable_value * (cgst_rate / 100), taxable_value * (sgst_rate / 100)
-            total_tax_amount = cgst_amount + sgst_amount
-            tax_data.append([Paragraph(hsn, style_small), Paragraph(f"{taxable_value:.2f}", ParagraphStyle('TaxValue', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{cgst_rate:.1f}%", ParagraphStyle('TaxRate', parent=style_small, alignment=TA_CENTER)), Paragraph(f"{cgst_amount:.2f}", ParagraphStyle('TaxAmount', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{sgst_rate:.1f}%", ParagraphStyle('TaxRate', parent=style_small, alignment=TA_CENTER)), Paragraph(f"{sgst_amount:.2f}", ParagraphStyle('TaxAmount', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{total_tax_amount:.2f}", ParagraphStyle('TotalTax', parent=style_small, alignment=TA_RIGHT))])
-        tax_data.append([Paragraph('<b>Total</b>', style_bold), Paragraph(f"<b>{invoice_data['subtotal']:.2f}</b>", ParagraphStyle('TotalValue', parent=style_bold, alignment=TA_RIGHT)), '', Paragraph(f"<b>{total_cgst:.2f}</b>", ParagraphStyle('TotalTax', parent=style_bold, alignment=TA_RIGHT)), '', Paragraph(f"<b>{total_sgst:.2f}</b>", ParagraphStyle('TotalTax', parent=style_bold, alignment=TA_RIGHT)), Paragraph(f"<b>{invoice_data['total_tax']:.2f}</b>", ParagraphStyle('GrandTotalTax', parent=style_bold, alignment=TA_RIGHT))])
-        col_widths = [33*mm, 53*mm, 15*mm, 22*mm, 15*mm, 20*mm, 22*mm]
-    else:
-        # Default fallback - IGST structure
-        tax_data.append([Paragraph('<b>HSN/SAC</b>', style_bold), Paragraph('<b>Taxable<br/>Value</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), Paragraph('<b>Integrated Tax</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER)), '', Paragraph('<b>Total<br/>Tax Amount</b>', ParagraphStyle('TaxHeader', parent=style_bold, alignment=TA_CENTER))])
-        tax_data.append(['', '', Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), ''])
-        for item in valid_items:
-            hsn, taxable_value, tax_rate = item['hsn_sac'], item['amount'], item['gst_rate']
-            igst_amount = taxable_value * (tax_rate / 100)
-            tax_data.append([Paragraph(hsn, style_small), Paragraph(f"{taxable_value:.2f}", ParagraphStyle('TaxValue', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{tax_rate:.1f}%", ParagraphStyle('TaxRate', parent=style_small, alignment=TA_CENTER)), Paragraph(f"{igst_amount:.2f}", ParagraphStyle('TaxAmount', parent=style_small, alignment=TA_RIGHT)), Paragraph(f"{igst_amount:.2f}", ParagraphStyle('TotalTax', parent=style_small, alignment=TA_RIGHT))])
-        tax_data.append([Paragraph('<b>Total</b>', style_bold), Paragraph(f"<b>{invoice_data['subtotal']:.2f}</b>", ParagraphStyle('TotalValue', parent=style_bold, alignment=TA_RIGHT)), '', Paragraph(f"<b>{total_igst:.2f}</b>", ParagraphStyle('TotalTax', parent=style_bold, alignment=TA_RIGHT)), Paragraph(f"<b>{invoice_data['total_tax']:.2f}</b>", ParagraphStyle('GrandTotalTax', parent=style_bold, alignment=TA_RIGHT))])
-        col_widths = [20*mm, 53*mm, 27*mm, 35*mm, 45*mm]
-    
-    tax_table = Table(tax_data, colWidths=col_widths)
-    tax_style = TableStyle([('GRID', (0,0), (-1,-1), 1, colors.black), ('ALIGN', (0,0), (-1,-1), 'CENTER'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('FONTSIZE', (0,0), (-1,-1), 7), ('TOPPADDING', (0,0), (-1,-1), 2), ('BOTTOMPADDING', (0,0), (-1,-1), 2), ('SPAN', (0,0), (0,1)), ('SPAN', (1,0), (1,1)), ('SPAN', (-1,0), (-1,1))])
-    
-    if layout_template == 'Standard' and tax_type == 'CGST_SGST':
-        # CGST/SGST spans
-        tax_style.add('SPAN', (2,0), (3,0))
-        tax_style.add('SPAN', (4,0), (5,0))
-    else:
-        # IGST spans
-        tax_style.add('SPAN', (2,0), (3,0))
-    
-    tax_table.setStyle(tax_style)
-    tax_table.wrapOn(c, width, height)
-    tax_table_height = tax_table._height
-    tax_table.drawOn(c, left_margin, tax_table_y_start - tax_table_height)
-
-    # 8. Tax Amount in Words Table
-    tax_words_y_start = tax_table_y_start - tax_table_height - 0.5*mm
-    tax_in_words = convert_to_indian_words(invoice_data['total_tax'])
-    tax_words_data = [[Paragraph(f"<b>Tax Amount (in words): INR</b><br/>{tax_in_words}", style_normal), Paragraph(f"<b>Company's Bank Details</b><br/>Bank Name: {YOUR_COMPANY_DETAILS['bank_name']}<br/>A/c No. {YOUR_COMPANY_DETAILS['account_no']}<br/>Branch & IFS Code: {YOUR_COMPANY_DETAILS['ifsc_code']}", style_normal)]]
-    tax_words_table = Table(tax_words_data, colWidths=[100*mm, 80*mm])
-    tax_words_table.setStyle(TableStyle([('GRID', (0,0), (-1,-1), 1, colors.black), ('VALIGN', (0,0), (-1,-1), 'TOP'), ('LEFTPADDING', (0,0), (-1,-1), 3), ('RIGHTPADDING', (0,0), (-1,-1), 3), ('TOPPADDING', (0,0), (-1,-1), 2), ('BOTTOMPADDING', (0,0), (-1,-1), 2)]))
-    tax_words_table.wrapOn(c, width, height)
-    tax_words_height = tax_words_table._height
-    tax_words_table.drawOn(c, left_margin, tax_words_y_start - tax_words_height)
-    
-    # 9. Declaration and Signature Table
-    declaration_y_start = tax_words_y_start - tax_words_height - 0.5*mm
-    
-    declaration_data = [
-        [
-            Paragraph("Declaration: We declare that this invoice shows the actual price of the goods described and that all particulars are true and correct.", style_normal),
-            Paragraph(f"for {YOUR_COMPANY_DETAILS['name']}<br/><br/>Authorised Signatory", ParagraphStyle('Signature', parent=style_normal, alignment=TA_RIGHT))
-        ]
-    ]
-    
-    declaration_table = Table(declaration_data, colWidths=[120*mm, 60*mm])
-    declaration_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 3),
-        ('RIGHTPADDING', (0,0), (-1,-1), 3),
-        ('TOPPADDING', (0,0), (-1,-1), 3),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 3)
-    ]))
-    
-    declaration_table.wrapOn(c, width, height)
-    declaration_height = declaration_table._height
-    declaration_table.drawOn(c, left_margin, declaration_y_start - declaration_height)
-    
-    c.save()
-    buffer.seek(0)
-    return buffer
+def invoice_filename(invoice_no, client_name):
+    safe_invoice_no = str(invoice_no).replace('/', '-').replace('\\', '-')
+    return f'Invoice_{safe_invoice_no}_{client_name.replace(" ", "_")}.pdf'
+
+
+def generate_pdf_invoice(client, invoice_data, transactional_details, output_mode=None):
+    """Render the invoice PDF into a BytesIO (see invoice_pdf.py), in PDF_OUTPUT_MODE unless given"""
+    # ReportLab is imported on the first render, not at worker startup
+    import invoice_pdf
+    return invoice_pdf.generate_pdf_invoice(client, invoice_data, transactional_details, output_mode or PDF_OUTPUT_MODE)
+
+# --- Invoice Ledger ---
+# Every generated invoice is recorded here, keyed by (invoice_no, client)
+ledger = InvoiceLedger(LEDGER_DB)
+
+# Sequences live next to the ledger, in the same WAL-mode database
+invoice_numbers = InvoiceNumberAllocator(LEDGER_DB, prefix=INVOICE_NUMBER_PREFIX)
+
+def next_invoice_number(client_name, invoice_date):
+    """Allocate the next invoice number for client_name; invoice_date is YYYY-MM-DD (today if missing or invalid)"""
+    try:
+        date = datetime.datetime.strptime(invoice_date, '%Y-%m-%d').date() if invoice_date else None
+    except ValueError:
+        date = None
+    return invoice_numbers.allocate(date, client_name if INVOICE_SERIES == 'client' else '')
+
+def claim_invoice_number(client_name, invoice_no):
+    """A number typed in by hand: if it is in client_name's series, later allocations skip past it"""
+    invoice_numbers.claim(invoice_no, client_name if INVOICE_SERIES == 'client' else '')
+
+def parse_ledger_cursor(cursor):
+    """'YYYY-MM-DD,id' from a previous page's next_cursor -> (date, id)"""
+    invoice_date, _, invoice_id = cursor.partition(',')
+    return invoice_date, int(invoice_id)
+
+@app.route('/api/invoices')
+def list_invoices():
+    """Search recorded invoices by client, invoice_no and date range (YYYY-MM-DD), newest first"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        cursor = parse_ledger_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+    invoices, next_cursor = ledger.search(client=request.args.get('client'), invoice_no=request.args.get('invoice_no'),
+                                          date_from=request.args.get('date_from'), date_to=request.args.get('date_to'),
+                                          limit=limit, cursor=cursor)
+    return jsonify({'invoices': invoices, 'next_cursor': f'{next_cursor[0]},{next_cursor[1]}' if next_cursor else None})
+
+@app.route('/api/invoices/<int:invoice_id>')
+def get_recorded_invoice(invoice_id):
+    """One recorded invoice with its line items and tax breakdown"""
+    invoice = ledger.get(invoice_id)
+    if invoice is None:
+        return jsonify({'error': f'Invoice {invoice_id} not found'}), 404
+    invoice['pdf_url'] = url_for('get_recorded_invoice_pdf', invoice_id=invoice_id)
+    return jsonify(invoice)
+
+@app.route('/api/invoices/<int:invoice_id>/pdf')
+def get_recorded_invoice_pdf(invoice_id):
+    """The stored PDF (LEDGER_STORE_PDFS), else the cached one, else 404"""
+    invoice = ledger.get(invoice_id)
+    if invoice is None:
+        abort(404)
+    pdf_bytes = ledger.get_pdf(invoice_id) or pdf_cache.get(invoice['cache_key'])
+    if pdf_bytes is None:
+        return jsonify({'error': 'PDF no longer stored; generate the invoice again'}), 404
+    return send_file(io.BytesIO(pdf_bytes), as_attachment=True, download_name=invoice_filename(invoice['invoice_no'], invoice['client']),
+                     mimetype='application/pdf', etag=invoice['cache_key'], conditional=True)
+
+@app.route('/api/reports/gst')
+def gst_report():
+    """GST summary of recorded invoices for ?month=YYYY-MM or ?from=YYYY-MM&to=YYYY-MM; ?format=csv or xlsx downloads it"""
+    month_from = request.args.get('from') or request.args.get('month') or datetime.date.today().strftime('%Y-%m')
+    month_to = request.args.get('to') or month_from
+    try:
+        for month in (month_from, month_to):
+            datetime.datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        return jsonify({'error': 'Months must be given as YYYY-MM'}), 400
+    with span('gst_summary'):
+        summary = ledger.gst_summary(month_from, month_to)
+
+    export = request.args.get('format', 'json')
+    if export == 'csv':
+        return Response(summary_csv(summary), mimetype='text/csv',
+                        headers={'Content-Disposition': f'attachment; filename={summary_filename(summary, "csv")}'})
+    if export == 'xlsx':
+        return send_file(summary_xlsx(summary), as_attachment=True, download_name=summary_filename(summary, 'xlsx'),
+                         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return jsonify(summary)
+
+# --- PDF Cache ---
+pdf_cache = PdfCache(PDF_CACHE_MEMORY_MB * 1024 * 1024, PDF_CACHE_DIR, PDF_CACHE_DISK_MB * 1024 * 1024)
+
+def invoice_cache_key(client, items, transactional_details, data):
+    """Content address of an invoice PDF: everything printed on it plus the master-data version"""
+    # The records' CSV-style dicts keep keys identical to those of PDFs cached before records were introduced
+    return cache_key({'layout': PDF_LAYOUT_VERSION, 'output': PDF_OUTPUT_MODE, 'master_data': data.version, 'client': client.to_dict(),
+                      'items': [{'product': item.product.to_dict(), 'quantity': item.quantity} for item in items], 'details': transactional_details})
+
+def render_invoice_pdf(client, items, transactional_details, data, render_errors=True):
+    """Return (cache key, pdf bytes, line errors), calculating and rendering only on a cache miss.
+
+    Only invoices without line errors are cached and recorded in the ledger.
+    With render_errors=False an invoice with line errors is not rendered at
+    all and pdf bytes is None.
+    """
+    with span('pdf_cache_lookup'):
+        key = invoice_cache_key(client, items, transactional_details, data)
+        pdf_bytes = pdf_cache.get(key)
+        if pdf_bytes is not None and ledger.contains(key):
+            return key, pdf_bytes, []
+    with span('price_lookup'):
+        prices = data.prices(client.company_name, [item.product.description for item in items])
+    with span('calculate_invoice'):
+        invoice_data = calculate_invoice(client, items, prices)
+    errors = [item.error for item in invoice_data['items'] if item.error]
+    if errors and not render_errors:
+        return key, None, errors
+    if pdf_bytes is None:
+        with span('generate_pdf'):
+            pdf_bytes = generate_pdf_invoice(client, invoice_data, transactional_details).getvalue()
+        if not errors:
+            pdf_cache.put(key, pdf_bytes)
+    if not errors:
+        with span('ledger_record'):
+            ledger.record(key, client, invoice_data, transactional_details, pdf_bytes if LEDGER_STORE_PDFS else None)
+    return key, pdf_bytes, errors
+
+@app.route('/invoices/<key>/<filename>')
+def download_cached_invoice(key, filename):
+    """Re-download a previously generated invoice; answers If-None-Match with 304"""
+    pdf_bytes = pdf_cache.get(key) if len(key) == 64 and all(ch in '0123456789abcdef' for ch in key) else None
+    if pdf_bytes is None:
+        abort(404)
+    # The key is a hash of the content, so the bytes behind a URL never change
+    return send_file(io.BytesIO(pdf_bytes), as_attachment=True, download_name=filename, mimetype='application/pdf',
+                     etag=key, conditional=True, max_age=31536000)
+
+@app.route('/api/pdf-cache/stats')
+def pdf_cache_stats():
+    """Return hit/miss counters for the rendered-PDF cache"""
+    return jsonify(pdf_cache.stats())
+
+# --- Catalog Lookups ---
+def catalog_response(payload, data):
+    """JSON catalog lookup that browsers may cache; it only changes with the master-data version, its ETag"""
+    response = jsonify(payload)
+    response.set_etag(data.version)
+    response.cache_control.private = True
+    response.cache_control.max_age = CATALOG_MAX_AGE
+    return response.make_conditional(request)
+
+def search_args():
+    """(prefix, limit, after) from ?q=&limit=&cursor=; raises ValueError on a bad limit"""
+    limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+    return request.args.get('q', '').strip(), limit, request.args.get('cursor') or None
+
+@app.route('/api/clients')
+def search_clients():
+    """Typeahead search: clients whose name starts with ?q=, in name order, paged by ?cursor="""
+    data = master_data.get()
+    if data is None:
+        return jsonify({'error': 'Could not load master data'}), 500
+    try:
+        prefix, limit, after = search_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    clients, next_cursor = data.search_clients(prefix, limit, after)
+    return catalog_response({'clients': [client.to_dict() for client in clients], 'next_cursor': next_cursor}, data)
+
+@app.route('/api/products')
+def search_products():
+    """Typeahead search over product descriptions; ?company= limits it to the products that company has prices for"""
+    data = master_data.get()
+    if data is None:
+        return jsonify({'error': 'Could not load master data'}), 500
+    try:
+        prefix, limit, after = search_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    products, next_cursor = data.search_products(prefix, limit, after, company_name=request.args.get('company') or None)
+    return catalog_response({'products': [product.to_dict() for product in products], 'next_cursor': next_cursor}, data)
 
-# --- NEW: API endpoint to get company-specific products ---
 @app.route('/api/company-products/<company_name>')
 def get_company_products(company_name):
     """Return products available for a specific company"""
     try:
-        clients_df, products_df, pricing_df = load_data()
-        if pricing_df is None:
+        data = master_data.get()
+        if data is None:
             return jsonify({'error': 'Could not load pricing data'}), 500
         
-        # Get products for this company
-        company_products = pricing_df[pricing_df['CompanyName'] == company_name]['ProductDescription'].unique()
-        
-        # Filter products_df to only include available products
-        available_products = products_df[products_df['Description'].isin(company_products)]
+        # Products this company has a price for, in one indexed catalog query
+        products_list = data.company_products(company_name)
         
-        # Convert to list of dictionaries
-        products_list = available_products.to_dict('records')
-        
-        return jsonify({
+        return catalog_response({
             'success': True,
-            'products': products_list
-        })
+            'products': [product.to_dict() for product in products_list]
+        }, data)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/master-data/stats')
+def master_data_stats():
+    """Return cache counters for the in-memory master data"""
+    return jsonify(master_data.stats())
+
+# --- Metrics ---
+# Stage spans (metrics.span), per-table PDF timings and per-endpoint request times,
+# all per worker process. PROFILE_DIR additionally dumps a cProfile per request.
+request_profiler = RequestProfiler(PROFILE_DIR) if PROFILE_DIR else None
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.profiler = request_profiler.start() if request_profiler is not None else None
+
+@app.after_request
+def observe_request_time(response):
+    if getattr(g, 'profiler', None) is not None:
+        request_profiler.stop(g.profiler, request.endpoint or 'unknown')
+        g.profiler = None
+    started = getattr(g, 'request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.endpoint or 'unknown', request.method, str(response.status_code))
+    return response
+
+@app.teardown_request
+def release_request_profiler(error):
+    # after_request is skipped when a view raises; never leave the profiler running
+    if getattr(g, 'profiler', None) is not None:
+        request_profiler.stop(g.profiler, request.endpoint or 'unknown')
+        g.profiler = None
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this worker's timing histograms"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 # --- Main Routes ---
 @app.route('/')
 def index():
-    clients_df, products_df, pricing_df = load_data()
-    if clients_df is None:
+    data = master_data.get()
+    if data is None:
         return "Error loading data files. Please check if CSV files exist."
     
-    clients = clients_df.to_dict('records')
-    products = products_df.to_dict('records')
-    
-    return render_template('index.html', clients=clients, products=products)
+    # Clients and products are looked up by the page itself (/api/clients, /api/products)
+    return render_template('index.html')
+
+def parse_invoice_form(form, data):
+    """Read the invoice page's form: (client, OrderLines, transactional_details, error message).
+
+    transactional_details['invoice_no'] is '' when the form leaves it blank;
+    the caller decides whether to allocate one.
+    """
+    client_name = form.get('client')
+    client = data.client(client_name)
+    if client is None:
+        return None, [], None, f"Client '{client_name}' not found."
+
+    # Process products and quantities from dynamic form
+    items = []
+    form_data = form.to_dict()
+
+    # Extract product information from hidden fields
+    i = 0
+    while f'qty_{i}' in form_data:
+        quantity = form_data.get(f'qty_{i}', '0')
+
+        if quantity and float(quantity) > 0:
+            product = Product(
+                form_data.get(f'product_desc_{i}'),
+                form_data.get(f'product_hsn_{i}'),
+                float(form_data.get(f'product_gst_{i}', 0)),
+                form_data.get(f'product_unit_{i}')
+            )
+
+            items.append(OrderLine(product, float(quantity)))
+        i += 1
+
+    if not items:
+        return client, [], None, "No products selected or quantities are zero."
+
+    transactional_details = {
+        'invoice_no': form.get('invoice_no') or '',
+        'invoice_date': format_invoice_date(form.get('invoice_date')),  # Use the date from form instead of current date
+        'po_number': form.get('po_number', '')
+    }
+    return client, items, transactional_details, None
 
 @app.route('/', methods=['POST'])
 def generate_invoice():
     try:
-        clients_df, products_df, pricing_df = load_data()
-        if clients_df is None:
+        with span('master_data'):
+            data = master_data.get()
+        if data is None:
             return "Error loading data files."
         
-        # Get form data
-        client_name = request.form.get('client')
-        invoice_no = request.form.get('invoice_no')
-        po_number = request.form.get('po_number', '')
-        invoice_date = request.form.get('invoice_date')
+        with span('parse_form'):
+            client, items, transactional_details, error = parse_invoice_form(request.form, data)
+        if error:
+            return error
         
-        # Convert the date format from YYYY-MM-DD to DD/MM/YYYY for display
-        if invoice_date:
-            try:
-                # Parse the date from HTML date input (YYYY-MM-DD format)
-                date_obj = datetime.datetime.strptime(invoice_date, '%Y-%m-%d')
-                # Format it as DD/MM/YYYY for the invoice
-                formatted_date = date_obj.strftime('%d/%m/%Y')
-            except ValueError:
-                # Fallback to current date if parsing fails
-                formatted_date = datetime.datetime.now().strftime('%d/%m/%Y')
+        if transactional_details['invoice_no']:
+            claim_invoice_number(client.company_name, transactional_details['invoice_no'])
         else:
-            # Use current date if no date provided
-            formatted_date = datetime.datetime.now().strftime('%d/%m/%Y')
-        
-        # Find client
-        client_row = clients_df[clients_df['Company Name'] == client_name]
-        if client_row.empty:
-            return f"Client '{client_name}' not found."
+            # Only an invoice the ledger will record may use up a number: calculate it first, and
+            # leave one with line errors unnumbered (it can still be rendered with a number typed in)
+            with span('price_lookup'):
+                prices = data.prices(client.company_name, [item.product.description for item in items])
+            with span('calculate_invoice'):
+                errors = [item.error for item in calculate_invoice(client, items, prices)['items'] if item.error]
+            if errors:
+                return f"Invoice not numbered: {'; '.join(errors)}. Fix these lines, or enter an invoice number to generate it anyway."
+            transactional_details['invoice_no'] = next_invoice_number(client.company_name, request.form.get('invoice_date'))
         
-        client = client_row.iloc[0].to_dict()
+        # Calculate and render, unless this exact invoice was generated before
+        etag, pdf_bytes, errors = render_invoice_pdf(client, items, transactional_details, data)
+        filename = invoice_filename(transactional_details['invoice_no'], client.company_name)
         
-        # Process products and quantities from dynamic form
-        items = []
-        form_data = request.form.to_dict()
-        
-        # Extract product information from hidden fields
-        i = 0
-        while f'qty_{i}' in form_data:
-            quantity = form_data.get(f'qty_{i}', '0')
-            
-            if quantity and float(quantity) > 0:
-                product = {
-                    'Description': form_data.get(f'product_desc_{i}'),
-                    'HSN_SAC': form_data.get(f'product_hsn_{i}'),
-                    'GSt_Rate': float(form_data.get(f'product_gst_{i}', 0)),
-                    'Unit': form_data.get(f'product_unit_{i}')
-                }
-                
-                items.append({
-                    'product': product,
-                    'quantity': float(quantity)
-                })
-            i += 1
-        
-        if not items:
-            return "No products selected or quantities are zero."
-        
-        # Calculate invoice
-        invoice_data = calculate_invoice(client, items, pricing_df)
-        
-        # Generate PDF - Use the formatted date from form input
-        transactional_details = {
-            'invoice_no': invoice_no,
-            'invoice_date': formatted_date,  # Use the date from form instead of current date
-            'po_number': po_number
-        }
-        
-        pdf_buffer = generate_pdf_invoice(client, invoice_data, transactional_details)
-        
-        return send_file(
-            pdf_buffer,
-            as_attachment=True,
-            download_name=f'Invoice_{invoice_no}_{client_name.replace(" ", "_")}.pdf',
-            mimetype='application/pdf'
-        )
+        with span('send_file'):
+            response = send_file(
+                io.BytesIO(pdf_bytes),
+                as_attachment=True,
+                download_name=filename,
+                mimetype='application/pdf',
+                etag=etag
+            )
+        if not errors:
+            response.headers['Content-Location'] = url_for('download_cached_invoice', key=etag, filename=filename)
+        return response
         
     except Exception as e:
         return f"Error generating invoice: {str(e)}"
 
+# --- Previews: HTML, JSON and e-invoice renderings of the same calculation ---
+PREVIEW_FORMATS = ('json', 'html', 'einvoice')
+
+def build_invoice_document(client, items, transactional_details, data):
+    """Price and calculate the invoice as for a PDF, but return the format-neutral InvoiceDocument"""
+    with span('price_lookup'):
+        prices = data.prices(client.company_name, [item.product.description for item in items])
+    with span('calculate_invoice'):
+        invoice_data = calculate_invoice(client, items, prices)
+    with span('invoice_document'):
+        return invoice_document(client, invoice_data, transactional_details)
+
+def render_preview_html(document):
+    with span('render_html'):
+        return render_template('invoice_preview.html', invoice=document)
+
+@app.route('/preview', methods=['POST'])
+def preview_invoice():
+    """The invoice page's form as an HTML preview; renders no PDF and allocates no invoice number"""
+    try:
+        data = master_data.get()
+        if data is None:
+            return "Error loading data files."
+        with span('parse_form'):
+            client, items, transactional_details, error = parse_invoice_form(request.form, data)
+        if error:
+            return error
+        return render_preview_html(build_invoice_document(client, items, transactional_details, data))
+    except Exception as e:
+        return f"Error previewing invoice: {str(e)}"
+
+@app.route('/api/invoices/preview', methods=['POST'])
+def preview_invoice_api():
+    """Calculate a JSON invoice (as for POST /api/invoices) and return it as ?format=json (default), html or einvoice.
+
+    Nothing is rendered, recorded or numbered. The e-invoice (IRN) payload
+    needs an invoice_no and an invoice without line errors, else 422.
+    """
+    output_format = request.args.get('format', 'json')
+    if output_format not in PREVIEW_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(PREVIEW_FORMATS)}"}), 400
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON invoice object'}), 400
+    data = master_data.get()
+    if data is None:
+        return jsonify({'error': 'Could not load master data'}), 500
+
+    spec = normalize_spec(payload)
+    if not spec['errors']:
+        client, items, transactional_details, spec['errors'] = resolve_invoice_spec(spec, data)
+    if spec['errors']:
+        return jsonify({'error': 'Invalid invoice', 'errors': spec['errors']}), 422
+    document = build_invoice_document(client, items, transactional_details, data)
+
+    if output_format == 'html':
+        return render_preview_html(document)
+    if output_format == 'einvoice':
+        try:
+            with span('render_einvoice'):
+                return jsonify(einvoice_payload(document))
+        except EInvoiceError as e:
+            return jsonify({'error': str(e)}), 422
+    with span('render_json'):
+        return jsonify(document_to_dict(document))
+
+# --- Batch Generation ---
+def resolve_invoice_spec(spec, data):
+    """Look up a normalized spec's client, products and prices: (client, items, transactional_details, errors)"""
+    client = data.client(spec['client'])
+    if client is None:
+        return None, [], None, [f"Client '{spec['client']}' not found."]
+    descriptions = [line['product'] for line in spec['items']]
+    products, prices = data.products_by_description(descriptions), data.prices(spec['client'], descriptions)
+    items, errors = [], []
+    for line in spec['items']:
+        product = products.get(line['product'])
+        if product is None:
+            errors.append(f"PRODUCT NOT FOUND for '{line['product']}'"); continue
+        if line['product'] not in prices:
+            errors.append(f"PRICE NOT FOUND for '{line['product']}'"); continue
+        items.append(OrderLine(product, line['quantity']))
+    transactional_details = {'invoice_no': spec['invoice_no'], 'invoice_date': format_invoice_date(spec['invoice_date']), 'po_number': spec['po_number']}
+    return client, items, transactional_details, errors
+
+def number_batch_specs(specs, data):
+    """Give the specs without an invoice_no the next numbers of their series.
+
+    They are validated here first and only valid ones are numbered, so an
+    invoice that fails validation uses up no number. Numbers already given
+    are claimed, so the series never hands them out again.
+    """
+    for spec in specs:
+        if spec['errors']:
+            continue
+        if spec['invoice_no']:
+            claim_invoice_number(spec['client'], spec['invoice_no'])
+            continue
+        _, _, _, errors = resolve_invoice_spec(spec, data)
+        if errors:
+            spec['errors'] = errors
+        else:
+            spec['invoice_no'] = next_invoice_number(spec['client'], spec['invoice_date'])
+
+def render_invoice_spec(spec):
+    """Calculate and render one batch invoice spec.
+
+    Runs inside the batch process pool, so it works from the worker's own
+    master-data cache and returns plain picklable values:
+    (spec, filename, pdf_bytes, errors).
+    """
+    if spec['errors']:
+        return spec, None, None, spec['errors']
+    try:
+        data = master_data.get()
+        if data is None:
+            return spec, None, None, ['Error loading data files.']
+        client, items, transactional_details, errors = resolve_invoice_spec(spec, data)
+        if errors:
+            return spec, None, None, errors
+
+        _, pdf_bytes, errors = render_invoice_pdf(client, items, transactional_details, data, render_errors=False)
+        if errors:
+            return spec, None, None, errors
+        return spec, invoice_filename(spec['invoice_no'], spec['client']), pdf_bytes, []
+    except Exception as e:
+        return spec, None, None, [f"Error generating invoice: {str(e)}"]
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def get_batch_pool():
+    """Process pool shared by all batch requests and render jobs of this worker, started on first use"""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            # spawn rather than fork: the web worker may be running threads holding locks
+            _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _batch_pool
+
+def render_batch(specs):
+    """Render specs in parallel, yielding results in input order"""
+    if BATCH_WORKERS <= 1 or len(specs) == 1:
+        return map(render_invoice_spec, specs)
+    # A couple of tasks per worker keeps every process busy while holding only a few PDFs at a time
+    return bounded_map(get_batch_pool(), render_invoice_spec, specs, window=BATCH_WORKERS * 2)
+
+@app.route('/api/invoices/batch', methods=['POST'])
+def generate_invoice_batch():
+    """Generate many invoices from a JSON list or CSV upload and return them as a ZIP (streamed with ?stream=1)"""
+    try:
+        if request.is_json:
+            specs = parse_json_batch(request.get_json(silent=True))
+        else:
+            upload = request.files.get('file')
+            text = upload.read().decode('utf-8-sig') if upload else request.get_data(as_text=True)
+            specs = parse_csv_batch(text)
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if any(not spec['invoice_no'] for spec in specs):
+        data = master_data.get()
+        if data is None:
+            return jsonify({'error': 'Could not load master data'}), 500
+        number_batch_specs(specs, data)
+
+    return batch_zip_response(specs)
+
+def batch_zip_response(specs):
+    if request.args.get('stream') in ('1', 'true'):
+        # Send each PDF as soon as it is rendered; per-invoice results are in manifest.csv at the end
+        response = Response(stream_with_context(iter_zip(render_batch(specs))), mimetype='application/zip')
+        response.headers['Content-Disposition'] = 'attachment; filename=invoices.zip'
+        response.headers['X-Batch-Count'] = str(len(specs))
+        return response
+
+    try:
+        zip_buffer, succeeded, failed = build_zip(render_batch(specs))
+    except Exception as e:
+        return jsonify({'error': f"Error generating batch: {str(e)}"}), 500
+
+    response = send_file(zip_buffer, as_attachment=True, download_name='invoices.zip', mimetype='application/zip')
+    response.headers['X-Batch-Succeeded'] = str(succeeded)
+    response.headers['X-Batch-Failed'] = str(failed)
+    return response
+
+# --- Order Import ---
+def price_orders(orders, data):
+    """Validate and price imported orders against the catalog with one joined lookup for all of their lines.
+
+    Fills in each order's errors ('Row n: PRICE NOT FOUND for ...') and returns
+    the preview: one dict per order with its priced lines and totals.
+    """
+    resolved = data.lookup_order_lines((order['client'], line['product']) for order in orders for line in order['items'])
+    clients = {}
+    preview = []
+    for order in orders:
+        client_name, errors = order['client'], order['errors']
+        lines, items, priced_rows, prices = [], [], [], {}
+        client_found = bool(order['items']) and resolved[(client_name, order['items'][0]['product'])][0]
+        if order['items'] and client_name and not client_found:
+            errors.append(f"Client '{client_name}' not found.")
+        for line in order['items'] if client_found else []:
+            _, product, entry = resolved[(client_name, line['product'])]
+            if product is None:
+                errors.append(f"Row {line['row']}: PRODUCT NOT FOUND for '{line['product']}'")
+                lines.append({'row': line['row'], 'product': line['product'], 'quantity': line['quantity'], 'error': 'PRODUCT NOT FOUND'}); continue
+            if entry is not None:
+                prices[product.description] = entry
+            items.append(OrderLine(product, line['quantity'])); priced_rows.append(line['row'])
+
+        invoice = {'client': client_name, 'invoice_no': order['invoice_no'], 'invoice_date': order['invoice_date'], 'po_number': order['po_number']}
+        if items:
+            if client_name not in clients:
+                clients[client_name] = data.client(client_name)
+            invoice_data = calculate_invoice(clients[client_name], items, prices)
+            for row, item in zip(priced_rows, invoice_data['items']):
+                if item.error:
+                    errors.append(f'Row {row}: {item.error}')
+                lines.append({'row': row, 'product': item.description, 'hsn_sac': item.hsn_sac, 'quantity': item.quantity, 'unit': item.unit,
+                              'rate': str(item.rate), 'gst_rate': item.gst_rate, 'amount': str(item.amount), 'error': item.error})
+            lines.sort(key=lambda line: line['row'])
+            invoice.update({'subtotal': str(invoice_data['subtotal']), 'total_tax': str(invoice_data['total_tax']), 'grand_total': str(invoice_data['grand_total'])})
+        invoice.update({'lines': lines, 'errors': errors, 'valid': not errors})
+        preview.append(invoice)
+    return preview
+
+@app.route('/api/orders/import', methods=['POST'])
+def import_orders():
+    """Upload an XLSX or CSV of order lines: returns a priced preview, or with ?generate=1 the invoices as a ZIP like /api/invoices/batch"""
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': "Upload the order sheet as the 'file' field"}), 400
+    try:
+        with span('order_import_read'):
+            orders = group_orders(iter_order_rows(upload.stream, upload.filename or ''))
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f"Could not read the order sheet: {str(e)}"}), 400
+
+    data = master_data.get()
+    if data is None:
+        return jsonify({'error': 'Could not load master data'}), 500
+    with span('order_import_price'):
+        preview = price_orders(orders, data)
+
+    if request.args.get('generate') in ('1', 'true'):
+        # Invalid orders come out as failures in the ZIP's manifest; valid ones without a number get the next one
+        number_batch_specs(orders, data)
+        return batch_zip_response(orders)
+
+    valid = sum(invoice['valid'] for invoice in preview)
+    summary = {'invoices': len(preview), 'valid': valid, 'invalid': len(preview) - valid, 'lines': sum(len(order['items']) for order in orders),
+               'grand_total': str(sum((Decimal(invoice['grand_total']) for invoice in preview if invoice['valid']), Decimal(0)))}
+    return jsonify({'summary': summary, 'invoices': preview})
+
+# --- Invoice API ---
+# Jobs are keyed by the invoice's PDF cache key: resubmitting an identical
+# invoice joins the existing job, and any worker process can serve a finished
+# PDF from the shared disk cache even if another worker rendered it.
+render_jobs = JobStore(max_jobs=RENDER_JOB_HISTORY)
+
+def finish_render_job(job_id, future):
+    """Done-callback of a queued render: keep the PDF and record the outcome"""
+    try:
+        _, _, pdf_bytes, errors = future.result()
+    except Exception as e:
+        pdf_bytes, errors = None, [f"Error generating invoice: {str(e)}"]
+    if pdf_bytes is not None:
+        pdf_cache.put(job_id, pdf_bytes)
+    render_jobs.finish(job_id, errors)
+
+def job_status(job):
+    status = {key: job[key] for key in ('id', 'status', 'errors', 'submitted_at', 'finished_at')}
+    status['status_url'] = url_for('invoice_job_status', job_id=job['id'])
+    if job['status'] == DONE:
+        status['download_url'] = url_for('download_cached_invoice', key=job['id'], filename=job['filename'])
+    return status
+
+@app.route('/api/invoices', methods=['POST'])
+def submit_invoice():
+    """Validate a JSON invoice and queue it for rendering; answers 202 with the job id"""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON invoice object'}), 400
+    data = master_data.get()
+    if data is None:
+        return jsonify({'error': 'Could not load master data'}), 500
+
+    spec = normalize_spec(payload)
+    if not spec['errors']:
+        client, items, transactional_details, spec['errors'] = resolve_invoice_spec(spec, data)
+    if spec['errors']:
+        return jsonify({'error': 'Invalid invoice', 'errors': spec['errors']}), 422
+    if spec['invoice_no']:
+        claim_invoice_number(spec['client'], spec['invoice_no'])
+    else:
+        spec['invoice_no'] = transactional_details['invoice_no'] = next_invoice_number(spec['client'], spec['invoice_date'])
+
+    job_id = invoice_cache_key(client, items, transactional_details, data)
+    job, created = render_jobs.create(job_id, filename=invoice_filename(spec['invoice_no'], spec['client']))
+    if created:
+        # As in render_invoice_pdf, a cached PDF only counts once the ledger has the invoice;
+        # otherwise the job calculates and records it, reusing the cached PDF
+        if pdf_cache.get(job_id) is not None and ledger.contains(job_id):
+            render_jobs.finish(job_id, [])
+        else:
+            try:
+                get_batch_pool().submit(render_invoice_spec, spec).add_done_callback(partial(finish_render_job, job_id))
+            except Exception as e:
+                render_jobs.finish(job_id, [f"Error queueing invoice: {str(e)}"])
+        job = render_jobs.get(job_id)
+    return jsonify(job_status(job)), 202, {'Location': url_for('invoice_job_status', job_id=job_id)}
+
+@app.route('/api/invoices/jobs/<job_id>')
+def invoice_job_status(job_id):
+    """Poll a render job: queued, done (with download_url) or failed (with errors)"""
+    job = render_jobs.get(job_id)
+    if job is None:
+        # Submitted to another worker process; finished renders are in the shared cache
+        if pdf_cache.get(job_id) is None:
+            return jsonify({'error': f"Unknown job '{job_id}'"}), 404
+        job = {'id': job_id, 'status': DONE, 'errors': [], 'submitted_at': None, 'finished_at': None, 'filename': f'Invoice_{job_id[:12]}.pdf'}
+    return jsonify(job_status(job))
+
+@app.route('/api/invoices/jobs/stats')
+def invoice_job_stats():
+    """Return job counts by status for this worker"""
+    return jsonify(render_jobs.stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,194 @@
+import collections
+import csv
+import datetime
+import io
+import zipfile
+
+# A CSV batch upload has one row per line item: client, invoice_no,
+# invoice_date, po_number, product, quantity. Rows sharing an invoice_no
+# (and client) are grouped into one invoice. invoice_no may be left blank:
+# a client's blank-numbered rows then form one invoice, numbered by the app.
+REQUIRED_CSV_COLUMNS = ['client', 'product', 'quantity']
+MANIFEST_COLUMNS = ['invoice_no', 'client', 'status', 'file', 'errors']
+
+
+class BatchError(ValueError):
+    """The batch payload as a whole is unusable (as opposed to one bad invoice in it)."""
+
+
+def _clean(value):
+    return '' if value is None else str(value).strip()
+
+
+def normalize_spec(raw):
+    """Turn one raw invoice spec into a clean dict; problems are collected in spec['errors']."""
+    if not isinstance(raw, dict):
+        return {'client': '', 'invoice_no': '', 'invoice_date': '', 'po_number': '', 'items': [], 'errors': ['Invoice spec must be an object']}
+    spec = {
+        'client': _clean(raw.get('client')),
+        'invoice_no': _clean(raw.get('invoice_no')),
+        'invoice_date': _clean(raw.get('invoice_date')),
+        'po_number': _clean(raw.get('po_number')),
+        'items': [],
+        'errors': [],
+    }
+    if not spec['client']: spec['errors'].append('Missing client')
+    if spec['invoice_date']:
+        try:
+            datetime.datetime.strptime(spec['invoice_date'], '%Y-%m-%d')
+        except ValueError:
+            spec['errors'].append(f"Invalid invoice_date '{spec['invoice_date']}' (expected YYYY-MM-DD)")
+
+    raw_items = raw.get('items') or []
+    if not isinstance(raw_items, list):
+        raw_items = []
+        spec['errors'].append('items must be a list')
+    for item in raw_items:
+        product = _clean(item.get('product') or item.get('description')) if isinstance(item, dict) else ''
+        quantity = item.get('quantity') if isinstance(item, dict) else None
+        try:
+            quantity = float(quantity)
+        except (TypeError, ValueError):
+            spec['errors'].append(f"Invalid quantity {quantity!r} for '{product}'"); continue
+        if not product:
+            spec['errors'].append('Line item without a product'); continue
+        if quantity > 0:
+            spec['items'].append({'product': product, 'quantity': quantity})
+    if not spec['items'] and not spec['errors']:
+        spec['errors'].append('No products selected or quantities are zero.')
+    return spec
+
+
+def parse_json_batch(payload):
+    """Accept either a list of invoice specs or {"invoices": [...]}."""
+    if isinstance(payload, dict):
+        payload = payload.get('invoices')
+    if not isinstance(payload, list) or not payload:
+        raise BatchError('Expected a non-empty list of invoices')
+    return [normalize_spec(raw) for raw in payload]
+
+
+def parse_csv_batch(text):
+    """Group CSV line-item rows into invoice specs, keeping first-seen invoice order."""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [c for c in REQUIRED_CSV_COLUMNS if c not in (reader.fieldnames or [])]
+    if missing:
+        raise BatchError(f"CSV is missing column(s): {', '.join(missing)}")
+    grouped = {}
+    for row in reader:
+        key = (_clean(row.get('invoice_no')), _clean(row.get('client')))
+        raw = grouped.setdefault(key, {'client': row.get('client'), 'invoice_no': row.get('invoice_no'), 'invoice_date': row.get('invoice_date'), 'po_number': row.get('po_number'), 'items': []})
+        raw['items'].append({'product': row.get('product'), 'quantity': row.get('quantity')})
+    if not grouped:
+        raise BatchError('CSV contains no invoice rows')
+    return [normalize_spec(raw) for raw in grouped.values()]
+
+
+def manifest_row(spec, filename, errors):
+    return {
+        'invoice_no': spec['invoice_no'],
+        'client': spec['client'],
+        'status': 'error' if errors else 'ok',
+        'file': filename or '',
+        'errors': '; '.join(errors),
+    }
+
+
+def manifest_csv(rows):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=MANIFEST_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def unique_name(filename, used_names):
+    """Suffix repeated archive names (the same invoice listed twice) so no entry is shadowed."""
+    stem, dot, ext = filename.rpartition('.')
+    candidate, n = filename, 1
+    while candidate in used_names:
+        n += 1
+        candidate = f"{stem}_{n}{dot}{ext}"
+    used_names.add(candidate)
+    return candidate
+
+
+def _write_entries(zf, results, summary):
+    """Write each successful PDF and finally manifest.csv to zf, yielding after every entry."""
+    rows, used_names = [], set()
+    for spec, filename, pdf_bytes, errors in results:
+        if not errors:
+            filename = unique_name(filename, used_names)
+            # PDF page streams are already compressed; deflating them again only costs CPU.
+            zf.writestr(filename, pdf_bytes, compress_type=zipfile.ZIP_STORED)
+        rows.append(manifest_row(spec, filename if not errors else None, errors))
+        yield
+    zf.writestr('manifest.csv', manifest_csv(rows))
+    summary['succeeded'] = sum(1 for row in rows if row['status'] == 'ok')
+    summary['failed'] = len(rows) - summary['succeeded']
+
+
+def build_zip(results):
+    """Pack (spec, filename, pdf_bytes, errors) results plus a manifest.csv into a ZIP.
+
+    Returns (buffer, succeeded, failed).
+    """
+    buffer, summary = io.BytesIO(), {}
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for _ in _write_entries(zf, results, summary):
+            pass
+    buffer.seek(0)
+    return buffer, summary['succeeded'], summary['failed']
+
+
+class ZipStreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that zipfile writes into and iter_zip drains.
+
+    Because it cannot seek, zipfile falls back to data descriptors and never
+    goes back to patch earlier bytes, so drained chunks can be sent right away.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(results):
+    """Yield the same archive as build_zip() chunk by chunk, one invoice at a time.
+
+    Only the entry being written is buffered, so memory does not grow with the
+    number of invoices.
+    """
+    stream, summary = ZipStreamBuffer(), {}
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for _ in _write_entries(zf, results, summary):
+            chunk = stream.drain()
+            if chunk:
+                yield chunk
+    yield stream.drain()
+
+
+def bounded_map(executor, fn, iterable, window):
+    """Like executor.map(), but with at most `window` tasks in flight.
+
+    Executor.map() submits everything up front, so finished results pile up in
+    memory when the consumer (e.g. a slow download) falls behind.
+    """
+    pending = collections.deque()
+    for arg in iterable:
+        pending.append(executor.submit(fn, arg))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,939 @@
+"""Micro-benchmarks for the invoice generator.
+
+Run from the project directory, e.g.:
+
+    python benchmark.py pricing
+    python benchmark.py pricing --sizes 1000,100000,1000000
+    python benchmark.py calc
+    python benchmark.py batch --workers 1,2,4
+    python benchmark.py render
+    python benchmark.py layout --lines 10,100,1000
+    python benchmark.py pdfsize --lines 3,10,100
+    python benchmark.py formats --lines 3,10,100
+    python benchmark.py ledger --invoices 300000
+    python benchmark.py words --count 2000000
+    python benchmark.py startup
+    python benchmark.py numbers --processes 1,4,8 --allocations 20000
+    python benchmark.py suite --clients 10000 --pricing-rows 1000000 --output before.json
+    python benchmark.py load --configs sync:2,gthread:2x4 --concurrency 16 --lines 5,50 --output load.json
+    python benchmark.py compare before.json after.json
+"""
+import argparse
+import contextlib
+import dataclasses
+import datetime
+import http.client
+from decimal import Decimal
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from catalog import Catalog, import_catalog, read_master_csvs, source_version
+from master_data import MasterDataStore
+from pdf_cache import PdfCache
+from records import Client, Product, PriceEntry, OrderLine
+from invoice_numbers import InvoiceNumberAllocator
+import amount_words
+import invoice_model
+from ledger import InvoiceLedger
+import app
+
+
+# --- Synthetic master data ---
+def synthetic_master_data(n_clients, n_products, n_pricing_rows, seed=42):
+    """Return (clients_df, products_df, pricing_df) shaped like load_data() output."""
+    rng = random.Random(seed)
+    client_names = [f'Client {i:06d} Pvt Ltd' for i in range(n_clients)]
+    descriptions = [f'Product {i:06d}' for i in range(n_products)]
+    clients_df = pd.DataFrame({
+        'Company Name': client_names,
+        'Address': [f'Plot {i}, Hyderabad, Telangana' for i in range(n_clients)],
+        'GSTIN': [f'36AAAAA{i:04d}A1Z{i % 10}' for i in range(n_clients)],
+        'State': 'Telangana',
+        'LayoutTemplate': ['SEZ' if i % 4 == 0 else 'Standard' for i in range(n_clients)],
+        'TaxType': ['IGST' if i % 2 == 0 else 'CGST_SGST' for i in range(n_clients)],
+    })
+    products_df = pd.DataFrame({
+        'Description': descriptions,
+        'HSN_SAC': [str(9021090 + i % 50) for i in range(n_products)],
+        'GSt_Rate': [rng.choice([5, 12, 18]) for _ in range(n_products)],
+        'Unit': [rng.choice(['nos', 'kgs']) for _ in range(n_products)],
+    })
+    pricing_df = pd.DataFrame({
+        'CompanyName': [client_names[i % n_clients] for i in range(n_pricing_rows)],
+        'ProductDescription': [descriptions[(i // n_clients) % n_products] for i in range(n_pricing_rows)],
+        'Price': [round(rng.uniform(1, 1000), 2) for _ in range(n_pricing_rows)],
+    })
+    return clients_df, products_df, pricing_df
+
+
+def synthetic_items(client_name, pricing_df, n_lines, products_df):
+    """Build calculate_invoice() line items for products the client has prices for."""
+    priced = pricing_df.loc[pricing_df['CompanyName'] == client_name, 'ProductDescription'].tolist()
+    by_desc = products_df.set_index('Description')
+    items = []
+    for i in range(n_lines):
+        desc = priced[i % len(priced)]
+        row = by_desc.loc[desc]
+        items.append(OrderLine(Product(desc, row['HSN_SAC'], row['GSt_Rate'], row['Unit']), 1 + i % 7))
+    return items
+
+
+def best_of(fn, repeat=5, number=1):
+    """Best per-call wall time in seconds over `repeat` runs of `number` calls."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+# --- Benchmarks ---
+def bench_pricing(args):
+    """Per-line price lookup cost: indexed catalog query vs the old DataFrame boolean filter."""
+    n_lines = args.lines
+    print(f"{'pricing rows':>12} {'import':>10} {'catalog/line':>13} {'filter/line':>12} {'company products':>17}")
+    for size in args.sizes:
+        n_clients = max(1, size // 50)
+        clients_df, products_df, pricing_df = synthetic_master_data(n_clients, 200, size)
+        client_name = clients_df['Company Name'].iat[0]
+        items = synthetic_items(client_name, pricing_df, n_lines, products_df)
+        descriptions = [item.product.description for item in items]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'catalog.db')
+            start = time.perf_counter()
+            import_catalog(db_path, clients_df, products_df, pricing_df, 'bench')
+            import_time = time.perf_counter() - start
+            catalog = Catalog(db_path)
+
+            catalog_time = best_of(lambda: catalog.prices(client_name, descriptions), number=1000) / n_lines
+
+            def filter_lookup():
+                for desc in descriptions:
+                    pricing_df[(pricing_df['CompanyName'] == client_name) & (pricing_df['ProductDescription'] == desc)]
+            filter_time = best_of(filter_lookup, repeat=3) / n_lines
+            products_time = best_of(lambda: catalog.company_products(client_name), number=1000)
+
+        print(f"{size:>12,} {import_time:>9.2f}s {catalog_time * 1e6:>11.2f}us {filter_time * 1e6:>10.0f}us {products_time * 1e6:>15.2f}us")
+
+
+def bench_calc(args):
+    """calculate_invoice() wall time per invoice for IGST and CGST/SGST clients."""
+    clients_df, products_df, pricing_df = synthetic_master_data(10, 200, 2_000)
+    client_name = clients_df['Company Name'].iat[0]
+    prices = {desc: PriceEntry(client_name, desc, Decimal(str(price)))
+              for desc, price in pricing_df.loc[pricing_df['CompanyName'] == client_name, ['ProductDescription', 'Price']].values}
+    print(f"{'lines':>6} {'IGST':>12} {'CGST/SGST':>12}")
+    for n_lines in args.lines:
+        items = synthetic_items(client_name, pricing_df, n_lines, products_df)
+        timings = []
+        for tax_type in ('IGST', 'CGST_SGST'):
+            client = Client(client_name, tax_type=tax_type)
+            timings.append(best_of(lambda: app.calculate_invoice(client, items, prices), number=200))
+        print(f"{n_lines:>6} " + ' '.join(f"{t * 1e6:>10.1f}us" for t in timings))
+
+
+LAYOUT_COMBINATIONS = [('SEZ', 'IGST'), ('Standard', 'IGST'), ('Standard', 'CGST_SGST')]
+
+
+def sample_invoice(n_lines, layout_template, tax_type):
+    """(client, invoice_data, transactional_details) for an n-line invoice on the real catalog."""
+    data = app.master_data.get()
+    client_name, products = max(((name, data.company_products(name)) for name in data.company_names()), key=lambda kv: len(kv[1]))
+    client = dataclasses.replace(data.client(client_name), layout_template=layout_template, tax_type=tax_type)
+    items = [OrderLine(products[i % len(products)], 1 + i % 7) for i in range(n_lines)]
+    invoice_data = app.calculate_invoice(client, items, data.prices(client_name, [p.description for p in products]))
+    return client, invoice_data, {'invoice_no': 'BENCH-1', 'invoice_date': '01/04/2025', 'po_number': 'PO-1'}
+
+
+def bench_render(args):
+    """generate_pdf_invoice() wall time per invoice for each LayoutTemplate/TaxType."""
+    print(f"{'layout':>22} {'lines':>6} {'ms/invoice':>11}")
+    for layout_template, tax_type in LAYOUT_COMBINATIONS:
+        for n_lines in args.lines:
+            invoice = sample_invoice(n_lines, layout_template, tax_type)
+            elapsed = best_of(lambda: app.generate_pdf_invoice(*invoice), repeat=args.repeat, number=10)
+            print(f"{layout_template + '+' + tax_type:>22} {n_lines:>6} {elapsed * 1e3:>11.2f}")
+
+
+def bench_layout(args):
+    """Multi-page render cost per line; ms/line should stay flat as invoices grow."""
+    print(f"{'layout':>22} {'lines':>6} {'pages':>6} {'ms/invoice':>11} {'ms/line':>8}")
+    for layout_template, tax_type in LAYOUT_COMBINATIONS:
+        for n_lines in args.lines:
+            invoice = sample_invoice(n_lines, layout_template, tax_type)
+            pages = app.generate_pdf_invoice(*invoice).getvalue().count(b'/Type /Page\n')
+            elapsed = best_of(lambda: app.generate_pdf_invoice(*invoice), repeat=args.repeat)
+            print(f"{layout_template + '+' + tax_type:>22} {n_lines:>6} {pages:>6} {elapsed * 1e3:>11.1f} {elapsed * 1e3 / n_lines:>8.2f}")
+
+
+def bench_pdfsize(args):
+    """Bytes and render time per invoice in each PDF output mode, plus the size of 10,000 such invoices."""
+    from invoice_pdf import OUTPUT_MODES
+    print(f"{'mode':>9} {'lines':>6} {'bytes':>8} {'vs ascii':>9} {'ms/invoice':>11} {'MB/10k':>8}")
+    for n_lines in args.lines:
+        invoice = sample_invoice(n_lines, 'Standard', 'CGST_SGST')
+        baseline = None
+        for mode in OUTPUT_MODES:
+            size = len(app.generate_pdf_invoice(*invoice, output_mode=mode).getvalue())
+            baseline = baseline or size
+            elapsed = best_of(lambda: app.generate_pdf_invoice(*invoice, output_mode=mode), repeat=args.repeat, number=5)
+            print(f"{mode:>9} {n_lines:>6} {size:>8,} {size / baseline:>8.0%} {elapsed * 1e3:>11.2f} {size * 10_000 / 1e6:>8.1f}")
+
+
+def bench_formats(args):
+    """Time per invoice of each preview format (document model, HTML, JSON, e-invoice) next to the PDF render."""
+    print(f"{'format':>10} {'lines':>6} {'ms/invoice':>11} {'vs pdf':>7}")
+    for n_lines in args.lines:
+        client, invoice_data, transactional_details = sample_invoice(n_lines, 'Standard', 'CGST_SGST')
+
+        def document():
+            return invoice_model.invoice_document(client, invoice_data, transactional_details)
+
+        def html():
+            with app.app.app_context():
+                return app.render_preview_html(document())
+
+        formats = [
+            ('pdf', lambda: app.generate_pdf_invoice(client, invoice_data, transactional_details)),
+            ('document', document),
+            ('html', html),
+            ('json', lambda: json.dumps(invoice_model.document_to_dict(document()))),
+            ('einvoice', lambda: json.dumps(invoice_model.einvoice_payload(document()))),
+        ]
+        html()  # compile the template outside the timings
+        pdf_time = None
+        for name, fn in formats:
+            elapsed = best_of(fn, repeat=args.repeat, number=5 if name == 'pdf' else 50)
+            pdf_time = pdf_time or elapsed
+            print(f"{name:>10} {n_lines:>6} {elapsed * 1e3:>11.3f} {elapsed / pdf_time:>7.1%}")
+
+
+def bench_ledger(args):
+    """Ledger lookup latency (by number, client page, date range, deep cursor page, GST summaries) at a given size."""
+    client, invoice_data, transactional_details = sample_invoice(args.lines, 'Standard', 'CGST_SGST')
+    clients = [f'Client {i:04d}' for i in range(args.clients)]
+    start_date = datetime.date(2020, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = InvoiceLedger(os.path.join(tmp, 'ledger.db'))
+        start = time.perf_counter()
+        for n in range(args.invoices):
+            invoice_date = (start_date + datetime.timedelta(days=n % 1500)).strftime('%d/%m/%Y')
+            ledger.record(f'key-{n}', Client(clients[n % len(clients)]), invoice_data,
+                          dict(transactional_details, invoice_no=f'INV-{n:07d}', invoice_date=invoice_date))
+        load_time = time.perf_counter() - start
+        print(f"recorded {args.invoices:,} invoices in {load_time:.1f}s ({args.invoices / load_time:,.0f}/s)")
+
+        deep_cursor = None
+        for _ in range(args.invoices // 2 // 500):  # page halfway down the full listing
+            _, deep_cursor = ledger.search(limit=500, cursor=deep_cursor)
+        lookups = [
+            ('by invoice_no', lambda: ledger.search(invoice_no=f'INV-{args.invoices // 2:07d}')),
+            ('client, first page', lambda: ledger.search(client=clients[1], limit=50)),
+            ('date range page', lambda: ledger.search(date_from='2022-01-01', date_to='2022-01-31', limit=50)),
+            ('halfway page', lambda: ledger.search(limit=50, cursor=deep_cursor)),
+            ('full invoice', lambda: ledger.get(args.invoices // 2)),
+            ('gst summary, month', lambda: ledger.gst_summary('2022-01')),
+            ('gst summary, year', lambda: ledger.gst_summary('2022-04', '2023-03')),
+        ]
+        print(f"{'lookup':>20} {'ms':>8}")
+        for name, fn in lookups:
+            print(f"{name:>20} {best_of(fn, number=20) * 1e3:>8.3f}")
+
+
+WORD_VALUES = {**{w: i for i, w in enumerate(amount_words.ONES) if w}, **{w: i * 10 for i, w in enumerate(amount_words.TENS) if w}}
+
+
+def words_to_number(text):
+    """Inverse of integer_in_words(), used to check its output."""
+    total, current = 0, 0
+    for word in text.split():
+        if word == 'Hundred':
+            current *= 100
+        elif word in ('Thousand', 'Lakh'):
+            total += current * (1_000 if word == 'Thousand' else 100_000); current = 0
+        elif word == 'Crore':
+            total = (total + current) * 10_000_000; current = 0
+        else:
+            current += WORD_VALUES[word]
+    return total + current
+
+
+def words_to_paise(text):
+    """Parse amount_in_words() output back into a whole number of paise."""
+    if text == 'Zero':
+        return 0
+    text = text.removesuffix(' Only')
+    rupees, paise = '', text
+    if ' Rupees' in text:
+        rupees, _, paise = text.partition(' Rupees')
+        paise = paise.removeprefix(' and ')
+    return words_to_number(rupees) * 100 + words_to_number(paise.removesuffix(' Paise'))
+
+
+def bench_words(args):
+    """amount_in_words() correctness (words parsed back to the amount) and throughput, per amount and in bulk."""
+    rng = np.random.default_rng(7)
+    paise = rng.integers(0, 10**12, args.count)  # up to 1,000 crore
+    amounts = paise / 100
+
+    start = time.perf_counter()
+    words = amount_words.amounts_in_words(amounts)
+    batch_time = time.perf_counter() - start
+    wrong = sum(1 for text, expected in zip(words, paise.tolist()) if words_to_paise(text) != expected)
+    decimals = [Decimal(p).scaleb(-2) for p in paise[:args.scalar].tolist()]
+    wrong += sum(1 for d, text in zip(decimals, words) if amount_words.amount_in_words(d) != text)
+    print(f"checked {args.count:,} amounts: {wrong} wrong")
+
+    amount_words._words.cache_clear()
+    start = time.perf_counter()
+    for d in decimals:
+        amount_words.amount_in_words(d)
+    scalar_time = (time.perf_counter() - start) / len(decimals)
+    repeated = amounts[rng.integers(0, 1_000, args.count)]  # bulk exports repeat a few totals
+    start = time.perf_counter()
+    amount_words.amounts_in_words(repeated)
+    repeated_time = time.perf_counter() - start
+
+    print(f"{'mode':>28} {'us/amount':>10} {'amounts/s':>12}")
+    for name, per_amount in [('amount_in_words (Decimal)', scalar_time), ('amounts_in_words (distinct)', batch_time / args.count),
+                             ('amounts_in_words (repeated)', repeated_time / args.count)]:
+        print(f"{name:>28} {per_amount * 1e6:>10.2f} {1 / per_amount:>12,.0f}")
+
+
+def allocate_numbers(db_path, count, series, block):
+    """Worker of bench_numbers: allocate `count` numbers, `block` at a time, from its own allocator."""
+    allocator = InvoiceNumberAllocator(db_path)
+    numbers = []
+    while len(numbers) < count:
+        numbers += allocator.allocate_block(datetime.date(2025, 4, 1), series, min(block, count - len(numbers)))
+    return series, numbers
+
+
+def bench_numbers(args):
+    """Invoice number allocator stress test: processes racing for numbers; checks for duplicates and gaps."""
+    print(f"{'processes':>9} {'block':>6} {'allocations':>12} {'seconds':>8} {'numbers/s':>10} {'duplicates':>11} {'gaps':>5}")
+    for processes in args.processes:
+        for block in args.blocks:
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = os.path.join(tmp, 'numbers.db')
+                InvoiceNumberAllocator(db_path).current()  # create the schema before the race
+                per_process = args.allocations // processes
+                tasks = [(db_path, per_process, f'series-{n % args.series}', block) for n in range(processes)]
+                with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    list(pool.map(allocate_numbers, *zip(*[(db_path, 0, '', 1)] * processes)))  # warm up: start and import
+                    start = time.perf_counter()
+                    results = list(pool.map(allocate_numbers, *zip(*tasks)))
+                    elapsed = time.perf_counter() - start
+            by_series = {}
+            for series, numbers in results:
+                by_series.setdefault(series, []).extend(int(number.rsplit('/', 1)[1]) for number in numbers)
+            total = sum(len(numbers) for numbers in by_series.values())
+            duplicates = sum(len(numbers) - len(set(numbers)) for numbers in by_series.values())
+            gaps = sum(max(numbers) - len(set(numbers)) for numbers in by_series.values())
+            print(f"{processes:>9} {block:>6} {total:>12,} {elapsed:>8.2f} {total / elapsed:>10,.0f} {duplicates:>11} {gaps:>5}")
+
+
+def bench_batch(args):
+    """Batch throughput (invoices/s) of render_invoice_spec across process-pool sizes."""
+    data = app.master_data.get()
+    client_name, products = next((c, p) for c, p in ((name, data.company_products(name)) for name in data.company_names()) if len(p) >= 3)
+
+    def specs(prefix, count):
+        return [{'client': client_name, 'invoice_no': f'{prefix}-{n}', 'invoice_date': '2025-04-01', 'po_number': '', 'errors': [],
+                 'items': [{'product': p.description, 'quantity': 1 + n % 5} for p in products[:args.lines]]}
+                for n in range(count)]
+
+    print(f"{'workers':>7} {'seconds':>8} {'invoices/s':>11} {'speedup':>8}")
+    baseline = None
+    saved = {name: os.environ.get(name) for name in ('LEDGER_DB', 'PDF_CACHE_DIR')}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Spawned workers import app afresh: give them a throwaway ledger and PDF cache, and each pool
+        # size its own invoice numbers, so every invoice is rendered and the real invoices.db is untouched
+        os.environ.update(LEDGER_DB=os.path.join(tmp, 'invoices.db'), PDF_CACHE_DIR=os.path.join(tmp, 'pdf_cache'))
+        try:
+            for workers in args.workers:
+                timed = specs(f'BENCH-{workers}W', args.invoices)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    list(pool.map(app.render_invoice_spec, specs(f'WARMUP-{workers}W', workers)))  # imports + master-data load
+                    start = time.perf_counter()
+                    results = list(pool.map(app.render_invoice_spec, timed, chunksize=max(1, len(timed) // (workers * 4))))
+                    elapsed = time.perf_counter() - start
+                assert all(not errors for _, _, _, errors in results)
+                baseline = baseline or elapsed
+                print(f"{workers:>7} {elapsed:>8.2f} {len(timed) / elapsed:>11.1f} {baseline / elapsed:>7.2f}x")
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def import_profile(module):
+    """Run `python -X importtime -c 'import module'` in a fresh interpreter: (total us, {module: cumulative us})."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        cumulative[name] = int(cumulative_us)
+    return cumulative.get(module, 0), cumulative
+
+
+def bench_startup(args):
+    """Worker boot cost: import time of wsgi (python -X importtime) and which heavy packages it loads."""
+    watched = ['flask', 'pandas', 'numpy', 'reportlab', 'reportlab.platypus', 'num2words', 'invoice_pdf']
+    totals, loaded = [], {}
+    for _ in range(args.repeat):
+        total, cumulative = import_profile(args.module)
+        totals.append(total)
+        loaded = cumulative
+    print(f"import {args.module}: best {min(totals) / 1e3:.1f} ms, median {statistics.median(totals) / 1e3:.1f} ms over {args.repeat} runs")
+    print(f"{'package':>20} {'ms':>8}")
+    for name in watched:
+        print(f"{name:>20} {loaded[name] / 1e3:>8.1f}" if name in loaded else f"{name:>20} {'-':>8}")
+    print(f"{'slowest imports':>20}")
+    for name, us in sorted(loaded.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:>40} {us / 1e3:>8.1f}")
+
+
+# --- Suite (JSON results, comparable across commits) ---
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_master_csvs(directory, n_clients, n_products, n_pricing_rows):
+    """Write synthetic clients/products/pricing CSVs into directory; returns their paths."""
+    paths = [os.path.join(directory, name) for name in ('clients.csv', 'products.csv', 'company_pricing.csv')]
+    for df, path in zip(synthetic_master_data(n_clients, n_products, n_pricing_rows), paths):
+        df.to_csv(path, index=False)
+    return paths
+
+
+def form_payload(client, products, n_lines, invoice_no):
+    """POST / form fields for an n-line invoice, as templates/index.html submits them."""
+    form = {'client': client.company_name, 'invoice_no': invoice_no, 'invoice_date': '2025-04-01', 'po_number': 'PO-1'}
+    for i in range(n_lines):
+        product = products[i % len(products)]
+        form.update({f'qty_{i}': str(1 + i % 7), f'product_desc_{i}': product.description, f'product_hsn_{i}': product.hsn_sac,
+                     f'product_gst_{i}': str(product.gst_rate), f'product_unit_{i}': product.unit})
+    return form
+
+
+def latency_stats(timings):
+    timings = sorted(timings)
+    quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    # 'seconds' is the median (p50); requests run one after another, so per_second is single-client throughput
+    return {'seconds': statistics.median(timings), 'requests': len(timings), 'p95_ms': quantiles[94] * 1e3, 'p99_ms': quantiles[98] * 1e3,
+            'per_second': len(timings) / sum(timings)}
+
+
+def write_report(args, results):
+    """Save results with the revision, machine and parameters to args.output (if given), for bench_compare()."""
+    report = {
+        'revision': git_revision(),
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('func', 'command', 'output')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+def bench_suite(args):
+    """load_data, calculate_invoice, generate_pdf_invoice and Flask throughput on synthetic CSVs; JSON results."""
+    results = []
+
+    def record(group, name, seconds, **extra):
+        results.append(dict(group=group, name=name, seconds=seconds, **extra))
+        print(f"{group:>10} {name:>32} {seconds * 1e3:>11.3f} ms" + ''.join(f"  {key}={value:,.1f}" for key, value in extra.items()))
+
+    saved = {name: getattr(app, name) for name in ('CLIENTS_FILE', 'PRODUCTS_FILE', 'PRICING_FILE', 'CATALOG_DB', 'master_data', 'ledger', 'pdf_cache')}
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            start = time.perf_counter()
+            app.CLIENTS_FILE, app.PRODUCTS_FILE, app.PRICING_FILE = write_master_csvs(tmp, args.clients, args.products, args.pricing_rows)
+            print(f"wrote {args.clients:,} clients, {args.products:,} products, {args.pricing_rows:,} pricing rows in {time.perf_counter() - start:.1f}s")
+            app.CATALOG_DB = os.path.join(tmp, 'catalog.db')
+
+            # Cold: the CSVs changed, so load_data() re-imports them; warm: the catalog is current and only reopened
+            cold = []
+            for _ in range(args.repeat):
+                if os.path.exists(app.CATALOG_DB):
+                    os.remove(app.CATALOG_DB)
+                start = time.perf_counter()
+                app.load_data()
+                cold.append(time.perf_counter() - start)
+            record('load_data', 'import csvs', min(cold))
+            record('load_data', 'open current catalog', best_of(app.load_data, repeat=args.repeat, number=10))
+
+            app.master_data = MasterDataStore([app.CLIENTS_FILE, app.PRODUCTS_FILE, app.PRICING_FILE, app.CATALOG_DB], app.load_data)
+            app.ledger = InvoiceLedger(os.path.join(tmp, 'invoices.db'))
+            app.pdf_cache = PdfCache(0)  # every request renders
+            data = app.master_data.get()
+            client_name = data.company_names()[0]
+            products = data.company_products(client_name)
+            prices = data.prices(client_name, [p.description for p in products])
+
+            for n_lines in args.lines:
+                items = [OrderLine(products[i % len(products)], 1 + i % 7) for i in range(n_lines)]
+                for tax_type in ('IGST', 'CGST_SGST'):
+                    client = dataclasses.replace(data.client(client_name), tax_type=tax_type)
+                    record('calculate', f'{tax_type} {n_lines} lines', best_of(lambda: app.calculate_invoice(client, items, prices),
+                                                                             repeat=args.repeat, number=max(1, 1000 // n_lines)))
+
+            transactional_details = {'invoice_no': 'BENCH-1', 'invoice_date': '01/04/2025', 'po_number': 'PO-1'}
+            for layout_template, tax_type in LAYOUT_COMBINATIONS:
+                client = dataclasses.replace(data.client(client_name), layout_template=layout_template, tax_type=tax_type)
+                for n_lines in args.pdf_lines:
+                    items = [OrderLine(products[i % len(products)], 1 + i % 7) for i in range(n_lines)]
+                    invoice_data = app.calculate_invoice(client, items, prices)
+                    record('render', f'{layout_template}+{tax_type} {n_lines} lines',
+                           best_of(lambda: app.generate_pdf_invoice(client, invoice_data, transactional_details), repeat=args.repeat))
+
+            client_app = app.app.test_client()
+            client = data.client(client_name)
+            for n_lines in args.http_lines:
+                timings = []
+                for n in range(args.requests):
+                    form = form_payload(client, products, n_lines, f'HTTP-{n_lines}-{n}')
+                    start = time.perf_counter()
+                    response = client_app.post('/', data=form)
+                    timings.append(time.perf_counter() - start)
+                    assert response.mimetype == 'application/pdf', response.get_data(as_text=True)[:200]
+                stats = latency_stats(timings)
+                record('http', f'POST / {n_lines} lines', stats.pop('seconds'), **stats)
+            timings = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                client_app.get(f'/api/company-products/{client_name}')
+                timings.append(time.perf_counter() - start)
+            stats = latency_stats(timings)
+            record('http', 'GET /api/company-products', stats.pop('seconds'), **stats)
+        finally:
+            for name, value in saved.items():
+                setattr(app, name, value)
+
+    write_report(args, results)
+
+
+# --- Load test: a local gunicorn server under concurrent clients ---
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_CLASSES = ('sync', 'gthread')
+LOAD_ENDPOINTS = ('invoice', 'products', 'preview', 'batch')
+
+
+def worker_config(text):
+    """'sync:2' -> 2 sync workers; 'gthread:2x4' -> 2 threaded workers of 4 threads each."""
+    worker_class, _, size = text.partition(':')
+    workers, _, threads = (size or '1').partition('x')
+    if worker_class not in WORKER_CLASSES or (threads and worker_class == 'sync'):
+        raise argparse.ArgumentTypeError(f"expected sync:WORKERS or gthread:WORKERSxTHREADS, not '{text}'")
+    return {'name': text, 'worker_class': worker_class, 'workers': int(workers), 'threads': int(threads or 1)}
+
+
+def endpoint_mix(text):
+    """'invoice=6,products=6' -> {'invoice': 6, 'products': 6}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in LOAD_ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}' (one of {', '.join(LOAD_ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def local_server(config, directory, args):
+    """Run `gunicorn wsgi:app` from this checkout in `directory` (synthetic CSVs and catalog); yields (host, port, master pid).
+
+    Each server gets a fresh ledger and PDF cache under directory/<config>.
+    """
+    state = os.path.join(directory, config['name'].replace(':', '-'))
+    os.makedirs(state)
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', 'wsgi:app', '--chdir', directory, '--pythonpath', PROJECT_DIR,
+               '--bind', f'127.0.0.1:{port}', '--worker-class', config['worker_class'], '--workers', str(config['workers']),
+               '--threads', str(config['threads']), '--timeout', '300']
+    env = dict(os.environ, CATALOG_DB=os.path.join(directory, 'catalog.db'), LEDGER_DB=os.path.join(state, 'invoices.db'), PDF_CACHE_DIR=os.path.join(state, 'pdf_cache'),
+               BATCH_WORKERS=str(args.batch_workers))
+    log_path = os.path.join(state, 'gunicorn.log')
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.perf_counter() + 60
+        while True:
+            if server.poll() is not None or time.perf_counter() > deadline:
+                with open(log_path) as log:
+                    raise RuntimeError(f"gunicorn did not start:\n{log.read()[-2000:]}")
+            try:
+                status, _, _ = http_request('127.0.0.1', port, 'GET', '/api/master-data/stats')
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.2)
+        yield '127.0.0.1', port, server.pid
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+def http_request(host, port, method, path, body=None, content_type=None):
+    """One request on a new connection (sync workers close every connection anyway): (status, content type, body)."""
+    connection = http.client.HTTPConnection(host, port, timeout=300)
+    try:
+        connection.request(method, path, body=body, headers={'Content-Type': content_type} if content_type else {})
+        response = connection.getresponse()
+        return response.status, response.getheader('Content-Type', ''), response.read()
+    finally:
+        connection.close()
+
+
+def load_scenario(clients_df, products_df, pricing_df, args, n_lines):
+    """{endpoint: build(rng, invoice_no) -> (method, path, body, content type, expected content type, invoices)}"""
+    names = clients_df['Company Name'].tolist()
+    sample = [names[i * len(names) // args.sample_clients] for i in range(min(args.sample_clients, len(names)))]
+    priced = {name: [line.product for line in synthetic_items(name, pricing_df, n_lines, products_df)] for name in sample}
+
+    def json_spec(rng, invoice_no):
+        name = rng.choice(sample)
+        return {'client': name, 'invoice_no': invoice_no, 'invoice_date': '2025-04-01',
+                'items': [{'product': product.description, 'quantity': 1 + i % 7} for i, product in enumerate(priced[name])]}
+
+    def invoice(rng, invoice_no):
+        name = rng.choice(sample)
+        form = form_payload(Client(name), priced[name], n_lines, invoice_no)
+        return 'POST', '/', urllib.parse.urlencode(form), 'application/x-www-form-urlencoded', 'application/pdf', 1
+
+    def products(rng, invoice_no):
+        path = f"/api/company-products/{urllib.parse.quote(rng.choice(sample))}"
+        return 'GET', path, None, None, 'application/json', 0
+
+    def preview(rng, invoice_no):
+        return 'POST', '/api/invoices/preview', json.dumps(json_spec(rng, invoice_no)), 'application/json', 'application/json', 0
+
+    def batch(rng, invoice_no):
+        specs = [json_spec(rng, f'{invoice_no}-{i}') for i in range(args.batch_size)]
+        return 'POST', '/api/invoices/batch', json.dumps({'invoices': specs}), 'application/json', 'application/zip', args.batch_size
+
+    return {'invoice': invoice, 'products': products, 'preview': preview, 'batch': batch}
+
+
+def run_load(host, port, scenario, mix, concurrency, seconds, label):
+    """Closed loop: `concurrency` clients send weighted-random requests for `seconds`; returns ([(endpoint, seconds, ok, invoices)], elapsed)."""
+    names, weights = list(mix), list(mix.values())
+    samples = []  # list.append is atomic, so the client threads share it
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    def client(index):
+        rng = random.Random(f'{label}-{index}')
+        n = 0
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, body, content_type, expected, invoices = scenario[name](rng, f'{label}-{index}-{n}')
+            n += 1
+            sent = time.perf_counter()
+            try:
+                status, received, _ = http_request(host, port, method, path, body, content_type)
+                ok = status == 200 and received.startswith(expected)
+            except OSError:
+                ok = False
+            samples.append((name, time.perf_counter() - sent, ok, invoices))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+class ProcessTreeSampler(threading.Thread):
+    """Samples CPU time and RSS of a process and all its descendants (gunicorn master, workers, batch pools) from /proc.
+
+    CPU time is counted from the first sample, or from 0 for processes started
+    later; a process that exits between samples loses at most one interval.
+    """
+
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def __init__(self, root_pid, interval=0.2):
+        threading.Thread.__init__(self, daemon=True)
+        self.root_pid = root_pid
+        self.interval = interval
+        self.available = os.path.exists('/proc/self/stat')
+        self.cpu_first, self.cpu_last = {}, {}
+        self.peak_rss = self.peak_process_rss = 0
+        self._stop_event = threading.Event()
+        if self.available:
+            self.sample(first=True)
+
+    def _read_stats(self):
+        """{pid: (ppid, cpu seconds, rss bytes)} for every process"""
+        stats = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            # Fields after the parenthesized command: state, ppid, ... utime (14th field), stime (15th), ... rss (24th)
+            fields = text[text.rindex(')') + 2:].split()
+            stats[int(entry)] = (int(fields[1]), (int(fields[11]) + int(fields[12])) / self.CLOCK_TICKS, int(fields[21]) * self.PAGE_SIZE)
+        return stats
+
+    def sample(self, first=False):
+        stats = self._read_stats()
+        children = {}
+        for pid, (ppid, _, _) in stats.items():
+            children.setdefault(ppid, []).append(pid)
+        tree, pending = [], [self.root_pid]
+        while pending:
+            pid = pending.pop()
+            if pid in stats:
+                tree.append(pid)
+                pending.extend(children.get(pid, []))
+        for pid in tree:
+            cpu = stats[pid][1]
+            self.cpu_first.setdefault(pid, cpu if first else 0.0)
+            self.cpu_last[pid] = cpu
+        rss = [stats[pid][2] for pid in tree]
+        self.peak_rss = max(self.peak_rss, sum(rss))
+        self.peak_process_rss = max([self.peak_process_rss] + rss)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if self.available:
+            self.sample()
+
+    @property
+    def cpu_seconds(self):
+        return sum(self.cpu_last[pid] - self.cpu_first[pid] for pid in self.cpu_last)
+
+
+def load_stats(timings, elapsed):
+    timings = sorted(timings)
+    # Inclusive quantiles stay within the observed latencies (the default method extrapolates past the slowest)
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+    return {'seconds': statistics.median(timings), 'requests': len(timings), 'per_second': len(timings) / elapsed,
+            'p95_ms': quantiles[94] * 1e3, 'p99_ms': quantiles[98] * 1e3, 'max_ms': timings[-1] * 1e3}
+
+
+def bench_load(args):
+    """Throughput, p50/p95/p99 per endpoint and worker CPU/RSS of a local gunicorn server per worker configuration."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        paths = write_master_csvs(tmp, args.clients, args.products, args.pricing_rows)
+        # Imported once here, so the workers start on a current catalog instead of racing to build it
+        import_catalog(os.path.join(tmp, 'catalog.db'), *read_master_csvs(*paths), source_version(paths))
+        clients_df, products_df, pricing_df = (pd.read_csv(path, dtype={'HSN_SAC': str}) for path in paths)
+        print(f"wrote and imported {args.clients:,} clients, {args.products:,} products, {args.pricing_rows:,} pricing rows "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        for config in args.configs:
+            for n_lines in args.lines:
+                scenario = load_scenario(clients_df, products_df, pricing_df, args, n_lines)
+                with local_server(config, tmp, args) as (host, port, pid):
+                    # Warm-up loads the catalog, ReportLab and the batch pools in every worker
+                    run_load(host, port, scenario, args.mix, args.concurrency, args.warmup, f'W{n_lines}')
+                    sampler = ProcessTreeSampler(pid)
+                    sampler.start()
+                    samples, elapsed = run_load(host, port, scenario, args.mix, args.concurrency, args.duration, f'L{n_lines}')
+                    sampler.stop()
+
+                label = f"{config['name']} {n_lines}L"
+                ok = [sample for sample in samples if sample[2]]
+                invoices = sum(sample[3] for sample in ok)
+                print(f"\n{config['name']} ({config['workers']} worker(s) x {config['threads']} thread(s)), {n_lines} lines, "
+                      f"{args.concurrency} clients: {len(samples):,} requests in {elapsed:.1f}s, {len(samples) / elapsed:,.1f} req/s, "
+                      f"{invoices / elapsed:,.1f} invoices/s, {len(samples) - len(ok)} errors")
+                print(f"{'endpoint':>10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+                for name in args.mix:
+                    timings = [sample[1] for sample in ok if sample[0] == name]
+                    errors = sum(1 for sample in samples if sample[0] == name and not sample[2])
+                    if not timings:
+                        print(f"{name:>10} {0:>9} {errors:>7}")
+                        continue
+                    stats = load_stats(timings, elapsed)
+                    print(f"{name:>10} {stats['requests']:>9,} {errors:>7} {stats['per_second']:>8.1f} {stats['seconds'] * 1e3:>9.1f} "
+                          f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+                    results.append(dict(group='load', name=f'{label} {name}', errors=errors, **stats))
+                if sampler.available:
+                    print(f"worker CPU {sampler.cpu_seconds:.1f}s ({sampler.cpu_seconds / elapsed:.0%} of one core), "
+                          f"peak RSS {sampler.peak_rss / 2**20:,.0f} MB in all, {sampler.peak_process_rss / 2**20:,.0f} MB largest process")
+                if ok:
+                    totals = load_stats([sample[1] for sample in ok], elapsed)
+                    totals.update(errors=len(samples) - len(ok), invoices_per_second=invoices / elapsed)
+                    if sampler.available:
+                        totals.update(cpu_seconds=sampler.cpu_seconds, peak_rss_mb=sampler.peak_rss / 2**20)
+                    results.append(dict(group='load', name=f'{label} all', **totals))
+    write_report(args, results)
+
+
+def bench_compare(args):
+    """Per-benchmark change between two suite JSON files (e.g. before and after a commit)."""
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    old = {(r['group'], r['name']): r['seconds'] for r in before['results']}
+    print(f"{before['revision'] or args.before} -> {after['revision'] or args.after}")
+    print(f"{'group':>10} {'benchmark':>32} {'before ms':>11} {'after ms':>11} {'change':>8}")
+    for r in after['results']:
+        seconds = old.get((r['group'], r['name']))
+        change = f"{(r['seconds'] / seconds - 1) * 100:>+7.1f}%" if seconds else '     new'
+        print(f"{r['group']:>10} {r['name']:>32} {seconds * 1e3 if seconds else float('nan'):>11.3f} {r['seconds'] * 1e3:>11.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('pricing', help=bench_pricing.__doc__)
+    p.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')], default=[1_000, 10_000, 100_000, 1_000_000])
+    p.add_argument('--lines', type=int, default=10)
+    p.set_defaults(func=bench_pricing)
+
+    p = sub.add_parser('calc', help=bench_calc.__doc__)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[3, 10, 100])
+    p.set_defaults(func=bench_calc)
+
+    p = sub.add_parser('render', help=bench_render.__doc__)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[3, 10])
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser('layout', help=bench_layout.__doc__)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[10, 100, 1000])
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_layout)
+
+    p = sub.add_parser('pdfsize', help=bench_pdfsize.__doc__)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[3, 10, 100])
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_pdfsize)
+
+    p = sub.add_parser('formats', help=bench_formats.__doc__)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[3, 10, 100])
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_formats)
+
+    p = sub.add_parser('ledger', help=bench_ledger.__doc__)
+    p.add_argument('--invoices', type=int, default=100_000)
+    p.add_argument('--clients', type=int, default=200)
+    p.add_argument('--lines', type=int, default=5)
+    p.set_defaults(func=bench_ledger)
+
+    p = sub.add_parser('words', help=bench_words.__doc__)
+    p.add_argument('--count', type=int, default=2_000_000)
+    p.add_argument('--scalar', type=int, default=200_000)
+    p.set_defaults(func=bench_words)
+
+    p = sub.add_parser('numbers', help=bench_numbers.__doc__)
+    p.add_argument('--processes', type=lambda s: [int(x) for x in s.split(',')], default=[1, 4, 8])
+    p.add_argument('--blocks', type=lambda s: [int(x) for x in s.split(',')], default=[1, 50])
+    p.add_argument('--allocations', type=int, default=20_000)
+    p.add_argument('--series', type=int, default=1, help='spread the processes over this many series')
+    p.set_defaults(func=bench_numbers)
+
+    p = sub.add_parser('batch', help=bench_batch.__doc__)
+    p.add_argument('--workers', type=lambda s: [int(x) for x in s.split(',')], default=[1, 2, 4])
+    p.add_argument('--invoices', type=int, default=200)
+    p.add_argument('--lines', type=int, default=5)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser('startup', help=bench_startup.__doc__)
+    p.add_argument('--module', default='wsgi')
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--top', type=int, default=10)
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser('suite', help=bench_suite.__doc__)
+    p.add_argument('--clients', type=int, default=1_000)
+    p.add_argument('--products', type=int, default=500)
+    p.add_argument('--pricing-rows', type=int, default=100_000)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[1, 10, 100, 1000])
+    p.add_argument('--pdf-lines', type=lambda s: [int(x) for x in s.split(',')], default=[1, 10, 100])
+    p.add_argument('--http-lines', type=lambda s: [int(x) for x in s.split(',')], default=[5])
+    p.add_argument('--requests', type=int, default=50)
+    p.add_argument('--repeat', type=int, default=3)
+    p.add_argument('--output', help='write results to this JSON file')
+    p.set_defaults(func=bench_suite)
+
+    p = sub.add_parser('load', help=bench_load.__doc__)
+    p.add_argument('--configs', type=lambda s: [worker_config(x) for x in s.split(',')], default='sync:1,gthread:1x4',
+                   help='gunicorn worker setups to compare: sync:WORKERS or gthread:WORKERSxTHREADS')
+    p.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    p.add_argument('--duration', type=float, default=20, help='measured seconds per configuration')
+    p.add_argument('--warmup', type=float, default=3)
+    p.add_argument('--lines', type=lambda s: [int(x) for x in s.split(',')], default=[5])
+    p.add_argument('--mix', type=endpoint_mix, default='invoice=6,products=6,preview=2,batch=1',
+                   help=f"relative weights of {', '.join(LOAD_ENDPOINTS)}")
+    p.add_argument('--batch-size', type=int, default=5, help='invoices per batch request')
+    p.add_argument('--batch-workers', type=int, default=2, help='BATCH_WORKERS of each gunicorn worker')
+    p.add_argument('--clients', type=int, default=1000)
+    p.add_argument('--products', type=int, default=500)
+    p.add_argument('--pricing-rows', type=int, default=100_000)
+    p.add_argument('--sample-clients', type=int, default=50, help='clients the requests are spread over')
+    p.add_argument('--output', help='write results to this JSON file')
+    p.set_defaults(func=bench_load)
+
+    p = sub.add_parser('compare', help=bench_compare.__doc__)
+    p.add_argument('before')
+    p.add_argument('after')
+    p.set_defaults(func=bench_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
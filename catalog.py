@@ -0,0 +1,314 @@
+"""SQLite master-data catalog (clients, products, per-company prices) and its CSV importer.
+
+Import the CSVs by hand with:
+
+    python catalog.py --db catalog.db clients.csv products.csv company_pricing.csv
+
+The app also re-imports on its own whenever the CSVs change.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from decimal import Decimal, InvalidOperation
+
+from records import Client, Product, PriceEntry
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE clients (
+    company_name TEXT PRIMARY KEY,
+    address TEXT,
+    gstin TEXT,
+    state TEXT,
+    layout_template TEXT,
+    tax_type TEXT,
+    position INTEGER NOT NULL UNIQUE      -- row order in clients.csv
+) WITHOUT ROWID;
+CREATE TABLE products (
+    description TEXT PRIMARY KEY,
+    hsn_sac TEXT,
+    gst_rate NUMERIC,                     -- keeps whole rates as integers (5, not 5.0)
+    unit TEXT,
+    position INTEGER NOT NULL UNIQUE      -- row order in products.csv
+) WITHOUT ROWID;
+CREATE TABLE pricing (
+    company_name TEXT NOT NULL,
+    product_description TEXT NOT NULL,
+    price TEXT,                           -- exact Decimal, e.g. '1250.50'; NULL: listed for the company but unparseable
+    PRIMARY KEY (company_name, product_description)
+) WITHOUT ROWID;
+-- Case-insensitive prefix search (typeahead) over names, in name order
+CREATE INDEX clients_name_nocase ON clients (company_name COLLATE NOCASE, company_name);
+CREATE INDEX products_description_nocase ON products (description COLLATE NOCASE, description);
+CREATE INDEX pricing_company_product_nocase ON pricing (company_name, product_description COLLATE NOCASE, product_description);
+"""
+# Part of every catalog's version, so a schema change makes the app re-import the CSVs
+CATALOG_FORMAT = 3
+
+# Catalog column -> CSV column; the columns are in records.Client / records.Product field order
+CLIENT_COLUMNS = {'company_name': 'Company Name', 'address': 'Address', 'gstin': 'GSTIN', 'state': 'State', 'layout_template': 'LayoutTemplate', 'tax_type': 'TaxType'}
+PRODUCT_COLUMNS = {'description': 'Description', 'hsn_sac': 'HSN_SAC', 'gst_rate': 'GSt_Rate', 'unit': 'Unit'}
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit
+_CHUNK = 500
+# Sorts after every character, so [prefix, prefix + _LAST) is the range of names starting with prefix
+_LAST = '\U0010ffff'
+
+
+def read_master_csvs(clients_file, products_file, pricing_file):
+    """Parse and clean the three master-data CSVs into (clients_df, products_df, pricing_df)."""
+    # Only needed when the CSVs change, so serving from a current catalog never loads pandas
+    import pandas as pd
+    def clean_df(df):
+        for col in df.select_dtypes(['object']): df[col] = df[col].str.strip()
+        return df
+    clients_df = clean_df(pd.read_csv(clients_file, dtype=str)); clients_df.dropna(subset=['Company Name'], inplace=True)
+    products_df = clean_df(pd.read_csv(products_file, dtype=str)); products_df.dropna(subset=['Description'], inplace=True)
+    if 'GSt_Rate' in products_df.columns: products_df['GSt_Rate'] = pd.to_numeric(products_df['GSt_Rate'].astype(str).str.replace('%', ''))
+    pricing_df = clean_df(pd.read_csv(pricing_file, dtype=str)); pricing_df.dropna(subset=['CompanyName'], inplace=True)
+    if 'Price' in pricing_df.columns:
+        # Kept as text: import_catalog() stores the exact Decimal, never a binary float
+        pricing_df['Price'] = pricing_df['Price'].str.replace('₹', '').str.replace(',', '').str.strip()
+    return clients_df, products_df, pricing_df
+
+
+def source_version(paths):
+    """Digest of the source files' bytes (and CATALOG_FORMAT); None if any of them is missing."""
+    digest = hashlib.sha1(f'catalog format {CATALOG_FORMAT}\n'.encode())
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            return None
+    return digest.hexdigest()[:16]
+
+
+def _value(value):
+    """DataFrame cell -> SQLite value (NaN becomes NULL)"""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _price_text(value):
+    """A Price cell as an exact Decimal string ('1250.50'), or None if it is missing or not a number"""
+    value = _value(value)
+    if value is None:
+        return None
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        return None
+    return str(price) if price.is_finite() else None
+
+
+def _rows(df, columns):
+    present = [col if col in df.columns else None for col in columns]
+    for record in df.to_dict('records'):
+        yield tuple(_value(record[col]) if col else None for col in present)
+
+
+def import_catalog(db_path, clients_df, products_df, pricing_df, version):
+    """Write the frames to a fresh catalog file and swap it in place of db_path.
+
+    The catalog is never modified in place: readers open it immutable, and a
+    reader that still has the old file open keeps seeing the old data until
+    it moves to the new snapshot. Duplicate keys keep their first row, and a
+    price that failed to parse only counts if no parsed price exists.
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.db.tmp')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+                conn.executemany('INSERT OR IGNORE INTO clients VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                 (row + (position,) for position, row in enumerate(_rows(clients_df, list(CLIENT_COLUMNS.values())))))
+                conn.executemany('INSERT OR IGNORE INTO products VALUES (?, ?, ?, ?, ?)',
+                                 (row + (position,) for position, row in enumerate(_rows(products_df, list(PRODUCT_COLUMNS.values())))))
+                pricing_rows = [(company, product, _price_text(price)) for company, product, price in _rows(pricing_df, ['CompanyName', 'ProductDescription', 'Price'])]
+                conn.executemany('INSERT OR IGNORE INTO pricing VALUES (?, ?, ?)', (row for row in pricing_rows if row[2] is not None))
+                conn.executemany('INSERT OR IGNORE INTO pricing VALUES (?, ?, ?)', (row for row in pricing_rows if row[2] is None))
+                conn.executemany('INSERT INTO meta VALUES (?, ?)', [('version', version), ('imported_at', datetime.datetime.now().isoformat(timespec='seconds'))])
+            conn.execute('ANALYZE')
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def catalog_version(db_path):
+    """Version recorded by the import that wrote db_path, or None if there is no usable catalog."""
+    try:
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        try:
+            return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        finally:
+            conn.close()
+    except (sqlite3.Error, TypeError):
+        return None
+
+
+class Catalog:
+    """Read-only view of one catalog file; every lookup is a primary-key (index) seek.
+
+    The connection is opened once and shared by all threads (serialized by a
+    lock; lookups take microseconds). Because it keeps the file it opened, a
+    Catalog is a consistent snapshot even after an import replaces db_path,
+    so each Client and Product record is built once and reused for as long
+    as the snapshot lives.
+    """
+
+    def __init__(self, db_path):
+        self.path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f'file:{db_path}?mode=ro&immutable=1', uri=True, check_same_thread=False)
+        self._client_records = {}
+        self._product_records = {}
+        meta = dict(self._query('SELECT key, value FROM meta'))
+        self.version = meta['version']
+        self.imported_at = meta.get('imported_at')
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _chunked(self, sql, first_params, keys):
+        """Run sql with its '{}' placeholder expanded to an IN list, chunk by chunk."""
+        keys = list(dict.fromkeys(keys))
+        rows = []
+        for start in range(0, len(keys), _CHUNK):
+            chunk = keys[start:start + _CHUNK]
+            rows.extend(self._query(sql.format(', '.join('?' * len(chunk))), tuple(first_params) + tuple(chunk)))
+        return rows
+
+    def _client_record(self, row):
+        record = self._client_records.get(row[0])
+        if record is None:
+            record = self._client_records.setdefault(row[0], Client.from_row(row))
+        return record
+
+    def _product_record(self, row):
+        record = self._product_records.get(row[0])
+        if record is None:
+            record = self._product_records.setdefault(row[0], Product.from_row(row))
+        return record
+
+    def client(self, company_name):
+        record = self._client_records.get(company_name)
+        if record is not None:
+            return record
+        rows = self._query(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients WHERE company_name = ?", (company_name,))
+        return self._client_record(rows[0]) if rows else None
+
+    def clients(self):
+        return [self._client_record(row) for row in self._query(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients ORDER BY position")]
+
+    def products(self):
+        return [self._product_record(row) for row in self._query(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products ORDER BY position")]
+
+    def products_by_description(self, descriptions):
+        """{description: Product} for those of `descriptions` that exist"""
+        found = {desc: self._product_records[desc] for desc in descriptions if desc in self._product_records}
+        missing = [desc for desc in descriptions if desc not in found]
+        if missing:
+            rows = self._chunked(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE description IN ({{}})", (), missing)
+            found.update((row[0], self._product_record(row)) for row in rows)
+        return found
+
+    def prices(self, company_name, descriptions):
+        """{description: PriceEntry} for those of `descriptions` the company has a (parsed) price for"""
+        rows = self._chunked("SELECT product_description, price FROM pricing WHERE company_name = ? AND product_description IN ({}) AND price IS NOT NULL",
+                             (company_name,), descriptions)
+        return {desc: PriceEntry(company_name, desc, Decimal(price)) for desc, price in rows}
+
+    def company_products(self, company_name):
+        """Products the company has a pricing row for, in products.csv order"""
+        rows = self._query(f"SELECT {', '.join('p.' + col for col in PRODUCT_COLUMNS)} FROM pricing c JOIN products p ON p.description = c.product_description"
+                           " WHERE c.company_name = ? ORDER BY p.position", (company_name,))
+        return [self._product_record(row) for row in rows]
+
+    def _search(self, select, where, params, name_column, prefix, limit, after):
+        """Page through `select` rows whose name_column starts with prefix; returns (rows, next_cursor)."""
+        where = list(where) + [f'{name_column} COLLATE NOCASE >= ?', f'{name_column} COLLATE NOCASE < ?']
+        params = list(params) + [prefix, prefix + _LAST]
+        if after is not None:
+            where.append(f'({name_column} COLLATE NOCASE, {name_column}) > (?, ?)')
+            params += [after, after]
+        rows = self._query(f"{select} WHERE {' AND '.join(where)} ORDER BY {name_column} COLLATE NOCASE, {name_column} LIMIT ?", params + [limit + 1])
+        return rows[:limit], (rows[limit - 1][0] if len(rows) > limit else None)
+
+    def search_clients(self, prefix='', limit=50, after=None):
+        """Clients whose name starts with `prefix` (ASCII case-insensitively), in name order, one page at a time.
+
+        Returns (clients, next_cursor); pass next_cursor back as `after` for the
+        next page. Every page is a range scan of clients_name_nocase.
+        """
+        rows, next_cursor = self._search(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients", [], [], 'company_name', prefix, limit, after)
+        return [self._client_record(row) for row in rows], next_cursor
+
+    def search_products(self, prefix='', limit=50, after=None, company_name=None):
+        """Products whose description starts with `prefix`, like search_clients(); only those priced for company_name if given."""
+        if company_name is None:
+            rows, next_cursor = self._search(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products", [], [], 'description', prefix, limit, after)
+            return [self._product_record(row) for row in rows], next_cursor
+        rows, next_cursor = self._search('SELECT product_description FROM pricing', ['company_name = ?'], [company_name],
+                                         'product_description', prefix, limit, after)
+        products = self.products_by_description([row[0] for row in rows])
+        return [products[row[0]] for row in rows if row[0] in products], next_cursor
+
+    def lookup_order_lines(self, pairs):
+        """Resolve many (company_name, description) pairs in one joined query.
+
+        Returns {(company_name, description): (client exists, Product or None,
+        PriceEntry or None)}. The pairs travel as a single JSON parameter, so
+        thousands of order lines cost one statement rather than a lookup each.
+        """
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return {}
+        rows = self._query(
+            "WITH o AS (SELECT json_extract(value, '$[0]') AS company_name, json_extract(value, '$[1]') AS description FROM json_each(?))"
+            f" SELECT o.company_name, o.description, c.company_name IS NOT NULL, {', '.join('p.' + col for col in PRODUCT_COLUMNS)}, pr.price FROM o"
+            " LEFT JOIN clients c ON c.company_name = o.company_name"
+            " LEFT JOIN products p ON p.description = o.description"
+            " LEFT JOIN pricing pr ON pr.company_name = o.company_name AND pr.product_description = o.description AND pr.price IS NOT NULL",
+            (json.dumps(pairs),))
+        resolved = {}
+        for company_name, description, client_exists, *product_row, price in rows:
+            product = self._product_record(product_row) if product_row[0] is not None else None
+            entry = PriceEntry(company_name, description, Decimal(price)) if price is not None else None
+            resolved[(company_name, description)] = (bool(client_exists), product, entry)
+        return resolved
+
+    def company_names(self):
+        """Companies that have at least one pricing row"""
+        return [row[0] for row in self._query('SELECT DISTINCT company_name FROM pricing')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='catalog.db')
+    parser.add_argument('clients', nargs='?', default='clients.csv')
+    parser.add_argument('products', nargs='?', default='products.csv')
+    parser.add_argument('pricing', nargs='?', default='company_pricing.csv')
+    args = parser.parse_args()
+    sources = [args.clients, args.products, args.pricing]
+    clients_df, products_df, pricing_df = read_master_csvs(*sources)
+    import_catalog(args.db, clients_df, products_df, pricing_df, source_version(sources))
+    catalog = Catalog(args.db)
+    print(f"Imported {len(catalog.clients())} clients, {len(catalog.products())} products into {args.db} (version {catalog.version})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""Our own (the seller's) details, printed on every invoice."""
+
+YOUR_COMPANY_DETAILS = {
+    "name": "M/S S4 ENTERPRISES",
+    "address": "HCL NAGAR, PLOT NO 108, HCL Nagar, HCL NAGAR,\nMallapur, Hyderabad, Medchal Malkajiri,\nTelangana, 500076",
+    "phone": "9885599559",
+    "email": "s4enterprises07@gmail.com",
+    "gstin": "36AKWPM2375C1ZV",
+    "bank_name": "HDFC BANK LTD",
+    "account_no": "50200083151347",
+    "ifsc_code": "Nacharam & HDFC0000368",
+    # Address parts the e-invoice (IRN) payload needs separately
+    "city": "Hyderabad",
+    "pincode": "500076",
+    "state": "Telangana",
+    "state_code": "36"
+}
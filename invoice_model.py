@@ -0,0 +1,241 @@
+"""A format-neutral view of one calculated invoice, and its JSON renderings.
+
+invoice_document() turns calculate_invoice()'s result into an InvoiceDocument:
+the title, parties, numbered lines with their taxes, and the totals and
+amounts in words exactly as the PDF prints them. The HTML preview
+(templates/invoice_preview.html), document_to_dict() and einvoice_payload()
+all render that one document, so none of them needs ReportLab and each costs
+a small fraction of a PDF render.
+"""
+import re
+import textwrap
+from dataclasses import dataclass
+from decimal import Decimal
+
+from amount_words import amount_in_words
+from company import YOUR_COMPANY_DETAILS
+from money import gst_amount
+from records import Client
+
+ZERO = Decimal('0.00')
+
+
+def is_igst(client):
+    """Whether the client is billed IGST rather than CGST/SGST; a blank TaxType means CGST_SGST.
+
+    calculate_invoice() taxes by this and every rendering (PDF, HTML, JSON,
+    e-invoice) shows its columns by it, so they always agree.
+    """
+    return (client.tax_type or 'CGST_SGST').strip() == 'IGST'
+
+
+def invoice_title(client):
+    """'SEZ Invoice' for SEZ clients billed IGST, otherwise 'Tax Invoice'"""
+    if (client.layout_template or '') == 'SEZ' and is_igst(client):
+        return "SEZ Invoice"
+    return "Tax Invoice"
+
+
+@dataclass(frozen=True, slots=True)
+class DocumentLine:
+    """One priced line, numbered as printed, with its own taxes."""
+    number: int
+    description: str
+    hsn_sac: str | None
+    quantity: float
+    unit: str | None
+    rate: Decimal
+    gst_rate: float
+    amount: Decimal
+    igst: Decimal
+    cgst: Decimal
+    sgst: Decimal
+
+    @property
+    def tax(self):
+        return self.igst + self.cgst + self.sgst
+
+    @property
+    def total(self):
+        return self.amount + self.tax
+
+
+@dataclass(frozen=True, slots=True)
+class TaxRate:
+    """Taxable value and tax of all lines at one GST rate."""
+    rate: float
+    taxable_value: Decimal
+    igst: Decimal
+    cgst: Decimal
+    sgst: Decimal
+
+
+@dataclass(frozen=True, slots=True)
+class InvoiceDocument:
+    title: str
+    invoice_no: str
+    invoice_date: str
+    po_number: str
+    seller: dict
+    buyer: Client
+    tax_type: str
+    lines: tuple
+    tax_rates: tuple
+    subtotal: Decimal
+    igst: Decimal
+    cgst: Decimal
+    sgst: Decimal
+    total_tax: Decimal
+    round_off: Decimal
+    grand_total: Decimal
+    amount_in_words: str
+    tax_in_words: str
+    errors: tuple = ()
+
+    @property
+    def igst_invoice(self):
+        return self.tax_type == 'IGST'
+
+
+def invoice_document(client, invoice_data, transactional_details):
+    """The InvoiceDocument for calculate_invoice()'s result; lines with errors are left out and listed in errors"""
+    igst = is_igst(client)
+    lines, errors = [], []
+    for item in invoice_data['items']:
+        if item.error is not None:
+            errors.append(item.error); continue
+        if igst:
+            taxes = (gst_amount(item.amount, item.gst_rate), ZERO, ZERO)
+        else:
+            half = gst_amount(item.amount, item.gst_rate / 2)
+            taxes = (ZERO, half, half)
+        lines.append(DocumentLine(len(lines) + 1, item.description, item.hsn_sac, item.quantity, item.unit,
+                                  item.rate, item.gst_rate, item.amount, *taxes))
+
+    tax_rates = tuple(TaxRate(entry['rate'], entry['taxable_value'], entry.get('igst_amount', ZERO),
+                              entry.get('cgst_amount', ZERO), entry.get('sgst_amount', ZERO))
+                      for entry in invoice_data['tax_details'].get('breakdown', []))
+    return InvoiceDocument(
+        title=invoice_title(client),
+        invoice_no=str(transactional_details.get('invoice_no') or ''),
+        invoice_date=transactional_details['invoice_date'],
+        po_number=transactional_details.get('po_number') or '',
+        seller=YOUR_COMPANY_DETAILS,
+        buyer=client,
+        tax_type='IGST' if igst else 'CGST_SGST',
+        lines=tuple(lines),
+        tax_rates=tax_rates,
+        subtotal=invoice_data['subtotal'],
+        igst=sum((rate.igst for rate in tax_rates), ZERO),
+        cgst=sum((rate.cgst for rate in tax_rates), ZERO),
+        sgst=sum((rate.sgst for rate in tax_rates), ZERO),
+        total_tax=invoice_data['total_tax'],
+        round_off=ZERO,
+        grand_total=invoice_data['grand_total'],
+        amount_in_words=amount_in_words(invoice_data['grand_total']),
+        tax_in_words=amount_in_words(invoice_data['total_tax']),
+        errors=tuple(errors),
+    )
+
+
+def _amount(value):
+    """Amounts as exact two-decimal strings, as the API returns them elsewhere"""
+    return f"{value:.2f}"
+
+
+def document_to_dict(document):
+    """The document as JSON-ready data; amounts are strings like '1250.00'"""
+    return {
+        'title': document.title,
+        'invoice_no': document.invoice_no,
+        'invoice_date': document.invoice_date,
+        'po_number': document.po_number,
+        'seller': {key: document.seller[key] for key in ('name', 'address', 'gstin', 'state', 'state_code')},
+        'buyer': document.buyer.to_dict(),
+        'tax_type': document.tax_type,
+        'lines': [{'number': line.number, 'description': line.description, 'hsn_sac': line.hsn_sac, 'quantity': line.quantity,
+                   'unit': line.unit, 'rate': _amount(line.rate), 'gst_rate': line.gst_rate, 'amount': _amount(line.amount),
+                   'igst_amount': _amount(line.igst), 'cgst_amount': _amount(line.cgst), 'sgst_amount': _amount(line.sgst),
+                   'total': _amount(line.total)} for line in document.lines],
+        'tax_breakdown': [{'rate': rate.rate, 'taxable_value': _amount(rate.taxable_value), 'igst_amount': _amount(rate.igst),
+                           'cgst_amount': _amount(rate.cgst), 'sgst_amount': _amount(rate.sgst)} for rate in document.tax_rates],
+        'subtotal': _amount(document.subtotal),
+        'igst_amount': _amount(document.igst),
+        'cgst_amount': _amount(document.cgst),
+        'sgst_amount': _amount(document.sgst),
+        'total_tax': _amount(document.total_tax),
+        'round_off': _amount(document.round_off),
+        'grand_total': _amount(document.grand_total),
+        'amount_in_words': f"INR {document.amount_in_words}",
+        'tax_in_words': f"INR {document.tax_in_words}",
+        'errors': list(document.errors),
+    }
+
+
+# --- GST e-invoice (IRN) payload ---
+EINVOICE_SCHEMA_VERSION = '1.1'
+# Units as printed on invoices -> GST Unit Quantity Codes; anything else is OTH
+UQC_CODES = {'nos': 'NOS', 'no': 'NOS', 'pcs': 'PCS', 'kgs': 'KGS', 'kg': 'KGS', 'gms': 'GMS', 'g': 'GMS', 'ltr': 'LTR',
+             'ltrs': 'LTR', 'box': 'BOX', 'boxes': 'BOX', 'pac': 'PAC', 'pack': 'PAC', 'set': 'SET', 'mtr': 'MTR'}
+PIN_CODE = re.compile(r'(?<!\d)(\d{6})(?!\d)')
+ADDRESS_FIELD_LENGTH = 100
+
+
+class EInvoiceError(ValueError):
+    """The document cannot be reported as an e-invoice as it stands."""
+
+
+def _party(name, gstin, address, location, state_code=None, pincode=None):
+    """SellerDtls/BuyerDtls: state code from the GSTIN and PIN from the address unless given"""
+    address = ' '.join((address or '').split())
+    if pincode is None:
+        pins = PIN_CODE.findall(address)
+        pincode = pins[-1] if pins else None
+    # Two address fields of up to 100 characters, broken between words
+    lines = textwrap.wrap(address, ADDRESS_FIELD_LENGTH) or ['']
+    party = {'Gstin': gstin, 'LglNm': name, 'Addr1': lines[0]}
+    if len(lines) > 1:
+        party['Addr2'] = ' '.join(lines[1:])[:ADDRESS_FIELD_LENGTH]
+    party['Loc'] = location
+    party['Pin'] = int(pincode) if pincode else None
+    party['Stcd'] = state_code or (gstin or '')[:2]
+    return party
+
+
+def einvoice_payload(document):
+    """The GST e-invoice JSON (schema 1.1) for the IRP; raises EInvoiceError for drafts or invoices with line errors"""
+    if document.errors:
+        raise EInvoiceError(f"Invoice has line errors: {'; '.join(document.errors)}")
+    if not document.invoice_no:
+        raise EInvoiceError("An e-invoice needs an invoice number")
+    if not document.lines:
+        raise EInvoiceError("An e-invoice needs at least one line")
+    seller, buyer = document.seller, document.buyer
+    buyer_details = _party(buyer.company_name, buyer.gstin, buyer.address, buyer.state)
+    buyer_details['Pos'] = buyer_details['Stcd']
+    items = [{
+        'SlNo': str(line.number),
+        'PrdDesc': line.description,
+        'IsServc': 'Y' if (line.hsn_sac or '').startswith('99') else 'N',
+        'HsnCd': line.hsn_sac,
+        'Qty': line.quantity,
+        'Unit': UQC_CODES.get((line.unit or '').strip().lower(), 'OTH'),
+        'UnitPrice': float(line.rate),
+        'TotAmt': float(line.amount),
+        'AssAmt': float(line.amount),
+        'GstRt': line.gst_rate,
+        'IgstAmt': float(line.igst),
+        'CgstAmt': float(line.cgst),
+        'SgstAmt': float(line.sgst),
+        'TotItemVal': float(line.total),
+    } for line in document.lines]
+    return {
+        'Version': EINVOICE_SCHEMA_VERSION,
+        'TranDtls': {'TaxSch': 'GST', 'SupTyp': 'SEZWP' if document.title == 'SEZ Invoice' else 'B2B'},
+        'DocDtls': {'Typ': 'INV', 'No': document.invoice_no, 'Dt': document.invoice_date},
+        'SellerDtls': _party(seller['name'], seller['gstin'], seller['address'], seller['city'], seller['state_code'], seller['pincode']),
+        'BuyerDtls': buyer_details,
+        'ItemList': items,
+        'ValDtls': {'AssVal': float(document.subtotal), 'IgstVal': float(document.igst), 'CgstVal': float(document.cgst),
+                    'SgstVal': float(document.sgst), 'RndOffAmt': float(document.round_off), 'TotInvVal': float(document.grand_total)},
+    }
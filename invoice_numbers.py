@@ -0,0 +1,138 @@
+import datetime
+import re
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoice_sequences (
+    financial_year TEXT NOT NULL,        -- e.g. 2025-26 (April to March)
+    series TEXT NOT NULL,                -- '' for the shared series, else e.g. a client name
+    last_number INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (financial_year, series)
+) WITHOUT ROWID;
+
+-- The short code printed in a named series' numbers; assigned once, never reused
+CREATE TABLE IF NOT EXISTS invoice_series_codes (
+    series TEXT PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+) WITHOUT ROWID;
+"""
+
+
+def financial_year(date):
+    """Indian financial year (April to March) of a date, e.g. 2025-26"""
+    start = date.year if date.month >= 4 else date.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+class InvoiceNumberAllocator:
+    """Duplicate-free invoice numbers from an SQLite sequence per (financial year, series).
+
+    Each allocation is one UPSERT ... RETURNING statement: SQLite runs it
+    under its write lock, so concurrent threads and processes (gunicorn
+    workers, batch jobs) sharing the file never get the same number. The
+    database runs in WAL mode with a connection per thread, like the ledger.
+
+    Numbers are '<prefix><financial year>/<number>', e.g. S4/2025-26/0042.
+    A named series (e.g. one per client) also carries its short code, e.g.
+    S4/CLSP/2025-26/0007, so two series never print the same number.
+    A number is used up once allocated, so allocate only for invoices that
+    have passed validation; the callers do. A number typed in by hand is
+    passed to claim(), so the sequence never hands it out again. The
+    sequence has no gaps unless
+    an invoice fails after it was numbered (its PDF render raises), since a
+    number can't be handed back once later ones may have been taken.
+    """
+
+    def __init__(self, path, prefix='', width=4):
+        self.path = path
+        self.prefix = prefix
+        self.width = width
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._codes = {}
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def format(self, year, number, code=''):
+        series = f"{code}/" if code else ''
+        return f"{self.prefix}{series}{year}/{number:0{self.width}d}"
+
+    def series_code(self, series):
+        """Short code of a named series: the initials of its first words, numbered on a clash ('' for the shared series)"""
+        if not series:
+            return ''
+        code = self._codes.get(series)
+        if code is None:
+            conn = self._connect()
+            base = ''.join(word[0] for word in re.findall(r'[A-Za-z0-9]+', series)[:4]).upper() or 'S'
+            attempt = 1
+            while code is None:
+                row = conn.execute('SELECT code FROM invoice_series_codes WHERE series = ?', (series,)).fetchone()
+                if row is not None:
+                    code = row[0]
+                    break
+                candidate = base if attempt == 1 else f'{base}{attempt}'
+                try:
+                    conn.execute('INSERT INTO invoice_series_codes (series, code) VALUES (?, ?)', (series, candidate))
+                    code = candidate
+                except sqlite3.IntegrityError:
+                    # The code belongs to another series, or another process just coded this one
+                    attempt += 1
+            self._codes[series] = code
+        return code
+
+    def allocate_block(self, invoice_date=None, series='', count=1):
+        """Reserve `count` consecutive numbers in one statement; returns them formatted, in order."""
+        if count < 1:
+            return []
+        year = financial_year(invoice_date or datetime.date.today())
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        last = self._connect().execute(
+            'INSERT INTO invoice_sequences (financial_year, series, last_number, updated_at) VALUES (?, ?, ?, ?)'
+            ' ON CONFLICT (financial_year, series) DO UPDATE SET last_number = last_number + excluded.last_number, updated_at = excluded.updated_at'
+            ' RETURNING last_number', (year, series, count, now)).fetchone()[0]
+        code = self.series_code(series)
+        return [self.format(year, number, code) for number in range(last - count + 1, last + 1)]
+
+    def allocate(self, invoice_date=None, series=''):
+        """Next invoice number of the series for the financial year of invoice_date (default: today)."""
+        return self.allocate_block(invoice_date, series)[0]
+
+    def claim(self, invoice_no, series=''):
+        """Note a number typed in by hand: if it is in the series, advance the sequence past it.
+
+        Returns True if invoice_no had the series' format. Numbers in any other
+        format are not the allocator's concern and are left alone.
+        """
+        code = self.series_code(series)
+        head = f"{self.prefix}{code}/" if code else self.prefix
+        match = re.fullmatch(re.escape(head) + r'(\d{4}-\d{2})/(\d+)', invoice_no.strip())
+        if match is None:
+            return False
+        year, number = match[1], int(match[2])
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        self._connect().execute(
+            'INSERT INTO invoice_sequences (financial_year, series, last_number, updated_at) VALUES (?, ?, ?, ?)'
+            ' ON CONFLICT (financial_year, series) DO UPDATE SET last_number = MAX(last_number, excluded.last_number), updated_at = excluded.updated_at',
+            (year, series, number, now))
+        return True
+
+    def current(self, invoice_date=None, series=''):
+        """Last number handed out in the series this financial year (0 if none)."""
+        year = financial_year(invoice_date or datetime.date.today())
+        row = self._connect().execute('SELECT last_number FROM invoice_sequences WHERE financial_year = ? AND series = ?', (year, series)).fetchone()
+        return row[0] if row is not None else 0
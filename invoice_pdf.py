@@ -0,0 +1,440 @@
+"""The ReportLab invoice PDF: styles, the static frame and generate_pdf_invoice().
+
+app.py imports this module on the first render rather than at startup, so
+workers that only serve lookups, cached PDFs or the API never load ReportLab.
+"""
+import io
+from functools import lru_cache, partial
+from types import MappingProxyType
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.platypus import PageTemplate, Frame, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_RIGHT, TA_CENTER
+from reportlab.lib.units import mm
+
+from amount_words import amount_in_words
+from company import YOUR_COMPANY_DETAILS
+from invoice_model import invoice_title, is_igst
+from money import gst_amount
+from pdf_fonts import embedded_font_family
+from pdf_frame import RecordedBlocks
+from pdf_layout import PaginatedTable, PageCountCanvas, TimedDocTemplate, timed
+
+
+# --- PDF Styles ---
+# Built once at import and shared by every render. Reportlab only reads these
+# when laying out a table or paragraph, so they must never be modified in place.
+_sample_styles = getSampleStyleSheet()
+
+def paragraph_styles(regular, bold):
+    style_normal = ParagraphStyle(name='Normal', parent=_sample_styles['Normal'], fontSize=8, leading=10, fontName=regular)
+    style_small = ParagraphStyle(name='Small', parent=_sample_styles['Normal'], fontSize=7, leading=9, fontName=regular)
+    style_bold = ParagraphStyle(name='Bold', parent=_sample_styles['Normal'], fontSize=8, leading=10, fontName=bold)
+    return MappingProxyType({
+        'normal': style_normal,
+        'small': style_small,
+        'bold': style_bold,
+        'normal_right': ParagraphStyle('NormalRight', parent=style_normal, alignment=TA_RIGHT),
+        'small_right': ParagraphStyle('SmallRight', parent=style_small, alignment=TA_RIGHT),
+        'small_center': ParagraphStyle('SmallCenter', parent=style_small, alignment=TA_CENTER),
+        'bold_right': ParagraphStyle('BoldRight', parent=style_bold, alignment=TA_RIGHT),
+        'bold_center': ParagraphStyle('BoldCenter', parent=style_bold, alignment=TA_CENTER),
+        'bold_small': ParagraphStyle('BoldSmall', parent=style_bold, fontSize=7),
+        'company_name': ParagraphStyle('CompanyName', fontSize=11, fontName=bold),
+    })
+
+PDF_STYLES = paragraph_styles('Helvetica', 'Helvetica-Bold')
+
+_items_table_commands = [
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTSIZE', (0,0), (-1,-1), 8),
+    ('TOPPADDING', (0,0), (-1,-1), 2),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 2)
+]
+
+@lru_cache(maxsize=256)
+def items_table_style(first_body_row, last_body_row, font=None):
+    """Items table style for one page of the table; item rows get left-aligned description and quantity"""
+    return TableStyle(_items_table_commands + [
+        ('ALIGN', (1,first_body_row), (1,last_body_row), 'LEFT'),
+        ('ALIGN', (4,first_body_row), (4,last_body_row), 'LEFT'),
+        ('LEFTPADDING', (1,first_body_row), (1,last_body_row), 3)
+    ] + ([('FONTNAME', (0,0), (-1,-1), font)] if font else []))
+
+_tax_table_commands = [('GRID', (0,0), (-1,-1), 1, colors.black), ('ALIGN', (0,0), (-1,-1), 'CENTER'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('FONTSIZE', (0,0), (-1,-1), 7), ('TOPPADDING', (0,0), (-1,-1), 2), ('BOTTOMPADDING', (0,0), (-1,-1), 2), ('SPAN', (0,0), (0,1)), ('SPAN', (1,0), (1,1)), ('SPAN', (-1,0), (-1,1))]
+TABLE_STYLES = MappingProxyType({
+    # Header, address, client and tax-in-words/bank tables
+    'boxed': TableStyle([
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('LEFTPADDING', (0,0), (-1,-1), 3),
+        ('RIGHTPADDING', (0,0), (-1,-1), 3),
+        ('TOPPADDING', (0,0), (-1,-1), 2),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 2)
+    ]),
+    'words': TableStyle([('GRID', (0,0), (-1,-1), 1, colors.black), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('LEFTPADDING', (0,0), (-1,-1), 3), ('RIGHTPADDING', (0,0), (-1,-1), 3), ('TOPPADDING', (0,0), (-1,-1), 3), ('BOTTOMPADDING', (0,0), (-1,-1), 3)]),
+    'tax_igst': TableStyle(_tax_table_commands + [('SPAN', (2,0), (3,0))]),
+    'tax_cgst_sgst': TableStyle(_tax_table_commands + [('SPAN', (2,0), (3,0)), ('SPAN', (4,0), (5,0))]),
+    'declaration': TableStyle([
+        ('GRID', (0,0), (-1,-1), 1, colors.black),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('LEFTPADDING', (0,0), (-1,-1), 3),
+        ('RIGHTPADDING', (0,0), (-1,-1), 3),
+        ('TOPPADDING', (0,0), (-1,-1), 3),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 3)
+    ]),
+})
+
+
+# --- Output Modes ---
+# ascii:    ReportLab's defaults; page streams are Flate-compressed, then ASCII85-encoded
+#           so the file stays 7-bit clean (the output of earlier versions).
+# compact:  the same Flate streams left binary, about a fifth smaller; standard Helvetica,
+#           which viewers supply, so no font data is embedded.
+# archival: compact streams plus embedded subset TrueType fonts (pdf_fonts.py): the file
+#           depends on no font outside it, as PDF/A requires, and can print the rupee sign.
+#           The font subsets make it several times larger and slower to render.
+OUTPUT_MODES = ('ascii', 'compact', 'archival')
+
+class InvoiceTheme:
+    """The fonts of one output mode with the paragraph and table styles using them."""
+
+    def __init__(self, regular, bold, currency, embedded):
+        self.regular = regular
+        self.bold = bold
+        self.currency = currency
+        self.embedded = embedded
+        self.styles = PDF_STYLES if not embedded else paragraph_styles(regular, bold)
+        # Plain-string cells (the empty padding cells) are drawn in the table's own font
+        self.tables = TABLE_STYLES if not embedded else MappingProxyType(
+            {name: TableStyle([('FONTNAME', (0,0), (-1,-1), regular)], parent=style) for name, style in TABLE_STYLES.items()})
+        self.items_table_style = items_table_style if not embedded else partial(items_table_style, font=regular)
+
+STANDARD_THEME = InvoiceTheme('Helvetica', 'Helvetica-Bold', 'Rs.', embedded=False)
+
+@lru_cache(maxsize=None)
+def embedded_theme():
+    return InvoiceTheme(*embedded_font_family(), embedded=True)
+
+def output_theme(output_mode):
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown PDF output mode {output_mode!r}; expected one of {', '.join(OUTPUT_MODES)}")
+    return embedded_theme() if output_mode == 'archival' else STANDARD_THEME
+
+
+# --- Static Invoice Frame ---
+# The company header, address block, bank details and declaration are the same on
+# every invoice. Each is laid out and drawn once (see pdf_frame.py) and replayed
+# into later PDFs; only the few per-invoice cells inside them are laid out per render.
+STATIC_FRAME = RecordedBlocks()
+
+# (col, row) of the per-invoice cells in each static table, and sample content
+# used to size those cells when the table is recorded.
+STATIC_FRAME_SLOTS = {
+    'company_header': ([(1, 1), (2, 1)], lambda: [Paragraph("<b>INV-0000</b>", PDF_STYLES['bold']), Paragraph("<b>01/01/2025</b>", PDF_STYLES['bold'])]),
+    'main_details': ([(1, 3)], lambda: [Paragraph("Buyer's Order No.<br/><b>PO-0000</b>", PDF_STYLES['normal'])]),
+    # The bank details cell sets the row height; tax-in-words text up to that height fits.
+    'tax_words': ([(0, 0)], lambda: [Spacer(0, 0)]),
+    'declaration': ([], lambda: []),
+}
+
+def build_company_header_table(invoice_no_cell, invoice_date_cell, theme=STANDARD_THEME):
+    styles = theme.styles
+    style_bold = styles['bold']
+    table = Table([
+        [
+            Paragraph(f"<b>{YOUR_COMPANY_DETAILS['name']}</b>", styles['company_name']),
+            Paragraph("<b>Invoice No.</b>", style_bold),
+            Paragraph("<b>Dated</b>", style_bold)
+        ],
+        [
+            Paragraph("", styles['normal']),
+            invoice_no_cell,
+            invoice_date_cell
+        ]
+    ], colWidths=[90*mm, 45*mm, 45*mm])
+    table.setStyle(theme.tables['boxed'])
+    return table
+
+def build_main_details_table(po_number_cell, theme=STANDARD_THEME):
+    style_normal = theme.styles['normal']
+    table = Table([
+        [
+            Paragraph(YOUR_COMPANY_DETAILS['address'], style_normal),
+            Paragraph("", style_normal),
+            Paragraph("", style_normal)
+        ],
+        [
+            Paragraph(f"Phone No.: {YOUR_COMPANY_DETAILS['phone']}", style_normal),
+            Paragraph("Delivery Note", style_normal),
+            Paragraph("Mode/Terms of Payment", style_normal)
+        ],
+        [
+            Paragraph(f"E Mail ID: {YOUR_COMPANY_DETAILS['email']}", style_normal),
+            Paragraph("Supplier's Ref.", style_normal),
+            Paragraph("Other Reference(s)", style_normal)
+        ],
+        [
+            Paragraph(f"GSTIN/UIN: {YOUR_COMPANY_DETAILS['gstin']}", style_normal),
+            po_number_cell,
+            Paragraph("Dated", style_normal)
+        ],
+        [
+            Paragraph("State Name: Telangana, Code: 36", style_normal),
+            Paragraph("Despatch Document No.", style_normal),
+            Paragraph("Delivery Note Date", style_normal)
+        ],
+        [
+            Paragraph("Contact<br/>Place of Supply: Telangana", style_normal),
+            Paragraph("Despatched through", style_normal),
+            Paragraph("Destination", style_normal)
+        ]
+    ], colWidths=[90*mm, 45*mm, 45*mm])
+    table.setStyle(theme.tables['boxed'])
+    return table
+
+def build_tax_words_table(tax_words_cell, theme=STANDARD_THEME):
+    table = Table([[tax_words_cell, Paragraph(f"<b>Company's Bank Details</b><br/>Bank Name: {YOUR_COMPANY_DETAILS['bank_name']}<br/>A/c No. {YOUR_COMPANY_DETAILS['account_no']}<br/>Branch & IFS Code: {YOUR_COMPANY_DETAILS['ifsc_code']}", theme.styles['normal'])]], colWidths=[100*mm, 80*mm])
+    table.setStyle(theme.tables['boxed'])
+    return table
+
+def build_declaration_table(theme=STANDARD_THEME):
+    table = Table([
+        [
+            Paragraph("Declaration: We declare that this invoice shows the actual price of the goods described and that all particulars are true and correct.", theme.styles['normal']),
+            Paragraph(f"for {YOUR_COMPANY_DETAILS['name']}<br/><br/>Authorised Signatory", theme.styles['normal_right'])
+        ]
+    ], colWidths=[120*mm, 60*mm])
+    table.setStyle(theme.tables['declaration'])
+    return table
+
+def static_frame_block(name, build, cells, theme=STANDARD_THEME):
+    """Return the static table `name` with this invoice's `cells` in its per-invoice slots.
+
+    Replays the recorded layout when every cell fits the space it was recorded
+    with; otherwise (e.g. a very long PO number) builds the table normally.
+    Tables in embedded fonts cannot be replayed and are always built.
+    """
+    if theme.embedded:
+        return build(*cells, theme=theme)
+    slots, samples = STATIC_FRAME_SLOTS[name]
+    recorded = STATIC_FRAME.get(name, lambda: (build(*samples()), slots))
+    block = recorded.bind(dict(zip(slots, cells))) if recorded is not None else None
+    return block if block is not None else build(*cells)
+
+
+# --- ★★★ COMPLETED PDF ENGINE WITH PERFECTLY ALIGNED COLUMN WIDTHS ★★★ ---
+def generate_pdf_invoice(client, invoice_data, transactional_details, output_mode='compact'):
+    """Render the invoice PDF into a BytesIO; output_mode is one of OUTPUT_MODES"""
+    theme = output_theme(output_mode)
+    buffer = io.BytesIO()
+    width, height = A4
+    
+    styles = theme.styles
+    style_normal, style_small, style_bold = styles['normal'], styles['small'], styles['bold']
+    style_normal_right, style_small_right, style_small_center = styles['normal_right'], styles['small_right'], styles['small_center']
+    style_bold_right, style_bold_center, style_bold_small = styles['bold_right'], styles['bold_center'], styles['bold_small']
+    
+    left_margin, right_margin, top_margin, bottom_margin = 15*mm, 15*mm, 5*mm, 5*mm
+    
+    # 1. Header - Title based on LayoutTemplate and TaxType (shared with the HTML preview)
+    title = invoice_title(client)
+    # IGST or CGST/SGST columns by the same rule calculate_invoice() taxed the invoice by
+    igst = is_igst(client)
+    
+    def draw_title(c, doc):
+        # Repeated on every page; the tables below flow through the body frame and break across pages
+        c.setFont(theme.bold, 16)
+        c.drawCentredString(width / 2.0, height - top_margin - 0*mm, title)
+    
+    # invariant: fixed creation date and content-derived /ID, so identical inputs give identical bytes
+    doc_options = {}
+    if theme.embedded:
+        # The canvas's initial font goes into every page's resources, so it must be embedded too
+        doc_options = {'title': f"{title} {transactional_details['invoice_no']}", 'author': YOUR_COMPANY_DETAILS['name'], 'subject': client.company_name,
+                    'initialFontName': theme.regular}
+    doc = TimedDocTemplate(buffer, pagesize=A4, invariant=1, leftMargin=left_margin, rightMargin=right_margin, topMargin=top_margin + 1*mm, bottomMargin=bottom_margin, **doc_options)
+    body = Frame(left_margin, bottom_margin, width - left_margin - right_margin, height - top_margin - 1*mm - bottom_margin, leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id='body')
+    doc.addPageTemplates([PageTemplate(id='invoice', frames=[body], onPage=draw_title)])
+    gap = 0.5*mm
+    story = []
+    
+    # 2. Company Name and Invoice Details Header
+    company_header_table = static_frame_block('company_header', build_company_header_table, [
+        Paragraph(f"<b>{transactional_details['invoice_no']}</b>", style_bold),
+        Paragraph(f"<b>{transactional_details['invoice_date']}</b>", style_bold)
+    ], theme)
+    
+    story += [timed('company_header', company_header_table), Spacer(0, gap)]
+    
+    # 3. Main Details Table
+    main_details_table = static_frame_block('main_details', build_main_details_table, [
+        Paragraph(f"Buyer's Order No.<br/><b>{transactional_details.get('po_number', '')}</b>", style_normal)
+    ], theme)
+    
+    story += [timed('main_details', main_details_table), Spacer(0, gap)]
+    
+    # 4. Client Details Table
+    client_data = [
+        [
+            Paragraph("<b>Consignee (Ship to)</b>", style_bold),
+            Paragraph("<b>Buyer (Bill to)</b>", style_bold)
+        ],
+        [
+            Paragraph(f"<b>{client.company_name}</b>", style_bold),
+            Paragraph(f"<b>{client.company_name}</b>", style_bold)
+        ],
+        [
+            Paragraph(f"GSTIN/UIN: {client.gstin}", style_normal),
+            Paragraph(f"GSTIN/UIN: {client.gstin}", style_normal)
+        ],
+        [
+            Paragraph(f"Address: {client.address}", style_normal),
+            Paragraph(f"Address: {client.address}", style_normal)
+        ],
+        [
+            Paragraph(f"State Name: {client.state}", style_normal),
+            Paragraph(f"State Name: {client.state}", style_normal)
+        ],
+        [
+            Paragraph(f"Place of Supply: {client.state}", style_normal),
+            Paragraph(f"Place of Supply: {client.state}", style_normal)
+        ]
+    ]
+    
+    client_table = Table(client_data, colWidths=[90*mm, 90*mm])
+    client_table.setStyle(theme.tables['boxed'])
+    
+    story += [timed('client', client_table), Spacer(0, gap)]
+    
+    # 5. Items Table - header row repeats and the running subtotal is carried forward on every page
+    items_header = ['Sl No', 'Description of Goods', 'HSN/SAC', 'GST Rate', 'Quantity', 'Rate', 'per', 'Amount']
+    items_header_rows = [[Paragraph(f'<b>{h}</b>', style_bold) for h in items_header]]
+    items_data, item_amounts = [], []
+    
+    valid_items = [item for item in invoice_data['items'] if item.error is None]
+    for i, item in enumerate(valid_items):
+        # Format amounts with paise (2 decimal places) - no rupee symbol for individual items
+        rate_formatted = f"{item.rate:.2f}"
+        amount_formatted = f"{item.amount:.2f}"
+        
+        items_data.append([
+            Paragraph(str(i + 1), style_normal),
+            Paragraph(item.description, style_normal),
+            Paragraph(item.hsn_sac, style_normal),
+            Paragraph(f"{item.gst_rate:.0f}%", style_normal),
+            Paragraph(f"{item.quantity:.0f} {item.unit}", style_normal),
+            Paragraph(rate_formatted, style_normal_right),
+            Paragraph(item.unit, style_normal),
+            Paragraph(amount_formatted, style_normal_right)
+        ])
+        item_amounts.append(item.amount)
+    
+    while len(items_data) < 5:
+        items_data.append(['', '', '', '', '', '', '', '']); item_amounts.append(0)
+    
+    items_footer_rows = []
+    items_footer_rows.append([
+        '', '', '', '', '', '', '',
+        Paragraph(f"{invoice_data['subtotal']:.2f}", style_normal_right)
+    ])
+    
+    total_cgst = sum(b.get('cgst_amount', 0) for b in invoice_data['tax_details'].get('breakdown', []))
+    total_sgst = sum(b.get('sgst_amount', 0) for b in invoice_data['tax_details'].get('breakdown', []))
+    total_igst = sum(b.get('igst_amount', 0) for b in invoice_data['tax_details'].get('breakdown', []))
+    
+    # Tax rows based on the tax type
+    if igst:
+        items_footer_rows.append([
+            '', '', '', '', '', '',
+            Paragraph('<b>Input IGST</b>', style_bold_small),
+            Paragraph(f"{total_igst:.2f}", style_normal_right)
+        ])
+    else:
+        items_footer_rows.append([
+            '', '', '', '', '', '',
+            Paragraph('<b>Input CGST</b>', style_bold_small),
+            Paragraph(f"{total_cgst:.2f}", style_normal_right)
+        ])
+        items_footer_rows.append([
+            '', '', '', '', '', '',
+            Paragraph('<b>Input SGST</b>', style_bold_small),
+            Paragraph(f"{total_sgst:.2f}", style_normal_right)
+        ])
+    
+    items_footer_rows.append([
+        '', '', '', '', '', '',
+        Paragraph('<b>Round Off</b>', style_bold),
+        Paragraph('0.00', style_normal_right)
+    ])
+    
+    items_footer_rows.append([
+        '', '', '', '', '', '',
+        Paragraph('<b>Total</b>', style_bold),
+        Paragraph(f"<b>{theme.currency} {invoice_data['grand_total']:.2f}</b>", style_bold_right)
+    ])
+    
+    def carry_row(label, amount):
+        return ['', Paragraph(f'<b>{label}</b>', style_bold), '', '', '', '', '', Paragraph(f"<b>{amount:.2f}</b>", style_bold_right)]
+    
+    items_table = PaginatedTable(items_header_rows, items_data, items_footer_rows, [13*mm, 53*mm, 20*mm, 15*mm, 22*mm, 20*mm, 12*mm, 25*mm],
+                                 theme.items_table_style, carry=carry_row, amounts=item_amounts)
+    story += [timed('items', items_table), Spacer(0, gap)]
+    
+    # 6. Amount in Words Section
+    total_in_words = amount_in_words(invoice_data['grand_total'])
+    
+    words_data = [[Paragraph(f"<b>Amount Chargeable (in words)</b><br/>INR {total_in_words}", style_normal), Paragraph('<b>E. & O.E</b>', style_normal_right)]]
+    words_table = Table(words_data, colWidths=[140*mm, 40*mm])
+    words_table.setStyle(theme.tables['words'])
+    story += [timed('amount_words', words_table), Spacer(0, gap)]
+    
+    # 7. Tax Breakdown Table - two header rows, one row per item, then the total row
+    tax_data = []
+    
+    # Tax table structure based on the tax type
+    if igst:
+        tax_data.append([Paragraph('<b>HSN/SAC</b>', style_bold), Paragraph('<b>Taxable<br/>Value</b>', style_bold_center), Paragraph('<b>Integrated Tax</b>', style_bold_center), '', Paragraph('<b>Total<br/>Tax Amount</b>', style_bold_center)])
+        tax_data.append(['', '', Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), ''])
+        for item in valid_items:
+            hsn, taxable_value, tax_rate = item.hsn_sac, item.amount, item.gst_rate
+            igst_amount = gst_amount(taxable_value, tax_rate)
+            tax_data.append([Paragraph(hsn, style_small), Paragraph(f"{taxable_value:.2f}", style_small_right), Paragraph(f"{tax_rate:.1f}%", style_small_center), Paragraph(f"{igst_amount:.2f}", style_small_right), Paragraph(f"{igst_amount:.2f}", style_small_right)])
+        tax_data.append([Paragraph('<b>Total</b>', style_bold), Paragraph(f"<b>{invoice_data['subtotal']:.2f}</b>", style_bold_right), '', Paragraph(f"<b>{total_igst:.2f}</b>", style_bold_right), Paragraph(f"<b>{invoice_data['total_tax']:.2f}</b>", style_bold_right)])
+        col_widths = [20*mm, 53*mm, 27*mm, 35*mm, 45*mm]
+    else:
+        # CGST/SGST table structure
+        tax_data.append([Paragraph('<b>HSN/SAC</b>', style_bold), Paragraph('<b>Taxable<br/>Value</b>', style_bold_center), Paragraph('<b>Central Tax</b>', style_bold_center), '', Paragraph('<b>State Tax</b>', style_bold_center), '', Paragraph('<b>Total<br/>Tax Amount</b>', style_bold_center)])
+        tax_data.append(['', '', Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), Paragraph('<b>Rate</b>', style_bold), Paragraph('<b>Amount</b>', style_bold), ''])
+        for item in valid_items:
+            hsn, taxable_value, tax_rate = item.hsn_sac, item.amount, item.gst_rate
+            cgst_rate, sgst_rate = tax_rate / 2, tax_rate / 2
+            cgst_amount, sgst_amount = gst_amount(taxable_value, cgst_rate), gst_amount(taxable_value, sgst_rate)
+            total_tax_amount = cgst_amount + sgst_amount
+            tax_data.append([Paragraph(hsn, style_small), Paragraph(f"{taxable_value:.2f}", style_small_right), Paragraph(f"{cgst_rate:.1f}%", style_small_center), Paragraph(f"{cgst_amount:.2f}", style_small_right), Paragraph(f"{sgst_rate:.1f}%", style_small_center), Paragraph(f"{sgst_amount:.2f}", style_small_right), Paragraph(f"{total_tax_amount:.2f}", style_small_right)])
+        tax_data.append([Paragraph('<b>Total</b>', style_bold), Paragraph(f"<b>{invoice_data['subtotal']:.2f}</b>", style_bold_right), '', Paragraph(f"<b>{total_cgst:.2f}</b>", style_bold_right), '', Paragraph(f"<b>{total_sgst:.2f}</b>", style_bold_right), Paragraph(f"<b>{invoice_data['total_tax']:.2f}</b>", style_bold_right)])
+        col_widths = [33*mm, 53*mm, 15*mm, 22*mm, 15*mm, 20*mm, 22*mm]
+    
+    # CGST/SGST has an extra pair of spanned Rate/Amount header columns
+    tax_style = theme.tables['tax_igst'] if igst else theme.tables['tax_cgst_sgst']
+    tax_table = PaginatedTable(tax_data[:2], tax_data[2:-1], tax_data[-1:], col_widths, lambda first_body_row, last_body_row: tax_style)
+    story += [timed('tax', tax_table), Spacer(0, gap)]
+
+    # 8. Tax Amount in Words Table
+    tax_in_words = amount_in_words(invoice_data['total_tax'])
+    tax_words_table = static_frame_block('tax_words', build_tax_words_table, [
+        Paragraph(f"<b>Tax Amount (in words): INR</b><br/>{tax_in_words}", style_normal)
+    ], theme)
+    story += [timed('tax_words', tax_words_table), Spacer(0, gap)]
+    
+    # 9. Declaration and Signature Table
+    declaration_table = static_frame_block('declaration', build_declaration_table, [], theme)
+    story.append(timed('declaration', declaration_table))
+    
+    doc.build(story, canvasmaker=partial(PageCountCanvas, binary_streams=output_mode != 'ascii'))
+    buffer.seek(0)
+    return buffer
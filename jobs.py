@@ -0,0 +1,66 @@
+import datetime
+import threading
+from collections import OrderedDict
+
+QUEUED, DONE, FAILED = 'queued', 'done', 'failed'
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+class JobStore:
+    """Thread-safe table of the render jobs submitted to this process.
+
+    Holds at most `max_jobs` entries; the oldest finished jobs are forgotten
+    first. The table is per process, so job ids should be derivable from
+    shared state (e.g. a PDF cache key) for other workers to answer for them.
+    """
+
+    def __init__(self, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def create(self, job_id, **info):
+        """Register a queued job; returns (job, created).
+
+        Submitting an id that is still queued or already done returns the
+        existing job instead, so identical submissions are rendered once.
+        A failed job is replaced and may run again.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job['status'] != FAILED:
+                return dict(job), False
+            job = dict(info, id=job_id, status=QUEUED, errors=[], submitted_at=_now(), finished_at=None)
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            self._trim()
+            return dict(job), True
+
+    def finish(self, job_id, errors):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(status=FAILED if errors else DONE, errors=list(errors), finished_at=_now())
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _trim(self):
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job['status'] != QUEUED][:excess]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+        return counts
@@ -0,0 +1,358 @@
+import datetime
+import sqlite3
+import threading
+from decimal import Decimal
+
+from money import gst_amount
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY,
+    invoice_no TEXT NOT NULL,
+    client TEXT NOT NULL,
+    invoice_date TEXT NOT NULL,          -- YYYY-MM-DD, so ranges and ordering work as text
+    po_number TEXT NOT NULL DEFAULT '',
+    tax_type TEXT NOT NULL DEFAULT '',
+    subtotal TEXT NOT NULL,              -- Decimal amounts kept as exact strings
+    total_tax TEXT NOT NULL,
+    grand_total TEXT NOT NULL,
+    line_count INTEGER NOT NULL,
+    cache_key TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS invoices_number_client ON invoices (invoice_no, client);
+CREATE INDEX IF NOT EXISTS invoices_client_date ON invoices (client, invoice_date, id);
+CREATE INDEX IF NOT EXISTS invoices_date ON invoices (invoice_date, id);
+CREATE INDEX IF NOT EXISTS invoices_cache_key ON invoices (cache_key);
+
+CREATE TABLE IF NOT EXISTS invoice_items (
+    invoice_id INTEGER NOT NULL REFERENCES invoices (id) ON DELETE CASCADE,
+    line_no INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    hsn_sac TEXT,
+    quantity REAL NOT NULL,
+    unit TEXT,
+    rate TEXT NOT NULL,
+    gst_rate REAL NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (invoice_id, line_no)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS invoice_taxes (
+    invoice_id INTEGER NOT NULL REFERENCES invoices (id) ON DELETE CASCADE,
+    rate REAL NOT NULL,
+    taxable_value TEXT NOT NULL,
+    igst_amount TEXT,
+    cgst_amount TEXT,
+    sgst_amount TEXT,
+    PRIMARY KEY (invoice_id, rate)
+) WITHOUT ROWID;
+
+-- Kept apart so listing and searching never page PDF bytes through the cache.
+CREATE TABLE IF NOT EXISTS invoice_pdfs (
+    invoice_id INTEGER PRIMARY KEY REFERENCES invoices (id) ON DELETE CASCADE,
+    pdf BLOB NOT NULL
+);
+
+-- Monthly rollups for GST reports, updated with every recorded invoice (see ROLLUPS).
+-- Amounts are integer paise so that adding and subtracting invoices stays exact.
+CREATE TABLE IF NOT EXISTS sales_by_client (
+    month TEXT NOT NULL,                 -- YYYY-MM of invoice_date
+    client TEXT NOT NULL,
+    tax_type TEXT NOT NULL,
+    invoice_count INTEGER NOT NULL,
+    taxable_paise INTEGER NOT NULL,
+    igst_paise INTEGER NOT NULL,
+    cgst_paise INTEGER NOT NULL,
+    sgst_paise INTEGER NOT NULL,
+    total_paise INTEGER NOT NULL,        -- sum of grand totals
+    PRIMARY KEY (month, client, tax_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sales_by_rate (
+    month TEXT NOT NULL,
+    gst_rate REAL NOT NULL,
+    tax_type TEXT NOT NULL,
+    invoice_count INTEGER NOT NULL,
+    taxable_paise INTEGER NOT NULL,
+    igst_paise INTEGER NOT NULL,
+    cgst_paise INTEGER NOT NULL,
+    sgst_paise INTEGER NOT NULL,
+    PRIMARY KEY (month, gst_rate, tax_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sales_by_hsn (
+    month TEXT NOT NULL,
+    hsn_sac TEXT NOT NULL,               -- '' for lines without one
+    unit TEXT NOT NULL,
+    gst_rate REAL NOT NULL,
+    line_count INTEGER NOT NULL,
+    quantity REAL NOT NULL,
+    taxable_paise INTEGER NOT NULL,
+    igst_paise INTEGER NOT NULL,
+    cgst_paise INTEGER NOT NULL,
+    sgst_paise INTEGER NOT NULL,
+    PRIMARY KEY (month, hsn_sac, gst_rate, unit)
+) WITHOUT ROWID;
+"""
+
+HEADER_COLUMNS = ['id', 'invoice_no', 'client', 'invoice_date', 'po_number', 'tax_type', 'subtotal', 'total_tax', 'grand_total', 'line_count', 'created_at', 'updated_at']
+ITEM_COLUMNS = ['line_no', 'description', 'hsn_sac', 'quantity', 'unit', 'rate', 'gst_rate', 'amount']
+TAX_COLUMNS = ['rate', 'taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount']
+
+# table -> (key columns, summed columns); the first summed column counts invoices or lines
+ROLLUPS = {
+    'sales_by_client': (['month', 'client', 'tax_type'], ['invoice_count', 'taxable_paise', 'igst_paise', 'cgst_paise', 'sgst_paise', 'total_paise']),
+    'sales_by_rate': (['month', 'gst_rate', 'tax_type'], ['invoice_count', 'taxable_paise', 'igst_paise', 'cgst_paise', 'sgst_paise']),
+    'sales_by_hsn': (['month', 'hsn_sac', 'gst_rate', 'unit'], ['line_count', 'quantity', 'taxable_paise', 'igst_paise', 'cgst_paise', 'sgst_paise']),
+}
+# Report names of the paise columns; their sums are returned as exact rupee strings
+AMOUNT_NAMES = {'taxable_paise': 'taxable_value', 'igst_paise': 'igst_amount', 'cgst_paise': 'cgst_amount', 'sgst_paise': 'sgst_amount', 'total_paise': 'invoice_value'}
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def iso_date(display_date):
+    """DD/MM/YYYY (as printed on the invoice) -> YYYY-MM-DD"""
+    return datetime.datetime.strptime(display_date, '%d/%m/%Y').strftime('%Y-%m-%d')
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _paise(amount):
+    return int(Decimal(amount or 0) * 100)
+
+
+def _rupees(paise):
+    return str(Decimal(paise).scaleb(-2))
+
+
+def _rollup_rows(header, items, taxes):
+    """One invoice's contribution to each rollup table: {table: {key: [summed values]}}.
+
+    header is (invoice_date, client, tax_type, subtotal, grand_total), items
+    (hsn_sac, unit, quantity, gst_rate, amount) and taxes (rate,
+    taxable_value, igst_amount, cgst_amount, sgst_amount) rows as stored. Tax
+    by HSN is not recorded per line, so it is worked out per HSN and rate the
+    way calculate_invoice() does per rate; it can differ from the invoices'
+    own tax by a paisa.
+    """
+    invoice_date, client, tax_type, subtotal, grand_total = header
+    month = invoice_date[:7]
+    by_rate = {}
+    for rate, taxable_value, igst, cgst, sgst in taxes:
+        by_rate[(month, rate, tax_type)] = [1, _paise(taxable_value), _paise(igst), _paise(cgst), _paise(sgst)]
+    tax_columns = [sum(values[i] for values in by_rate.values()) for i in (2, 3, 4)]
+    by_client = {(month, client, tax_type): [1, _paise(subtotal), *tax_columns, _paise(grand_total)]}
+
+    by_hsn, taxable_by_hsn = {}, {}
+    for hsn_sac, unit, quantity, gst_rate, amount in items:
+        key = (month, hsn_sac or '', gst_rate, unit or '')
+        values = by_hsn.setdefault(key, [0, 0.0, 0, 0, 0, 0])
+        values[0] += 1; values[1] += quantity
+        taxable_by_hsn[key] = taxable_by_hsn.get(key, Decimal(0)) + Decimal(amount)
+    for key, taxable_value in taxable_by_hsn.items():
+        gst_rate = key[2]
+        values = by_hsn[key]
+        values[2] = _paise(taxable_value)
+        if tax_type == 'IGST':
+            values[3] = _paise(gst_amount(taxable_value, gst_rate))
+        elif tax_type:
+            values[4] = values[5] = _paise(gst_amount(taxable_value, gst_rate / 2))
+    return {'sales_by_client': by_client, 'sales_by_rate': by_rate, 'sales_by_hsn': by_hsn}
+
+
+def _apply_rollups(conn, rollup_rows, sign):
+    """Add (sign 1) or take away (sign -1) an invoice's contribution; rows left counting nothing are dropped."""
+    for table, rows in rollup_rows.items():
+        keys, values = ROLLUPS[table]
+        columns = keys + values
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            f" ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {', '.join(f'{v} = {v} + excluded.{v}' for v in values)}",
+            [(*key, *(sign * v for v in row)) for key, row in rows.items()])
+        if sign < 0:
+            conn.executemany(f"DELETE FROM {table} WHERE {' AND '.join(f'{k} = ?' for k in keys)} AND {values[0]} <= 0", list(rows))
+
+
+class InvoiceLedger:
+    """SQLite record of every generated invoice: header, lines, tax breakdown and optionally the PDF.
+
+    (invoice_no, client) identifies an invoice; generating it again replaces
+    the stored version. Each thread gets its own connection and the database
+    runs in WAL mode, so web threads, batch processes and readers can share
+    the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+                    self._local.conn = conn
+                    if conn.execute('SELECT EXISTS (SELECT 1 FROM invoices) AND NOT EXISTS (SELECT 1 FROM sales_by_client)').fetchone()[0]:
+                        self.rebuild_rollups()
+            self._local.conn = conn
+        return conn
+
+    def contains(self, cache_key):
+        """True if an invoice with exactly these contents (its PDF cache key) is already recorded."""
+        return self._connect().execute('SELECT 1 FROM invoices WHERE cache_key = ? LIMIT 1', (cache_key,)).fetchone() is not None
+
+    def record(self, cache_key, client, invoice_data, transactional_details, pdf_bytes=None):
+        """Insert or replace the invoice; returns its id."""
+        conn = self._connect()
+        now = _now()
+        header = (
+            str(transactional_details['invoice_no']), client.company_name, iso_date(transactional_details['invoice_date']),
+            transactional_details.get('po_number') or '', invoice_data['tax_details'].get('type', ''),
+            str(invoice_data['subtotal']), str(invoice_data['total_tax']), str(invoice_data['grand_total']),
+            len(invoice_data['items']), cache_key, now, now,
+        )
+        items = [(n, item.description, _text(item.hsn_sac), item.quantity, _text(item.unit), str(item.rate), item.gst_rate, str(item.amount))
+                 for n, item in enumerate(invoice_data['items'], 1)]
+        taxes = [(tax['rate'], str(tax['taxable_value']), _text(tax.get('igst_amount')), _text(tax.get('cgst_amount')), _text(tax.get('sgst_amount')))
+                 for tax in invoice_data['tax_details'].get('breakdown', [])]
+        with conn:
+            # Take the write lock before looking up the previous version, so no other writer can
+            # record the same invoice between that lookup and the upsert and double-count the rollups
+            conn.execute('BEGIN IMMEDIATE')
+            # A re-recorded invoice first takes its previous version out of the rollups
+            previous = conn.execute('SELECT id FROM invoices WHERE invoice_no = ? AND client = ?', header[:2]).fetchone()
+            if previous is not None:
+                _apply_rollups(conn, self._stored_rollup_rows(conn, previous[0]), -1)
+            invoice_id = conn.execute(
+                'INSERT INTO invoices (invoice_no, client, invoice_date, po_number, tax_type, subtotal, total_tax, grand_total, line_count, cache_key, created_at, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (invoice_no, client) DO UPDATE SET invoice_date = excluded.invoice_date, po_number = excluded.po_number,'
+                ' tax_type = excluded.tax_type, subtotal = excluded.subtotal, total_tax = excluded.total_tax, grand_total = excluded.grand_total,'
+                ' line_count = excluded.line_count, cache_key = excluded.cache_key, updated_at = excluded.updated_at'
+                ' RETURNING id', header).fetchone()[0]
+            conn.execute('DELETE FROM invoice_items WHERE invoice_id = ?', (invoice_id,))
+            conn.execute('DELETE FROM invoice_taxes WHERE invoice_id = ?', (invoice_id,))
+            conn.execute('DELETE FROM invoice_pdfs WHERE invoice_id = ?', (invoice_id,))
+            conn.executemany(
+                'INSERT INTO invoice_items (invoice_id, line_no, description, hsn_sac, quantity, unit, rate, gst_rate, amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(invoice_id, *item) for item in items])
+            conn.executemany(
+                'INSERT INTO invoice_taxes (invoice_id, rate, taxable_value, igst_amount, cgst_amount, sgst_amount) VALUES (?, ?, ?, ?, ?, ?)',
+                [(invoice_id, *tax) for tax in taxes])
+            if pdf_bytes is not None:
+                conn.execute('INSERT INTO invoice_pdfs (invoice_id, pdf) VALUES (?, ?)', (invoice_id, pdf_bytes))
+            _apply_rollups(conn, _rollup_rows((header[2], header[1], header[4], header[5], header[7]),
+                                              [(item[2], item[4], item[3], item[6], item[7]) for item in items], taxes), 1)
+        return invoice_id
+
+    @staticmethod
+    def _stored_rollup_rows(conn, invoice_id):
+        header = conn.execute('SELECT invoice_date, client, tax_type, subtotal, grand_total FROM invoices WHERE id = ?', (invoice_id,)).fetchone()
+        items = conn.execute('SELECT hsn_sac, unit, quantity, gst_rate, amount FROM invoice_items WHERE invoice_id = ?', (invoice_id,)).fetchall()
+        taxes = conn.execute(f"SELECT {', '.join(TAX_COLUMNS)} FROM invoice_taxes WHERE invoice_id = ?", (invoice_id,)).fetchall()
+        return _rollup_rows(header, items, taxes)
+
+    def rebuild_rollups(self):
+        """Recompute the report rollups from every recorded invoice (once, for ledgers that predate them)."""
+        conn = self._connect()
+        with conn:
+            for table in ROLLUPS:
+                conn.execute(f'DELETE FROM {table}')
+            for (invoice_id,) in conn.execute('SELECT id FROM invoices').fetchall():
+                _apply_rollups(conn, self._stored_rollup_rows(conn, invoice_id), 1)
+
+    def search(self, client=None, invoice_no=None, date_from=None, date_to=None, limit=50, cursor=None):
+        """Invoice headers, newest invoice_date first, one page at a time.
+
+        Returns (rows, next_cursor). The cursor is the (invoice_date, id) of
+        the last row, so every page is an index range scan no matter how deep
+        into the results it is, unlike OFFSET paging.
+        """
+        where, params = [], []
+        if client:
+            where.append('client = ?'); params.append(client)
+        if invoice_no:
+            where.append('invoice_no = ?'); params.append(invoice_no)
+        if date_from:
+            where.append('invoice_date >= ?'); params.append(date_from)
+        if date_to:
+            where.append('invoice_date <= ?'); params.append(date_to)
+        if cursor:
+            where.append('(invoice_date, id) < (?, ?)'); params.extend(cursor)
+        sql = f"SELECT {', '.join(HEADER_COLUMNS)} FROM invoices"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY invoice_date DESC, id DESC LIMIT ?'
+        rows = self._connect().execute(sql, params + [limit + 1]).fetchall()
+        next_cursor = (rows[limit - 1][3], rows[limit - 1][0]) if len(rows) > limit else None
+        return [dict(zip(HEADER_COLUMNS, row)) for row in rows[:limit]], next_cursor
+
+    def get(self, invoice_id):
+        """Header plus 'items' and 'tax_breakdown' for one invoice, or None."""
+        conn = self._connect()
+        row = conn.execute(f"SELECT {', '.join(HEADER_COLUMNS)}, cache_key FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+        if row is None:
+            return None
+        invoice = dict(zip(HEADER_COLUMNS + ['cache_key'], row))
+        invoice['items'] = [dict(zip(ITEM_COLUMNS, r)) for r in conn.execute(
+            f"SELECT {', '.join(ITEM_COLUMNS)} FROM invoice_items WHERE invoice_id = ? ORDER BY line_no", (invoice_id,))]
+        invoice['tax_breakdown'] = [dict(zip(TAX_COLUMNS, r)) for r in conn.execute(
+            f"SELECT {', '.join(TAX_COLUMNS)} FROM invoice_taxes WHERE invoice_id = ? ORDER BY rate", (invoice_id,))]
+        return invoice
+
+    def get_pdf(self, invoice_id):
+        row = self._connect().execute('SELECT pdf FROM invoice_pdfs WHERE invoice_id = ?', (invoice_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _summarize(self, table, group_columns, month_from, month_to):
+        _, values = ROLLUPS[table]
+        rows = self._connect().execute(
+            f"SELECT {', '.join(group_columns + [f'SUM({v})' for v in values])} FROM {table}"
+            f" WHERE month BETWEEN ? AND ? GROUP BY {', '.join(group_columns)} ORDER BY {', '.join(group_columns)}",
+            (month_from, month_to)).fetchall()
+        names = group_columns + [AMOUNT_NAMES.get(v, v) for v in values]
+        summary = []
+        for row in rows:
+            entry = dict(zip(names, row))
+            for v in values:
+                if v in AMOUNT_NAMES:
+                    entry[AMOUNT_NAMES[v]] = _rupees(entry[AMOUNT_NAMES[v]])
+            if 'igst_amount' in entry:
+                entry['total_tax'] = str(sum(Decimal(entry[name]) for name in ('igst_amount', 'cgst_amount', 'sgst_amount')))
+            summary.append(entry)
+        return summary
+
+    def gst_summary(self, month_from, month_to=None):
+        """GSTR-style totals for the months month_from to month_to (YYYY-MM, inclusive).
+
+        Read from the rollups only: the cost depends on the number of months,
+        clients, rates and HSN codes involved, not on the number of invoices.
+        Returns {'from', 'to', 'totals', 'by_month', 'by_rate', 'by_hsn',
+        'by_client'}, with amounts as exact rupee strings.
+        """
+        month_to = month_to or month_from
+        by_month = self._summarize('sales_by_client', ['month'], month_from, month_to)
+        totals = {'invoice_count': sum(m['invoice_count'] for m in by_month)}
+        for name in ('taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount', 'total_tax', 'invoice_value'):
+            totals[name] = str(sum((Decimal(m[name]) for m in by_month), Decimal('0.00')))
+        return {
+            'from': month_from, 'to': month_to, 'totals': totals, 'by_month': by_month,
+            'by_rate': self._summarize('sales_by_rate', ['gst_rate', 'tax_type'], month_from, month_to),
+            'by_hsn': self._summarize('sales_by_hsn', ['hsn_sac', 'gst_rate', 'unit'], month_from, month_to),
+            'by_client': self._summarize('sales_by_client', ['client', 'tax_type'], month_from, month_to),
+        }
@@ -0,0 +1,93 @@
+import os
+import threading
+
+
+class MasterDataStore:
+    """Process-wide holder of the current master-data snapshot.
+
+    loader() builds a snapshot (anything with a .version) or returns None. It
+    runs once and again only when one of the watched files changes on disk
+    (mtime, size or inode). The new snapshot is built off to the side and
+    swapped in with a single assignment; readers keep whichever snapshot they
+    were handed for the whole request, so a reload never changes data
+    mid-invoice.
+    """
+
+    def __init__(self, paths, loader):
+        self.paths = tuple(paths)
+        self.loader = loader
+        self._lock = threading.Lock()
+        # (signature, snapshot) kept in one tuple so it is replaced in one step.
+        self._current = (None, None)
+        self._failed_signature = None
+        # Hits are counted outside _lock, which a reload holds for as long as the loader runs
+        self._hits_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.errors = 0
+
+    def _stat_signature(self):
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size, st.st_ino))
+            except OSError:
+                signature.append((path, None, None, None))
+        return tuple(signature)
+
+    def get(self):
+        """Return the current MasterData snapshot, or None if it cannot be loaded."""
+        signature = self._stat_signature()
+        current_signature, snapshot = self._current
+        if snapshot is not None and signature == current_signature:
+            self._count_hit()
+            return snapshot
+
+        with self._lock:
+            # Another thread may have finished the reload while we waited.
+            current_signature, snapshot = self._current
+            if snapshot is not None and signature == current_signature:
+                self._count_hit()
+                return snapshot
+            if signature == self._failed_signature:
+                return snapshot
+            self.misses += 1
+            loaded = self.loader()
+            if loaded is None:
+                self.errors += 1
+                # Keep serving the last good data rather than failing every request
+                # while a CSV is half-written or temporarily broken; the next
+                # change to the files triggers another attempt.
+                self._failed_signature = signature
+                return snapshot
+            if snapshot is not None:
+                self.reloads += 1
+            # The loader may have rewritten a watched file (e.g. re-imported the catalog)
+            self._current = (self._stat_signature(), loaded)
+            return loaded
+
+    def _count_hit(self):
+        with self._hits_lock:
+            self.hits += 1
+
+    def invalidate(self):
+        """Force the next get() to re-read the files."""
+        with self._lock:
+            self._current = (None, self._current[1])
+            self._failed_signature = None
+
+    def stats(self):
+        snapshot = self._current[1]
+        with self._hits_lock:
+            hits = self.hits
+        total = hits + self.misses
+        return {
+            'hits': hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'errors': self.errors,
+            'hit_ratio': hits / total if total else 0.0,
+            'version': snapshot.version if snapshot is not None else None,
+        }
@@ -0,0 +1,143 @@
+"""In-process timing histograms, exported in the Prometheus text format at /metrics.
+
+    with span('calculate'):
+        invoice_data = calculate_invoice(...)
+
+Every gunicorn worker keeps its own counters, so scrape each worker (or sum
+them in Prometheus); spans timed inside the batch process pool stay in that
+pool's processes and are not exported.
+"""
+import bisect
+import cProfile
+import datetime
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds: sub-millisecond lookups up to multi-second batch renders
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per combination of label values."""
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), count, sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((values, [list(s[0]), s[1], s[2]]) for values, s in self._series.items())
+        for values, (counts, count, total) in series:
+            pairs = list(zip(self.labels, values))
+            cumulative = 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{_label_text(pairs + [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_count{_label_text(pairs)} {count}')
+            lines.append(f'{self.name}_sum{_label_text(pairs)} {total:.6f}')
+        return lines
+
+    def summary(self):
+        """{label values: (count, total seconds)}, e.g. for benchmarks."""
+        with self._lock:
+            return {values: (s[1], s[2]) for values, s in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """Return the histogram called `name`, creating it on first use."""
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, help, labels, buckets)
+            return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('invoice_stage_seconds', 'Time spent in each stage of handling an invoice', ['stage'])
+PDF_FLOWABLE_SECONDS = REGISTRY.histogram('invoice_pdf_flowable_seconds', 'Layout (wrap/split) plus drawing time of each PDF table', ['table'])
+REQUEST_SECONDS = REGISTRY.histogram('http_request_seconds', 'Request handling time, excluding streamed response bodies', ['endpoint', 'method', 'status'])
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block into invoice_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+
+class RequestProfiler:
+    """Runs requests under cProfile and dumps one .prof file per request into `directory`.
+
+    Only one request is profiled at a time (the profiler hooks are
+    per-interpreter); requests arriving meanwhile run unprofiled.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._busy = threading.Lock()
+
+    def start(self):
+        """Return a running profiler, or None if another request holds it."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except Exception:
+            self._busy.release()
+            return None
+        return profiler
+
+    def stop(self, profiler, name):
+        """Stop `profiler` and write its stats; returns the file path."""
+        try:
+            profiler.disable()
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            path = os.path.join(self.directory, f'{stamp}-{os.getpid()}-{name}.prof')
+            profiler.dump_stats(path)
+            return path
+        finally:
+            self._busy.release()
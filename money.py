@@ -0,0 +1,14 @@
+"""Exact rupee arithmetic: Decimal amounts rounded half-up to paise."""
+from decimal import Decimal, ROUND_HALF_UP
+
+PAISE = Decimal('0.01')
+
+
+def to_money(value):
+    """Exact Decimal for a price/amount, rounded half-up to paise"""
+    return Decimal(str(value)).quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def gst_amount(taxable_value, rate):
+    """Tax on a Decimal taxable value at a percentage rate, rounded to paise"""
+    return (taxable_value * Decimal(str(rate)) / 100).quantize(PAISE, rounding=ROUND_HALF_UP)
@@ -0,0 +1,129 @@
+"""Bulk order import from an XLSX or CSV sheet with one row per line item.
+
+Header names are matched case-insensitively, with the aliases below:
+client, invoice_no, invoice_date, po_number, product, quantity. Rows sharing
+an invoice_no and client form one invoice, in first-seen order, as in a CSV
+batch upload (see batch.py).
+"""
+import csv
+import datetime
+import io
+
+from batch import BatchError
+
+COLUMN_ALIASES = {
+    'company': 'client', 'company_name': 'client', 'customer': 'client',
+    'invoice': 'invoice_no', 'invoice_number': 'invoice_no',
+    'date': 'invoice_date',
+    'po': 'po_number', 'po_no': 'po_number', 'purchase_order': 'po_number',
+    'description': 'product', 'product_description': 'product',
+    'qty': 'quantity',
+}
+REQUIRED_COLUMNS = ['client', 'product', 'quantity']
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+
+def column_name(header):
+    key = '_'.join(str(header or '').strip().lower().replace('.', '').split())
+    return COLUMN_ALIASES.get(key, key)
+
+
+def _dict_rows(rows):
+    """(row number, {column: value}) for each non-blank data row; row 1 is the header."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise BatchError('The sheet is empty')
+    columns = [column_name(h) for h in header]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise BatchError(f"Sheet is missing column(s): {', '.join(missing)}")
+    for row_no, values in enumerate(rows, start=2):
+        if all(value is None or str(value).strip() == '' for value in values):
+            continue
+        yield row_no, dict(zip(columns, values))
+
+
+def iter_xlsx_rows(stream):
+    """Rows of the first worksheet, read in openpyxl's streaming read-only mode."""
+    from openpyxl import load_workbook  # only needed for XLSX uploads
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from _dict_rows(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(stream):
+    yield from _dict_rows(csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')))
+
+
+def iter_order_rows(stream, filename=''):
+    """Rows of an uploaded order sheet; XLSX is recognized by its extension, anything else is read as CSV."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return iter_xlsx_rows(stream)
+    return iter_csv_rows(stream)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # invoice numbers typed into a numeric Excel cell
+    return str(value).strip()
+
+
+def _date(value):
+    """Cell value -> YYYY-MM-DD ('' if blank); raises ValueError if unrecognized"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    text = _text(value)
+    if not text:
+        return ''
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(text)
+
+
+def group_orders(rows):
+    """Group (row number, row) pairs into orders shaped like normalized batch specs.
+
+    Each order is {'client', 'invoice_no', 'invoice_date', 'po_number',
+    'items': [{'row', 'product', 'quantity'}], 'errors': []}. Rows with a blank
+    or zero quantity are skipped, as on the form; other bad cells become
+    'Row n: ...' errors of their order.
+    """
+    orders = {}
+    for row_no, row in rows:
+        client, invoice_no = _text(row.get('client')), _text(row.get('invoice_no'))
+        order = orders.setdefault((invoice_no, client), {'client': client, 'invoice_no': invoice_no, 'invoice_date': '', 'po_number': '', 'items': [], 'errors': []})
+        if not client:
+            order['errors'].append(f'Row {row_no}: Missing client')
+        try:
+            order['invoice_date'] = _date(row.get('invoice_date')) or order['invoice_date']
+        except ValueError as e:
+            order['errors'].append(f"Row {row_no}: Invalid invoice_date '{e}' (expected YYYY-MM-DD or DD/MM/YYYY)")
+        order['po_number'] = _text(row.get('po_number')) or order['po_number']
+
+        product, quantity = _text(row.get('product')), row.get('quantity')
+        if quantity is None or _text(quantity) == '':
+            continue
+        try:
+            quantity = float(quantity)
+        except (TypeError, ValueError):
+            order['errors'].append(f"Row {row_no}: Invalid quantity {quantity!r} for '{product}'"); continue
+        if quantity < 0:
+            order['errors'].append(f"Row {row_no}: Negative quantity for '{product}'"); continue
+        if not product:
+            order['errors'].append(f'Row {row_no}: Line item without a product'); continue
+        if quantity > 0:
+            order['items'].append({'row': row_no, 'product': product, 'quantity': quantity})
+    if not orders:
+        raise BatchError('The sheet contains no order rows')
+    for order in orders.values():
+        if not order['items'] and not order['errors']:
+            order['errors'].append('No products selected or quantities are zero.')
+    return list(orders.values())
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def cache_key(payload):
+    """Stable hex digest of a JSON-able payload (dict key order and whitespace do not matter)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class PdfCache:
+    """Size-bounded LRU of rendered PDFs, in memory and optionally on disk.
+
+    Entries are addressed by cache_key() of everything that goes into the PDF,
+    so they never need invalidating: changed inputs (or a new master-data
+    version) simply produce a different key. The disk tier is shared by all
+    processes using the same directory (web workers and the batch pool);
+    files are written atomically and recency is tracked through their mtime.
+    """
+
+    def __init__(self, memory_bytes, directory=None, disk_bytes=0):
+        self.memory_bytes = memory_bytes
+        self.directory = directory if directory and disk_bytes > 0 else None
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk_used = None  # scanned on first write
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pdf')
+
+    def get(self, key):
+        """Return the cached PDF bytes for key, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self.stores += 1
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old)
+        self._memory[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if self.directory is None or len(data) > self.disk_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"PDF cache write failed: {e}"); return
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk()[1]
+            else:
+                self._disk_used += len(data)
+            if self._disk_used > self.disk_bytes:
+                self._trim_disk()
+
+    def _scan_disk(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.pdf'):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _trim_disk(self):
+        """Delete least recently used files until the directory is back under its limit."""
+        # Other processes write here too, so re-read the real usage instead of trusting our tally.
+        entries, used = self._scan_disk()
+        entries.sort()
+        for _, size, path in entries:
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            used -= size
+            self.evictions += 1
+        self._disk_used = used
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_ratio': hits / total if total else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_used,
+            'disk_bytes': self._disk_used,
+        }
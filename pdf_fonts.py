@@ -0,0 +1,41 @@
+"""TrueType fonts for PDFs that embed their fonts (the 'archival' output mode).
+
+ReportLab embeds a TrueType font as a subset holding only the glyphs the
+document uses, so it never ships a whole font file. The first font file found
+below is used; PDF_FONT_REGULAR and PDF_FONT_BOLD point at others. DejaVu Sans
+has the rupee sign. ReportLab's bundled Vera, the last resort, does not, so
+amounts keep the 'Rs.' prefix with it.
+"""
+import os
+from functools import lru_cache
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont, TTFError
+
+REGULAR_FONT_FILES = ['/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/dejavu/DejaVuSans.ttf', 'Vera.ttf']
+BOLD_FONT_FILES = ['/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf', 'VeraBd.ttf']
+FAMILY = 'InvoiceSans'
+RUPEE = '₹'
+
+
+def _load(name, env_var, candidates):
+    paths = [os.environ[env_var]] if os.environ.get(env_var) else candidates
+    for path in paths:
+        try:
+            return TTFont(name, path)
+        except (TTFError, OSError):
+            continue
+    raise OSError(f"No usable TrueType font among {', '.join(paths)}")
+
+
+@lru_cache(maxsize=None)
+def embedded_font_family():
+    """Register the TrueType family once per process; returns (regular name, bold name, currency prefix)."""
+    regular = _load(FAMILY, 'PDF_FONT_REGULAR', REGULAR_FONT_FILES)
+    bold = _load(FAMILY + '-Bold', 'PDF_FONT_BOLD', BOLD_FONT_FILES)
+    pdfmetrics.registerFont(regular)
+    pdfmetrics.registerFont(bold)
+    # <b> in paragraphs switches to the bold face of the paragraph's family
+    pdfmetrics.registerFontFamily(FAMILY, normal=regular.fontName, bold=bold.fontName, italic=regular.fontName, boldItalic=bold.fontName)
+    has_rupee = all(ord(RUPEE) in font.face.charToGlyph for font in (regular, bold))
+    return regular.fontName, bold.fontName, RUPEE if has_rupee else 'Rs.'
@@ -0,0 +1,164 @@
+import io
+import re
+import threading
+from functools import lru_cache
+
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Flowable, Table
+
+# Matches the font selection in a recorded "BT /F1 8 Tf 9.6 TL ET" operator so the
+# internal font name can be swapped for the one used by the target document.
+_FONT_OP = re.compile(r'/(F\d+)( [-\d.]+ Tf)')
+
+# Recording reads ReportLab internals (Table._cellStyles, _colpositions,
+# _rowpositions, _cellvalues, Canvas._code, the doc's fontMapping). They were
+# checked against these releases (requirements.txt pins one); under any other
+# release every static table is laid out the normal way instead.
+TESTED_REPORTLAB_VERSIONS = ('5.0',)
+
+
+@lru_cache(maxsize=None)
+def replay_supported():
+    """Whether this ReportLab is a tested release and has the internals record_table() reads"""
+    if '.'.join(reportlab.Version.split('.')[:2]) not in TESTED_REPORTLAB_VERSIONS:
+        return False
+    try:
+        scratch = canvas.Canvas(io.BytesIO())
+        table = Table([['x']])
+        table.wrapOn(scratch, 100, 100)
+        return (isinstance(scratch._code, list) and isinstance(scratch._doc.fontMapping, dict)
+                and hasattr(scratch._doc, 'getInternalFontName') and table._cellStyles[0][0].leftPadding is not None
+                and len(table._colpositions) == 2 and len(table._rowpositions) == 2 and table._cellvalues[0][0] == 'x')
+    except (AttributeError, IndexError, TypeError):
+        return False
+
+
+class RecordedTable:
+    """A Table laid out and drawn once, kept as the PDF operators it produced.
+
+    Only text in standard (non-embedded) fonts can be replayed into another
+    document; record_table() returns None for anything else.
+    """
+
+    def __init__(self, ops, fonts, width, height, slot_boxes):
+        self.ops = ops
+        self.fonts = fonts
+        self.width = width
+        self.height = height
+        # (col, row) -> (x, y_top, available width, available height)
+        self.slot_boxes = slot_boxes
+
+    def bind(self, fills):
+        """Return a flowable drawing this table with `fills` ({(col, row): flowable}) in its slots.
+
+        Returns None if some fill would not fit its cell as laid out at record
+        time (it would have made the row taller); the caller then builds the
+        table the normal way.
+        """
+        placed = []
+        for cell, flowable in fills.items():
+            x, y_top, avail_width, avail_height = self.slot_boxes[cell]
+            _, height = flowable.wrap(avail_width, avail_height)
+            if height > avail_height + 1e-6:
+                return None
+            placed.append((flowable, x, y_top - height))
+        return StaticTable(self, placed)
+
+
+class StaticTable(Flowable):
+    """Per-render flowable replaying a RecordedTable and drawing its slot contents."""
+
+    def __init__(self, recorded, placed):
+        Flowable.__init__(self)
+        self.recorded = recorded
+        self.placed = placed
+        self.width, self.height = recorded.width, recorded.height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        doc = self.canv._doc
+        names = {internal: doc.getInternalFontName(psname)[1:] for internal, psname in self.recorded.fonts.items()}
+        for op in self.recorded.ops:
+            self.canv.addLiteral(_FONT_OP.sub(lambda m: '/' + names[m.group(1)] + m.group(2), op))
+        for flowable, x, y in self.placed:
+            flowable.drawOn(self.canv, x, y)
+
+
+def record_table(table, slots=()):
+    """Lay out and draw `table` on a scratch canvas and capture its operators.
+
+    `slots` lists the (col, row) cells that change per invoice. Whatever the
+    table holds there (typical sample content) takes part in layout but is not
+    recorded; the cell boxes are kept so StaticTable can draw the real content.
+
+    Returns None (build the table normally) where replay isn't supported or
+    the recording can't be replayed safely.
+    """
+    if not replay_supported():
+        return None
+    try:
+        return _record_table(table, slots)
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+
+
+def _record_table(table, slots):
+    scratch = canvas.Canvas(io.BytesIO())
+    width, height = table.wrapOn(scratch, *scratch._pagesize)
+
+    slot_boxes = {}
+    for col, row in slots:
+        style = table._cellStyles[row][col]
+        x0, x1 = table._colpositions[col], table._colpositions[col + 1]
+        y_top, y_bottom = table._rowpositions[row], table._rowpositions[row + 1]
+        slot_boxes[(col, row)] = (
+            x0 + style.leftPadding,
+            y_top - style.topPadding,
+            x1 - x0 - style.leftPadding - style.rightPadding,
+            y_top - y_bottom - style.topPadding - style.bottomPadding,
+        )
+        table._cellvalues[row][col] = ''
+
+    start = len(scratch._code)
+    table.drawOn(scratch, 0, 0)
+    ops = tuple(scratch._code[start:])
+
+    fonts = {internal[1:]: psname for psname, internal in scratch._doc.fontMapping.items()}
+    if any(pdfmetrics.getFont(psname)._dynamicFont for psname in fonts.values()):
+        return None
+    # Every font selection must be one StaticTable can rename, and name a font it knows
+    selections = [match.group(1) for op in ops for match in _FONT_OP.finditer(op)]
+    if sum(op.count(' Tf') for op in ops) != len(selections) or not set(selections) <= fonts.keys():
+        return None
+    return RecordedTable(ops, fonts, width, height, slot_boxes)
+
+
+class RecordedBlocks:
+    """Lazily built, process-wide cache of RecordedTables keyed by name.
+
+    The recordings are immutable, so every thread can replay them concurrently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._blocks = {}
+
+    def get(self, key, build):
+        """Return the recording for `key`, calling build() -> (table, slots) the first time."""
+        try:
+            return self._blocks[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._blocks:
+                table, slots = build()
+                self._blocks[key] = record_table(table, slots)
+            return self._blocks[key]
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
@@ -0,0 +1,225 @@
+import io
+import time
+import zlib
+from functools import lru_cache
+
+import reportlab
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+from reportlab.platypus import BaseDocTemplate, Flowable, Table
+
+from metrics import PDF_FLOWABLE_SECONDS
+from pdf_frame import TESTED_REPORTLAB_VERSIONS
+
+
+class PaginatedTable(Flowable):
+    """A long table that breaks across pages in linear time.
+
+    Rows are measured once; each page then gets its own small Table holding the
+    repeated header rows and just the body rows that fit, so no row is laid out
+    more than twice however many pages the table spans. (A plain Table re-lays
+    out everything that is left over at every page break.)
+
+    footer_rows always stay together at the end of the last part. If `carry`
+    is given, `amounts[i]` is the running-total contribution of body row i and
+    carry(label, total) builds the 'Carried Forward' row closing a page and the
+    'Brought Forward' row opening the next one.
+    """
+
+    def __init__(self, header_rows, body_rows, footer_rows, col_widths, style,
+                 carry=None, amounts=None, brought_forward=None, _measured=None):
+        Flowable.__init__(self)
+        self.header_rows = header_rows
+        self.body_rows = body_rows
+        self.footer_rows = footer_rows
+        self.col_widths = col_widths
+        # style(first_body_row, last_body_row) -> TableStyle for one part
+        self.style = style
+        self.carry = carry
+        self.amounts = amounts
+        self.brought_forward = brought_forward
+        self._measured = _measured
+
+    def _measure(self):
+        """(header height, body row heights, footer height, carry row height), computed once per table."""
+        if self._measured is None:
+            rows = self.header_rows + self.body_rows + self.footer_rows
+            table = Table(rows, colWidths=self.col_widths)
+            table.setStyle(self.style(len(self.header_rows), len(self.header_rows) + len(self.body_rows) - 1))
+            table.wrap(sum(self.col_widths), float('inf'))
+            heights = table._rowHeights
+            n_header, n_body = len(self.header_rows), len(self.body_rows)
+            carry_height = 0
+            if self.carry is not None:
+                sample = Table([self.carry('Carried Forward', 0)], colWidths=self.col_widths)
+                sample.setStyle(self.style(0, -1))
+                carry_height = sample.wrap(sum(self.col_widths), float('inf'))[1]
+            body_heights = heights[n_header:n_header + n_body]
+            self._measured = (sum(heights[:n_header]), body_heights, sum(heights[n_header + n_body:]), carry_height)
+        return self._measured
+
+    def _leading_height(self):
+        header_height, _, _, carry_height = self._measure()
+        return header_height + (carry_height if self.brought_forward is not None else 0)
+
+    def wrap(self, availWidth, availHeight):
+        _, body_heights, footer_height, _ = self._measure()
+        self.width = sum(self.col_widths)
+        self.height = self._leading_height() + sum(body_heights) + footer_height
+        return self.width, self.height
+
+    def _part(self, body_rows, footer_rows):
+        rows = list(self.header_rows)
+        if self.brought_forward is not None:
+            rows.append(self.carry('Brought Forward', self.brought_forward))
+        first_body = len(rows)
+        rows.extend(body_rows)
+        last_body = len(rows) - 1
+        rows.extend(footer_rows)
+        table = Table(rows, colWidths=self.col_widths)
+        table.setStyle(self.style(first_body, last_body))
+        return table
+
+    def split(self, availWidth, availHeight):
+        _, body_heights, footer_height, carry_height = self._measure()
+        room = availHeight - self._leading_height() - (carry_height if self.carry is not None else 0)
+        used, fit = 0, 0
+        for height in body_heights:
+            if used + height > room:
+                break
+            used += height
+            fit += 1
+        if fit == 0:
+            return []
+
+        closing = []
+        running = self.brought_forward
+        if self.carry is not None:
+            running = (running or 0) + sum(self.amounts[:fit])
+            closing = [self.carry('Carried Forward', running)]
+        rest = PaginatedTable(
+            self.header_rows, self.body_rows[fit:], self.footer_rows, self.col_widths, self.style,
+            carry=self.carry, amounts=self.amounts[fit:] if self.amounts is not None else None,
+            brought_forward=running,
+            _measured=(self._measured[0], body_heights[fit:], footer_height, carry_height),
+        )
+        return [self._part(self.body_rows[:fit], closing), rest]
+
+    def draw(self):
+        table = self._part(self.body_rows, self.footer_rows)
+        table.wrapOn(self.canv, self.width, self.height)
+        table.drawOn(self.canv, 0, 0)
+
+
+class BestFlate(pdfdoc.PDFStreamFilterZCompress):
+    """FlateDecode at zlib's highest level (ReportLab uses the default level 6)."""
+
+    def encode(self, text):
+        if isinstance(text, str):
+            text = text.encode('utf8')
+        return zlib.compress(text, 9)
+
+BEST_FLATE = BestFlate()
+
+
+@lru_cache(maxsize=None)
+def save_internals_supported():
+    """Whether this ReportLab is a tested release and has the internals PageCountCanvas.save() sets.
+
+    Those are the document's updateSignature() and a page's Contents, which
+    must be written as given in place of the default stream. Without them the
+    canvas saves the stock way: default streams and ReportLab's own /ID.
+    """
+    if '.'.join(reportlab.Version.split('.')[:2]) not in TESTED_REPORTLAB_VERSIONS:
+        return False
+    try:
+        output = io.BytesIO()
+        scratch = canvas.Canvas(output, pageCompression=1, invariant=1)
+        scratch.drawString(0, 0, 'probe')
+        scratch._doc.updateSignature('probe')
+        canvas.Canvas.showPage(scratch)
+        page = scratch._doc.Pages.pages[-1]
+        if page.Contents is not None or not isinstance(page.stream, str):
+            return False
+        page.Contents = pdfdoc.PDFStream(content=page.stream, filters=[BEST_FLATE])
+        content = BEST_FLATE.encode(page.stream)
+        scratch.save()
+        return content in output.getvalue()
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return False
+
+
+class PageCountCanvas(canvas.Canvas):
+    """Canvas that holds pages back until save() so each can show 'Page n of N'.
+
+    Used as the doc template's canvasmaker; single-page documents are written
+    without a page number. With binary_streams the page content is written as
+    plain Flate streams at the highest level instead of ReportLab's default
+    ASCII85-wrapped ones (rl_config.useA85, a process-wide setting). Both
+    need ReportLab internals; see save_internals_supported().
+    """
+
+    def __init__(self, *args, binary_streams=False, **kwargs):
+        canvas.Canvas.__init__(self, *args, **kwargs)
+        self.binary_streams = binary_streams
+        self._page_states = []
+
+    def showPage(self):
+        self._page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        page_count = len(self._page_states)
+        internals = save_internals_supported()
+        if internals and self._doc.invariant:
+            # Invariant mode pins the timestamp the /ID is derived from; mixing in
+            # the page content keeps IDs distinct per invoice yet repeatable.
+            for state in self._page_states:
+                self._doc.updateSignature('\n'.join(state['_code']))
+        for state in self._page_states:
+            self.__dict__.update(state)
+            if page_count > 1:
+                self.draw_page_number(page_count)
+            canvas.Canvas.showPage(self)
+            if internals and self.binary_streams and self._pageCompression:
+                # A page that already has Contents keeps them instead of building the default stream
+                page = self._doc.Pages.pages[-1]
+                page.Contents = pdfdoc.PDFStream(content=page.stream, filters=[BEST_FLATE])
+        canvas.Canvas.save(self)
+
+    def draw_page_number(self, page_count):
+        self.saveState()
+        self.setFont(self._initialFontName, 7)
+        self.drawRightString(self._pagesize[0] - 15*mm, 2*mm, f"Page {self._pageNumber} of {page_count}")
+        self.restoreState()
+
+
+def timed(name, flowable):
+    """Tag `flowable` so TimedDocTemplate reports its layout and drawing time as table=name."""
+    flowable.metric_name = name
+    return flowable
+
+
+class TimedDocTemplate(BaseDocTemplate):
+    """BaseDocTemplate that times every tagged flowable it places.
+
+    Each handle_flowable() call (wrap, split if needed, draw) is observed in
+    invoice_pdf_flowable_seconds. Parts a table is split into inherit its tag,
+    so a table spanning pages adds one observation per page.
+    """
+
+    def handle_flowable(self, flowables):
+        flowable = flowables[0]
+        name = getattr(flowable, 'metric_name', None)
+        if name is None:
+            return BaseDocTemplate.handle_flowable(self, flowables)
+        remaining = len(flowables) - 1
+        start = time.perf_counter()
+        try:
+            return BaseDocTemplate.handle_flowable(self, flowables)
+        finally:
+            PDF_FLOWABLE_SECONDS.observe(time.perf_counter() - start, name)
+            for part in flowables[:len(flowables) - remaining]:
+                if getattr(part, 'metric_name', None) is None:
+                    part.metric_name = name
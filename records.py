@@ -0,0 +1,80 @@
+"""Typed master-data and invoice-line records.
+
+Slotted and frozen: no per-instance __dict__, and a record can be shared by
+every thread and request that looks it up. The Catalog builds each client and
+product record once per snapshot and interns their repeated strings (states,
+units, HSN codes, tax types), so the cached catalog holds one copy of each.
+
+to_dict() gives the CSV-style keys ('Company Name', 'GSt_Rate', ...) that the
+JSON API and the page's JavaScript use.
+"""
+import sys
+from dataclasses import dataclass
+from decimal import Decimal
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
+class Client:
+    company_name: str
+    address: str | None = None
+    gstin: str | None = None
+    state: str | None = None
+    layout_template: str | None = None
+    tax_type: str | None = None
+
+    @classmethod
+    def from_row(cls, row):
+        """(company_name, address, gstin, state, layout_template, tax_type) as stored in the catalog"""
+        return cls(*(_intern(value) for value in row))
+
+    def to_dict(self):
+        return {'Company Name': self.company_name, 'Address': self.address, 'GSTIN': self.gstin, 'State': self.state,
+                'LayoutTemplate': self.layout_template, 'TaxType': self.tax_type}
+
+
+@dataclass(frozen=True, slots=True)
+class Product:
+    description: str
+    hsn_sac: str | None = None
+    gst_rate: float | int | None = None
+    unit: str | None = None
+
+    @classmethod
+    def from_row(cls, row):
+        """(description, hsn_sac, gst_rate, unit) as stored in the catalog"""
+        return cls(*(_intern(value) for value in row))
+
+    def to_dict(self):
+        return {'Description': self.description, 'HSN_SAC': self.hsn_sac, 'GSt_Rate': self.gst_rate, 'Unit': self.unit}
+
+
+@dataclass(frozen=True, slots=True)
+class PriceEntry:
+    """A client's price for one product, already an exact Decimal."""
+    company_name: str
+    product_description: str
+    price: Decimal
+
+
+@dataclass(frozen=True, slots=True)
+class OrderLine:
+    """One product and quantity of an invoice, before pricing."""
+    product: Product
+    quantity: float
+
+
+@dataclass(frozen=True, slots=True)
+class LineItem:
+    """A priced invoice line as returned by calculate_invoice(); error is set (and amount 0) if it has no price."""
+    description: str
+    hsn_sac: str | None
+    quantity: float
+    unit: str | None
+    rate: Decimal
+    gst_rate: float
+    amount: Decimal
+    error: str | None = None
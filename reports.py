@@ -0,0 +1,53 @@
+"""CSV and XLSX exports of a GST summary (InvoiceLedger.gst_summary())."""
+import csv
+import io
+from decimal import Decimal
+
+# (section title, summary key, columns); one CSV block or XLSX sheet each
+SECTIONS = [
+    ('Summary', 'totals', ['invoice_count', 'taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount', 'total_tax', 'invoice_value']),
+    ('By Month', 'by_month', ['month', 'invoice_count', 'taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount', 'total_tax', 'invoice_value']),
+    ('By Rate', 'by_rate', ['gst_rate', 'tax_type', 'invoice_count', 'taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount', 'total_tax']),
+    ('By HSN', 'by_hsn', ['hsn_sac', 'unit', 'gst_rate', 'line_count', 'quantity', 'taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount', 'total_tax']),
+    ('By Client', 'by_client', ['client', 'tax_type', 'invoice_count', 'taxable_value', 'igst_amount', 'cgst_amount', 'sgst_amount', 'total_tax', 'invoice_value']),
+]
+
+
+def _section_rows(summary, key, columns):
+    rows = summary[key] if isinstance(summary[key], list) else [summary[key]]
+    return [[row.get(column, '') for column in columns] for row in rows]
+
+
+def summary_filename(summary, extension):
+    period = summary['from'] if summary['from'] == summary['to'] else f"{summary['from']}_{summary['to']}"
+    return f'GST_Summary_{period}.{extension}'
+
+
+def summary_csv(summary):
+    """All sections in one CSV, each under its title row and separated by a blank line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['GST Summary', summary['from'], summary['to']])
+    for title, key, columns in SECTIONS:
+        writer.writerow([])
+        writer.writerow([title])
+        writer.writerow(columns)
+        writer.writerows(_section_rows(summary, key, columns))
+    return buffer.getvalue()
+
+
+def summary_xlsx(summary):
+    """One worksheet per section, written in openpyxl's streaming write-only mode; returns a BytesIO."""
+    from openpyxl import Workbook  # only needed for XLSX exports
+    workbook = Workbook(write_only=True)
+    for title, key, columns in SECTIONS:
+        sheet = workbook.create_sheet(title)
+        sheet.append(columns)
+        for row in _section_rows(summary, key, columns):
+            # Amounts are exact strings; write them as numbers so the sheet can total them
+            sheet.append([float(Decimal(value)) if column.endswith(('_value', '_amount', '_tax')) else value
+                          for column, value in zip(columns, row)])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer